@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Callable, List, Sequence
+
+from plagiarism_detector.similarity import lcs_length_bitparallel, lcs_length_dp
+
+
+def _random_tokens(rng: random.Random, n: int, vocab_size: int) -> List[str]:
+    vocab = [f"w{k}" for k in range(vocab_size)]
+    return [rng.choice(vocab) for _ in range(n)]
+
+
+def _time(fn: Callable[[Sequence[str], Sequence[str]], int], a: Sequence[str], b: Sequence[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(a, b)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Micro-benchmark: bit-parallel LCS vs reference DP")
+    ap.add_argument("--sizes", default="100,500,1000,2000", help="Comma-separated token counts per document")
+    ap.add_argument("--vocab", type=int, default=2000, help="Vocabulary size of the random documents")
+    ap.add_argument("--repeat", type=int, default=3, help="Best-of-N timing")
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'tokens':>8} {'dp, s':>10} {'bitpar, s':>10} {'speedup':>8}")
+    for size in (int(x) for x in args.sizes.split(",") if x.strip()):
+        a = _random_tokens(rng, size, args.vocab)
+        b = a[: size // 2] + _random_tokens(rng, size - size // 2, args.vocab)
+        assert lcs_length_dp(a, b) == lcs_length_bitparallel(a, b)
+        t_dp = _time(lcs_length_dp, a, b, args.repeat)
+        t_bp = _time(lcs_length_bitparallel, a, b, args.repeat)
+        print(f"{size:>8} {t_dp:>10.4f} {t_bp:>10.4f} {t_dp / max(t_bp, 1e-9):>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
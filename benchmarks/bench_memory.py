@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from corpus import write_corpus
+
+_CHILD = """
+import json, resource, sys, time
+from pathlib import Path
+from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.similarity import SimilarityConfig
+
+t0 = time.perf_counter()
+r = analyze_folder(
+    Path(sys.argv[1]),
+    threshold=0.75,
+    sim_cfg=SimilarityConfig(candidate_mode="lsh"),
+    low_memory=sys.argv[2] == "1",
+)
+print(json.dumps({
+    "files": len(r.files),
+    "seconds": time.perf_counter() - t0,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Peak RSS of analyze_folder: default vs --low-memory")
+    ap.add_argument("--docs", type=int, default=1000, help="Number of synthetic documents")
+    ap.add_argument("--words", type=int, default=2000, help="Words per document")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_corpus(Path(tmp), n_docs=args.docs, words_per_doc=args.words)
+        size_mb = sum(p.stat().st_size for p in Path(tmp).iterdir()) / 1e6
+        print(f"Corpus: {args.docs} docs, {size_mb:.1f} MB")
+        for low_memory in (False, True):
+            out = subprocess.check_output([sys.executable, "-c", _CHILD, tmp, "1" if low_memory else "0"], text=True)
+            stats = json.loads(out.strip().splitlines()[-1])
+            mode = "low_memory" if low_memory else "default"
+            print(f"{mode:>10}: peak RSS {stats['peak_rss_mb']:.0f} MB, {stats['seconds']:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
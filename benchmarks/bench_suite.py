@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from corpus import LANGS, write_corpus
+
+# Runs in a fresh interpreter per corpus size, so peak RSS belongs to that size only.
+# Every stage records its wall time and the process peak RSS right after it (ru_maxrss is a running
+# maximum: the stage that raises it is the one that needs the memory).
+_CHILD = """
+import json, random, resource, sys, tempfile, time
+from pathlib import Path
+
+from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.hashed_tfidf import hashed_cosine_topk
+from plagiarism_detector.preprocess import tokenize
+from plagiarism_detector.readers import read_folder_detailed
+from plagiarism_detector.reporting import save_columnar, save_json, save_markdown, top_pairs_for_result
+from plagiarism_detector.similarity import (
+    SimilarityConfig,
+    cosine_tfidf_matrix,
+    cosine_tfidf_matrix_from_ids,
+    lcs_similarity,
+    ngram_jaccard_sparse,
+    ngram_key_set,
+    sequence_ratio,
+)
+from plagiarism_detector.vocab import Vocabulary
+from plagiarism_detector.winnowing import WinnowIndex, fingerprints
+
+folder, max_pairs = Path(sys.argv[1]), int(sys.argv[2])
+truth = json.loads(Path(sys.argv[3]).read_text(encoding="utf-8"))
+stages = {}
+
+
+def stage(name, fn, **extra):
+    t0 = time.perf_counter()
+    out = fn()
+    stages[name] = {
+        "seconds": round(time.perf_counter() - t0, 6),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        **extra,
+    }
+    return out
+
+
+read = stage("read_folder", lambda: read_folder_detailed(folder))
+files = [d.path.name for d in read.documents]
+texts = [d.text for d in read.documents]
+tokens = stage("tokenize", lambda: [tokenize(t) for t in texts])
+vocab = Vocabulary()
+ids = stage("intern", lambda: [vocab.intern(t) for t in tokens])
+
+stage("cosine_tfidf_matrix", lambda: cosine_tfidf_matrix(texts))
+stage("cosine_tfidf_from_ids", lambda: cosine_tfidf_matrix_from_ids(ids, len(vocab)))
+stage("cosine_tfidf_hashed", lambda: hashed_cosine_topk(ids))
+stage("ngram_jaccard_sparse", lambda: ngram_jaccard_sparse([ngram_key_set(x, 3, len(vocab)) for x in ids]))
+stage("winnow_shared_counts", lambda: WinnowIndex([fingerprints(x) for x in ids]).shared_counts())
+
+# Pairwise metrics on a fixed sample: all ground-truth pairs first, then random pairs
+index = {f: i for i, f in enumerate(files)}
+pairs = [(index[t["a"]], index[t["b"]]) for t in truth][:max_pairs]
+rng = random.Random(0)
+n = len(files)
+while len(pairs) < min(max_pairs, n * (n - 1) // 2):
+    i, j = sorted(rng.sample(range(n), 2))
+    pairs.append((i, j))
+per_pair = {"pairs": len(pairs)}
+stage("sequence_ratio_difflib", lambda: [sequence_ratio(texts[i], texts[j]) for i, j in pairs], **per_pair)
+stage("sequence_ratio_blocks", lambda: [sequence_ratio(texts[i], texts[j], backend="blocks") for i, j in pairs], **per_pair)
+stage("lcs_similarity", lambda: [lcs_similarity(ids[i], ids[j]) for i, j in pairs], **per_pair)
+
+result = stage(
+    "analyze_folder",
+    lambda: analyze_folder(folder, threshold=0.5, sim_cfg=SimilarityConfig(candidate_mode="lsh")),
+)
+# Detection quality, threshold-free: how many ground-truth pairs are among the len(truth) best pairs
+top = {(p["a"], p["b"]) for p in top_pairs_for_result(result, k=len(truth))}
+with tempfile.TemporaryDirectory() as out:
+    out = Path(out)
+    stage("save_json", lambda: save_json(result, out / "report.json"))
+    stage("save_markdown", lambda: save_markdown(result, out / "report.md"))
+    stage("save_columnar", lambda: save_columnar(result, out / "columnar"))
+
+print(json.dumps({
+    "docs": n,
+    "tokens": int(sum(len(t) for t in tokens)),
+    "truth_pairs": len(truth),
+    "truth_in_top": sum((t["a"], t["b"]) in top for t in truth),
+    "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    "stages": stages,
+}))
+"""
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_size(n_docs: int, args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(tmp) / "corpus"
+        truth = Path(tmp) / "truth.json"
+        write_corpus(
+            corpus,
+            n_docs=n_docs,
+            words_per_doc=args.words,
+            copy_rate=args.copy_rate,
+            paraphrase_rate=args.paraphrase_rate,
+            lang=args.lang,
+            seed=args.seed,
+            truth_path=truth,
+        )
+        size_mb = sum(p.stat().st_size for p in corpus.iterdir()) / 1e6
+        out = subprocess.check_output([sys.executable, "-c", _CHILD, str(corpus), str(args.max_pairs), str(truth)], text=True)
+    stats = json.loads(out.strip().splitlines()[-1])
+    stats["corpus_mb"] = round(size_mb, 3)
+    return stats
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], tolerance: float) -> List[Tuple[int, str, float, float]]:
+    # Stages that got slower than `tolerance` x the old run, matched by corpus size
+    old_runs = {r["docs"]: r for r in old["runs"]}
+    slower = []
+    for run in new["runs"]:
+        base = old_runs.get(run["docs"])
+        if base is None:
+            continue
+        for name, st in run["stages"].items():
+            if name not in base["stages"]:
+                continue
+            t_old, t_new = base["stages"][name]["seconds"], st["seconds"]
+            print(f"{run['docs']:>6} {name:<24} {t_old:>10.3f} {t_new:>10.3f} {t_new / max(t_old, 1e-9):>7.2f}x")
+            if t_new > tolerance * t_old and t_new - t_old > 0.05:
+                slower.append((run["docs"], name, t_old, t_new))
+    return slower
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Per-stage timings and peak memory on synthetic plagiarism corpora")
+    ap.add_argument("--sizes", default="50,200,500", help="Comma-separated corpus sizes (documents)")
+    ap.add_argument("--words", type=int, default=1000, help="Words per document")
+    ap.add_argument("--lang", choices=LANGS, default="mixed", help="Corpus language")
+    ap.add_argument("--copy-rate", type=float, default=0.1, help="Share of documents with a copy-pasted passage")
+    ap.add_argument("--paraphrase-rate", type=float, default=0.1, help="Share of documents that paraphrase another one")
+    ap.add_argument("--max-pairs", type=int, default=200, help="Pairs timed for the per-pair metrics")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, default=Path("bench_results.json"), help="Machine-readable results (JSON)")
+    ap.add_argument("--compare", type=Path, default=None, help="Earlier results JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=1.2, help="Slowdown factor reported as a regression")
+    args = ap.parse_args()
+
+    results: Dict[str, Any] = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "words": args.words,
+            "lang": args.lang,
+            "copy_rate": args.copy_rate,
+            "paraphrase_rate": args.paraphrase_rate,
+            "max_pairs": args.max_pairs,
+            "seed": args.seed,
+        },
+        "runs": [],
+    }
+    for n_docs in (int(x) for x in args.sizes.split(",") if x.strip()):
+        t0 = time.perf_counter()
+        run = run_size(n_docs, args)
+        results["runs"].append(run)
+        slowest = sorted(run["stages"].items(), key=lambda kv: kv[1]["seconds"], reverse=True)[:3]
+        print(
+            f"{n_docs:>6} docs, {run['corpus_mb']:.1f} MB: peak RSS {run['peak_rss_mb']:.0f} MB, "
+            f"{time.perf_counter() - t0:.1f} s; slowest: " + ", ".join(f"{k} {v['seconds']:.2f} s" for k, v in slowest)
+        )
+    args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"Results: {args.out}")
+
+    if args.compare is not None:
+        old = json.loads(args.compare.read_text(encoding="utf-8"))
+        print(f"\n{'docs':>6} {'stage':<24} {'old, s':>10} {'new, s':>10} {'ratio':>8}")
+        slower = compare(old, results, args.tolerance)
+        if slower:
+            print(f"\n{len(slower)} stage(s) slower than {args.tolerance}x ({old.get('git_commit', '')[:10]} -> HEAD)")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+from typing import Callable, Iterator, List
+
+from corpus import generate_documents
+
+from plagiarism_detector.preprocess import PreprocessConfig, iter_tokens, normalize_text, tokenize, tokenize_with_offsets
+
+_WORD_RE = re.compile(r"[A-Za-zА-Яа-яЁё0-9]+")
+
+
+def _reference(text: str, cfg: PreprocessConfig) -> List[str]:
+    # The multi-pass pipeline tokenize() replaced: normalize, lowercase, findall, length filter
+    tokens = _WORD_RE.findall(normalize_text(text, lower=cfg.lower))
+    return [t for t in tokens if len(t) >= cfg.min_token_len]
+
+
+def _text(words: List[str], rng: random.Random) -> str:
+    # Sentences with capitals, punctuation and line breaks, so normalization has work to do
+    out: List[str] = []
+    for k, w in enumerate(words):
+        out.append(w.capitalize() if k % 12 == 0 else w)
+        out.append(".\n" if k % 12 == 11 else ", " if rng.random() < 0.1 else " ")
+    return "".join(out)
+
+
+def _chunks(text: str, size: int) -> Iterator[str]:
+    for start in range(0, len(text), size):
+        yield text[start : start + size]
+
+
+def _best(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Tokenizer throughput (MB/s of UTF-8 input) on a synthetic corpus")
+    ap.add_argument("--docs", type=int, default=200, help="Documents in the corpus")
+    ap.add_argument("--words", type=int, default=2000, help="Words per document")
+    ap.add_argument("--lang", default="mixed", help="en, ru or mixed")
+    ap.add_argument("--chunk-kb", type=int, default=64, help="Chunk size of the streaming variant")
+    ap.add_argument("--repeat", type=int, default=3, help="Best-of-N timing")
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    docs, _ = generate_documents(args.docs, args.words, lang=args.lang)
+    texts = [_text(words, rng) for words in docs]
+    mb = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+    default = PreprocessConfig()
+    assert all(tokenize(t) == _reference(t, default) for t in texts)
+    chunk = args.chunk_kb * 1024
+
+    cases = [
+        ("reference (multi-pass)", lambda: [_reference(t, default) for t in texts]),
+        ("tokenize", lambda: [tokenize(t) for t in texts]),
+        ("iter_tokens, chunked", lambda: [list(iter_tokens(_chunks(t, chunk))) for t in texts]),
+        ("tokenize_with_offsets", lambda: [tokenize_with_offsets(t) for t in texts]),
+        ("tokenize, stop words", lambda: [tokenize(t, PreprocessConfig(stop_words=True)) for t in texts]),
+    ]
+    try:
+        import snowballstemmer  # noqa: F401
+
+        cases.append(("tokenize, stemming", lambda: [tokenize(t, PreprocessConfig(stem=True)) for t in texts]))
+    except ImportError:
+        print("snowballstemmer is not installed: stemming skipped")
+
+    print(f"{mb:.1f} MB in {len(texts)} documents")
+    print(f"{'variant':<24} {'seconds':>9} {'MB/s':>8}")
+    for name, fn in cases:
+        seconds = _best(fn, args.repeat)
+        print(f"{name:<24} {seconds:>9.3f} {mb / max(seconds, 1e-9):>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+LANGS = ("en", "ru", "mixed")
+
+_SYLLABLES = {
+    "en": ["ka", "lo", "mi", "ra", "ten", "vor", "sel", "dun", "pri", "gas", "nel", "tor", "bi", "que", "zan"],
+    "ru": ["ка", "ло", "ми", "ра", "тен", "вор", "сел", "дун", "при", "гас", "нел", "тор", "би", "жё", "зан"],
+}
+# Frequent real words first, so that the Zipf head looks like natural text
+_FUNCTION_WORDS = {
+    "en": ["the", "of", "and", "to", "in", "is", "that", "for", "it", "as", "with", "on", "by", "this", "are"],
+    "ru": ["и", "в", "не", "на", "что", "по", "это", "как", "из", "для", "от", "так", "при", "его", "но"],
+}
+
+
+def synthetic_vocabulary(size: int, *, seed: int = 0, lang: str = "en") -> List[str]:
+    # Pseudo-words from syllables: only letters, so every word is one token for preprocess._WORD_RE
+    rng = random.Random(seed)
+    words = set()
+    syllables = _SYLLABLES[lang]
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+
+class _Language:
+    def __init__(self, lang: str, vocab_size: int, seed: int) -> None:
+        rng = random.Random(seed)
+        content = synthetic_vocabulary(vocab_size, seed=seed, lang=lang)
+        rng.shuffle(content)
+        self.words = _FUNCTION_WORDS[lang] + [w for w in content if w not in _FUNCTION_WORDS[lang]]
+        self.weights = [1.0 / (rank + 1) for rank in range(len(self.words))]  # Zipf
+        # Paraphrase "synonyms": a fixed random substitute per content word
+        shuffled = self.words[:]
+        rng.shuffle(shuffled)
+        self.synonym = dict(zip(self.words, shuffled))
+
+    def text(self, rng: random.Random, n: int) -> List[str]:
+        return rng.choices(self.words, weights=self.weights, k=n)
+
+
+def _paraphrase(words: List[str], lang: _Language, rng: random.Random, strength: float) -> List[str]:
+    out = [lang.synonym[w] if rng.random() < strength else w for w in words]
+    for i in range(len(out) - 1):
+        if rng.random() < strength / 3:
+            out[i], out[i + 1] = out[i + 1], out[i]
+    return out
+
+
+def generate_documents(
+    n_docs: int,
+    words_per_doc: int,
+    *,
+    lang: str = "en",
+    copy_rate: float = 0.1,
+    paraphrase_rate: float = 0.0,
+    paraphrase_strength: float = 0.3,
+    vocab_size: int = 5000,
+    seed: int = 0,
+) -> Tuple[List[List[str]], List[Dict[str, object]]]:
+    # Documents are Zipf-distributed random text. A `copy_rate` fraction copies a passage (30-60% of the
+    # text) of an earlier document verbatim into fresh text; a `paraphrase_rate` fraction is a whole
+    # earlier document with `paraphrase_strength` of its words replaced and some neighbours swapped.
+    # Returns the documents and the ground truth [{"doc", "source", "kind"}].
+    if lang not in LANGS:
+        raise ValueError(f"Unknown lang: {lang!r} (expected one of {LANGS})")
+    rng = random.Random(seed)
+    langs = {name: _Language(name, vocab_size, seed) for name in ("en", "ru") if lang in (name, "mixed")}
+    doc_lang: List[str] = []
+    docs: List[List[str]] = []
+    truth: List[Dict[str, object]] = []
+    for k in range(n_docs):
+        name = lang if lang != "mixed" else ("en", "ru")[k % 2]
+        language = langs[name]
+        sources = [i for i in range(k) if doc_lang[i] == name]
+        roll = rng.random()
+        if sources and roll < copy_rate:
+            src = rng.choice(sources)
+            length = int(len(docs[src]) * rng.uniform(0.3, 0.6))
+            start = rng.randrange(0, len(docs[src]) - length + 1)
+            fresh = language.text(rng, max(0, words_per_doc - length))
+            at = rng.randrange(0, len(fresh) + 1)
+            words = fresh[:at] + docs[src][start : start + length] + fresh[at:]
+            truth.append({"doc": k, "source": src, "kind": "copy"})
+        elif sources and roll < copy_rate + paraphrase_rate:
+            src = rng.choice(sources)
+            words = _paraphrase(docs[src], language, rng, paraphrase_strength)
+            truth.append({"doc": k, "source": src, "kind": "paraphrase"})
+        else:
+            words = language.text(rng, words_per_doc)
+        docs.append(words)
+        doc_lang.append(name)
+    return docs, truth
+
+
+def doc_name(k: int) -> str:
+    return f"doc_{k:05d}.txt"
+
+
+def write_corpus(
+    out_dir: Path,
+    *,
+    n_docs: int,
+    words_per_doc: int,
+    copy_rate: float = 0.1,
+    paraphrase_rate: float = 0.0,
+    lang: str = "en",
+    vocab_size: int = 5000,
+    seed: int = 0,
+    truth_path: Optional[Path] = None,
+) -> List[Path]:
+    docs, truth = generate_documents(
+        n_docs,
+        words_per_doc,
+        lang=lang,
+        copy_rate=copy_rate,
+        paraphrase_rate=paraphrase_rate,
+        vocab_size=vocab_size,
+        seed=seed,
+    )
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    paths: List[Path] = []
+    for k, words in enumerate(docs):
+        sentences = [" ".join(words[i : i + 12]) for i in range(0, len(words), 12)]
+        text = "\n".join(s[:1].upper() + s[1:] + "." for s in sentences)
+        p = out_dir / doc_name(k)
+        p.write_text(text, encoding="utf-8")
+        paths.append(p)
+    if truth_path is not None:
+        named = [{"a": doc_name(int(t["source"])), "b": doc_name(int(t["doc"])), "kind": t["kind"]} for t in truth]
+        Path(truth_path).write_text(json.dumps(named, ensure_ascii=False, indent=2), encoding="utf-8")
+    return paths
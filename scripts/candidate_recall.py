@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import List, Set, Tuple
+
+from plagiarism_detector.analyzer import AnalysisResult, analyze_folder
+from plagiarism_detector.candidates import candidate_recall
+from plagiarism_detector.similarity import SimilarityConfig
+
+
+def _flagged_pairs(result: AnalysisResult) -> Set[Tuple[str, str]]:
+    return {(p["a"], p["b"]) for p in result.top_pairs}
+
+
+def _top_k_pairs(result: AnalysisResult, k: int) -> Set[Tuple[str, str]]:
+    pairs: List[Tuple[float, str, str]] = []
+    n = len(result.files)
+    for i in range(n):
+        for j in range(i + 1, n):
+            pairs.append((float(result.similarity_matrix[i][j]), result.files[i], result.files[j]))
+    pairs.sort(key=lambda x: x[0], reverse=True)
+    return {(a, b) for _, a, b in pairs[:k]}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Recall of --candidates lsh against exhaustive scoring")
+    ap.add_argument("--input", default="data/sample", help="Folder with submissions")
+    ap.add_argument("--threshold", type=float, default=0.75, help="Suspicion threshold 0..1")
+    ap.add_argument("--tfidf-floor", type=float, default=None, help="TF-IDF floor (default: derived from threshold)")
+    ap.add_argument("--k", type=int, default=10, help="Size of the overall top-k list to compare")
+    args = ap.parse_args()
+
+    folder = Path(args.input)
+    exhaustive = analyze_folder(folder, threshold=args.threshold)
+    lsh = analyze_folder(
+        folder,
+        threshold=args.threshold,
+        sim_cfg=SimilarityConfig(candidate_mode="lsh", candidate_tfidf_floor=args.tfidf_floor),
+    )
+
+    flagged = candidate_recall(_flagged_pairs(exhaustive), _flagged_pairs(lsh))
+    top_k = candidate_recall(_top_k_pairs(exhaustive, args.k), _top_k_pairs(lsh, args.k))
+    cand = lsh.config.get("candidates", {})
+
+    print(f"Files: {len(exhaustive.files)}")
+    print(f"Pairs scored: {cand.get('pairs_scored', 0)}/{cand.get('pairs_total', 0)}")
+    print(f"Recall (pairs >= threshold): {'n/a' if flagged is None else f'{flagged:.3f}'}")
+    print(f"Recall (top-{args.k} overall): {'n/a' if top_k is None else f'{top_k:.3f}'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -10,6 +10,7 @@ from typing import Any, Dict, List, Optional, Sequence, Tuple
 import markdown as md
 
 from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.cache import ExtractionCache, default_cache_dir
 
 # Core reporting functions (must exist)
 from plagiarism_detector.reporting import build_summary, save_heatmap_png, save_json, save_markdown
@@ -53,10 +54,10 @@ def _pairs_table_html(pairs: List[Dict[str, Any]]) -> str:
     if not pairs:
         return "<p><em>No pairs to show.</em></p>"
 
-    preferred = ["a", "b", "score", "tfidf", "sequence", "ngram", "lcs"]
+    preferred = ["a", "b", "score", "tfidf", "sequence", "ngram", "lcs", "winnow"]
     present = set()
     for p in pairs:
-        present.update(p.keys())
+        present.update(k for k in p.keys() if k != "evidence")
 
     cols = [c for c in preferred if c in present]
     cols += sorted([k for k in present if k not in preferred])
@@ -74,6 +75,26 @@ def _pairs_table_html(pairs: List[Dict[str, Any]]) -> str:
     return "<table>" f"<thead><tr>{head}</tr></thead>" f"<tbody>{''.join(rows)}</tbody>" "</table>"
 
 
+def _evidence_html(pairs: List[Dict[str, Any]]) -> str:
+    blocks: List[str] = []
+    for p in pairs:
+        ev = p.get("evidence")
+        if not ev:
+            continue
+        note = " <span class='muted'>(time budget reached, incomplete)</span>" if ev.get("truncated") else ""
+        items = "".join(
+            f"<li><span class='muted'>chars {a0}–{a1} ↔ {b0}–{b1}</span><blockquote>{_html_escape(text)}</blockquote></li>"
+            for (a0, a1, b0, b1), text in zip(ev.get("spans", []), ev.get("snippets", []))
+        )
+        blocks.append(
+            f"<h3>{_html_escape(str(p['a']))} vs {_html_escape(str(p['b']))}{note}</h3>"
+            + (f"<ul class='evidence'>{items}</ul>" if items else "<p><em>No shared passages found.</em></p>")
+        )
+    if not blocks:
+        return "<p><em>No evidence available.</em></p>"
+    return "".join(blocks)
+
+
 def _matrix_table_html(files: Sequence[str], matrix: Sequence[Sequence[float]]) -> str:
     n = len(files)
     if n == 0 or n != len(matrix):
@@ -186,6 +207,7 @@ def _write_site(
         pairs_for_page = _compute_overall_pairs(files, matrix, k=10)
 
     pairs_html = _pairs_table_html(pairs_for_page)
+    evidence_html = _evidence_html(payload.get("top_pairs") or [])
 
     if 0 < len(files) <= 20:
         matrix_html = _matrix_table_html(files, matrix)
@@ -228,6 +250,7 @@ def _write_site(
     pre {{ background: #f7f7f7; padding: 12px; border-radius: 10px; overflow: auto; }}
     code {{ background: #f4f4f4; padding: 2px 4px; border-radius: 4px; }}
     h1 {{ margin: 0 0 6px 0; }}
+    blockquote {{ margin: 4px 0 10px; padding: 6px 10px; border-left: 3px solid #d95f0e; background: #fff8f2; }}
   </style>
 </head>
 <body>
@@ -248,6 +271,10 @@ def _write_site(
   </p>
   {pairs_html}
 
+  <h2>Evidence</h2>
+  <p class="muted">Shared passages of the pairs above the threshold (character offsets in both files).</p>
+  {evidence_html}
+
   <h2>Matrix</h2>
   {matrix_html}
 
@@ -285,6 +312,14 @@ def main() -> int:
         action="store_true",
         help="Do not scan subfolders (used only if analyzer supports it)",
     )
+    ap.add_argument(
+        "--evidence-seconds",
+        type=float,
+        default=2.0,
+        help="Time budget per flagged pair for shared-passage evidence (0 = none)",
+    )
+    ap.add_argument("--cache-dir", default=None, help="Extracted-text cache folder")
+    ap.add_argument("--no-cache", action="store_true", help="Always re-extract PDF/DOCX text")
     ap.add_argument(
         "--clean-site",
         action="store_true",
@@ -308,7 +343,14 @@ def main() -> int:
     if "recursive" in sig.parameters:
         kwargs["recursive"] = not bool(args.no_recursive)
 
+    if "evidence_seconds" in sig.parameters:
+        kwargs["evidence_seconds"] = float(args.evidence_seconds)
+    if "cache" in sig.parameters and not args.no_cache:
+        kwargs["cache"] = ExtractionCache(Path(args.cache_dir) if args.cache_dir else default_cache_dir())
+
     result = analyze_folder(Path(args.input), **kwargs)
+    if kwargs.get("cache") is not None:
+        kwargs["cache"].close()
 
     report_json = out_dir / "report.json"
     report_md = out_dir / "report.md"
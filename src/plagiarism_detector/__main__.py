@@ -1,17 +1,28 @@
 from __future__ import annotations
 
 import argparse
+import json
+import sys
+import time
 from pathlib import Path
-from typing import List, Optional
-
-from .analyzer import analyze_folder
-from .reporting import (
-    save_heatmap_png,
-    save_json,
-    save_markdown,
-    save_similarity_histogram_png,
-    save_top_pairs_bar_png,
+from typing import Any, Dict, List, Optional
+
+from .cache import DEFAULT_MAX_BYTES, ExtractionCache, default_cache_dir
+from .charsim import SEQUENCE_BACKENDS
+from .instrumentation import profiled
+from .options import (
+    CANDIDATE_MODES,
+    DEFAULT_FEATURES,
+    DEFAULT_LCS_TOKENS,
+    DEFAULT_TIME_BUDGET,
+    DEFAULT_TOP_K,
+    LCS_MODES,
+    TFIDF_MODES,
 )
+from .preprocess import PreprocessConfig
+
+# Analysis modules (NumPy, SciPy) and plotting (matplotlib) are imported inside the commands that use
+# them, so that --help and argument errors return immediately and --no-plot never loads matplotlib.
 
 
 def parse_exts(value: Optional[str]) -> Optional[List[str]]:
@@ -24,43 +35,507 @@ def parse_exts(value: Optional[str]) -> Optional[List[str]]:
     return [p for p in parts if p]
 
 
+def add_preprocess_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--stop-words", action="store_true", help="Drop common English/Russian function words")
+    p.add_argument("--stem", action="store_true", help="Snowball stemming for English/Russian (needs snowballstemmer)")
+
+
+def preprocess_from_args(args: argparse.Namespace) -> PreprocessConfig:
+    return PreprocessConfig(stop_words=args.stop_words, stem=args.stem)
+
+
 def build_parser() -> argparse.ArgumentParser:
-    p = argparse.ArgumentParser(prog="plagiarism_detector")
+    p = argparse.ArgumentParser(
+        prog="plagiarism_detector",
+        epilog=(
+            "Reference archive: python -m plagiarism_detector index {build,update,query} --help; "
+            "analysis service: python -m plagiarism_detector serve --help; "
+            "many folders: python -m plagiarism_detector batch --help"
+        ),
+    )
     p.add_argument("--input", default="uploads", help="Folder with submissions (.txt/.pdf/.docx)")
     p.add_argument("--out", default="reports", help="Output folder")
     p.add_argument("--threshold", type=float, default=0.75, help="Suspicion threshold 0..1")
     p.add_argument("--no-plot", action="store_true", help="Disable heatmap PNG")
+    p.add_argument(
+        "--columnar",
+        action="store_true",
+        help="Also write a binary report (.npy arrays + manifest.json) to <out>/columnar",
+    )
     p.add_argument("--exts", default="", help="Comma-separated extensions, e.g. 'txt,pdf,docx' (empty = all)")
     p.add_argument("--no-recursive", action="store_true", help="Do not scan subfolders")
+    add_preprocess_args(p)
+    p.add_argument(
+        "--candidates",
+        choices=CANDIDATE_MODES,
+        default="exhaustive",
+        help="Pair selection: score every pair or only MinHash/LSH (or shared winnowing fingerprint) + TF-IDF candidates",
+    )
+    p.add_argument(
+        "--lcs-mode",
+        choices=LCS_MODES,
+        default="truncate",
+        help="LCS on long documents: align window by window over the whole text, or only compare the first "
+        f"{DEFAULT_LCS_TOKENS} tokens (default)",
+    )
+    p.add_argument(
+        "--tfidf-floor",
+        type=float,
+        default=None,
+        help="With --candidates lsh: also score pairs with TF-IDF cosine >= this (default: derived from threshold)",
+    )
+    p.add_argument(
+        "--tfidf-mode",
+        choices=TFIDF_MODES,
+        default="exact",
+        help="TF-IDF cosine: exact dense n x n matrix, or streaming hashed features with sparse top-k neighbours",
+    )
+    p.add_argument("--tfidf-features", type=int, default=DEFAULT_FEATURES, help="With --tfidf-mode hashed: feature width")
+    p.add_argument(
+        "--tfidf-top-k",
+        type=int,
+        default=DEFAULT_TOP_K,
+        help="With --tfidf-mode hashed: TF-IDF neighbours kept per file (also used as candidates)",
+    )
+    p.add_argument(
+        "--cascade",
+        action="store_true",
+        help="Skip remaining metrics for pairs that provably stay below the threshold / top-k (scores become lower bounds)",
+    )
+    p.add_argument(
+        "--sequence-backend",
+        choices=SEQUENCE_BACKENDS,
+        default="difflib",
+        help="Character similarity: exact difflib reference or fast k-gram matching blocks",
+    )
+    p.add_argument(
+        "--max-sequence-chars",
+        type=int,
+        default=None,
+        help="Compare at most this many leading characters per text in the sequence metric",
+    )
+    p.add_argument(
+        "--winnow-weight",
+        type=float,
+        default=0.0,
+        help="Weight of the winnowing containment metric (local copied passages); other weights are scaled to sum to 1",
+    )
+    p.add_argument(
+        "--evidence-seconds",
+        type=float,
+        default=DEFAULT_TIME_BUDGET,
+        help="Time budget per flagged pair for locating shared passages (0 = no evidence)",
+    )
+    p.add_argument("--workers", type=int, default=1, help="Processes for file reading and pair scoring (0 = all CPUs)")
+    p.add_argument("--cache-dir", default=None, help="Extracted-text cache folder (default: ~/.cache/plagiarism_detector)")
+    p.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Cache size limit in MB (least recently used entries are evicted)",
+    )
+    p.add_argument("--no-cache", action="store_true", help="Always re-extract PDF/DOCX text")
+    p.add_argument(
+        "--low-memory",
+        action="store_true",
+        help="Stream documents and keep only compact features; raw text is reloaded only for pairs near the threshold",
+    )
+    p.add_argument(
+        "--top-k",
+        type=int,
+        default=None,
+        help="Sparse result: keep only the top-k neighbours per file plus pairs >= --pair-floor (no dense matrix)",
+    )
+    p.add_argument("--pair-floor", type=float, default=None, help="With --top-k: also keep pairs >= this (default: threshold)")
+    p.add_argument(
+        "--state",
+        default=None,
+        help="Incremental state file (.npz): reuse pair metrics of unchanged files from the previous run, then update it",
+    )
+    p.add_argument(
+        "--corpus-store",
+        default=None,
+        help="Corpus store folder: keep token ids memory-mapped there and re-read only new or changed files",
+    )
+    p.add_argument("--metrics", action="store_true", help="Print per-stage timings, metric totals and the slowest pairs/files")
+    p.add_argument("--profile", default=None, help="Write a cProfile dump of the analysis to this file (pstats format)")
+    return p
+
+
+def print_metrics(metrics: Dict[str, Any]) -> None:
+    print(f"Timings (total {metrics['total_seconds']:.2f}s):")
+    for name, st in metrics["stages"].items():
+        print(f"  {name:<14} wall {st['wall_seconds']:>9.3f}s  cpu {st['cpu_seconds']:>9.3f}s")
+    for name, st in metrics["pair_metrics"].items():
+        print(f"  metric {name:<8} {st['calls']:>9} calls {st['seconds']:>9.3f}s")
+    for p in metrics["slowest_pairs"][:5]:
+        print(f"  slow pair: {p['a']} vs {p['b']} {p['seconds']:.3f}s")
+    for f in metrics["slowest_files"][:5]:
+        print(f"  slow file: {f['path']} {f['seconds']:.3f}s")
+
+
+def _cache_from_args(args: argparse.Namespace) -> Optional[ExtractionCache]:
+    if args.no_cache:
+        return None
+    cache_dir = Path(args.cache_dir) if args.cache_dir else default_cache_dir()
+    return ExtractionCache(cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+
+
+def build_index_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="plagiarism_detector index", description="Reference archive index")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (
+        ("build", "Build a new index from an archive folder"),
+        ("update", "Add new/changed archive files to an existing index (frozen vocabulary and IDF)"),
+    ):
+        c = sub.add_parser(name, help=help_text)
+        c.add_argument("--archive", required=True, help="Folder with past submissions")
+        c.add_argument("--exts", default="", help="Comma-separated extensions (empty = all)")
+        c.add_argument("--no-recursive", action="store_true", help="Do not scan subfolders")
+        if name == "build":
+            c.add_argument("--no-texts", action="store_true", help="Do not store texts (sequence metric estimated by LCS)")
+            add_preprocess_args(c)
+
+    q = sub.add_parser("query", help="Find the best archive matches of every file in a folder")
+    q.add_argument("--input", default="uploads", help="Folder with new submissions")
+    q.add_argument("--out", default="reports", help="Output folder (index_matches.json)")
+    q.add_argument("--top", type=int, default=5, help="Matches kept per file")
+    q.add_argument("--candidates", type=int, default=50, help="Archive files scored per query file (by TF-IDF cosine)")
+    q.add_argument("--threshold", type=float, default=0.0, help="Only report matches with score >= this")
+    q.add_argument("--exts", default="", help="Comma-separated extensions (empty = all)")
+    q.add_argument("--no-recursive", action="store_true", help="Do not scan subfolders")
+    q.add_argument("--sequence-backend", choices=SEQUENCE_BACKENDS, default="difflib", help="Character similarity backend")
+
+    for c in sub.choices.values():
+        c.add_argument("--index", required=True, help="Index folder")
+        c.add_argument("--cache-dir", default=None, help="Extracted-text cache folder")
+        c.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help="Cache size limit in MB")
+        c.add_argument("--no-cache", action="store_true", help="Always re-extract PDF/DOCX text")
     return p
 
 
-def main() -> int:
-    args = build_parser().parse_args()
+def index_main(argv: List[str]) -> int:
+    args = build_index_parser().parse_args(argv)
+    from .index import ReferenceIndex, build_index, query_index, update_index
+    from .readers import read_folder_detailed
+    from .similarity import SimilarityConfig
+
+    cache = _cache_from_args(args)
     exts = parse_exts(args.exts)
+    recursive = not args.no_recursive
 
-    out_dir = Path(args.out)
-    out_dir.mkdir(parents=True, exist_ok=True)
+    if args.command == "build":
+        t0 = time.perf_counter()
+        stats = build_index(
+            Path(args.archive),
+            Path(args.index),
+            preprocess_cfg=preprocess_from_args(args),
+            exts=exts,
+            recursive=recursive,
+            cache=cache,
+            store_texts=not args.no_texts,
+        )
+        print(f"Indexed: {stats['documents_added']} files in {time.perf_counter() - t0:.1f}s -> {args.index}")
+    elif args.command == "update":
+        stats = update_index(Path(args.archive), Path(args.index), exts=exts, recursive=recursive, cache=cache)
+        print(
+            f"Index updated: {stats['documents_added']} added, {stats['documents_replaced']} replaced, "
+            f"{stats['documents_unchanged']} unchanged"
+        )
+    else:
+        t0 = time.perf_counter()
+        index = ReferenceIndex.open(Path(args.index))
+        print(f"Index opened in {time.perf_counter() - t0:.3f}s ({len(index)} files)")
+        read = read_folder_detailed(Path(args.input), exts=exts, recursive=recursive, cache=cache)
+        result = query_index(
+            index,
+            read.documents,
+            top=args.top,
+            candidates=args.candidates,
+            threshold=args.threshold,
+            sim_cfg=SimilarityConfig(sequence_backend=args.sequence_backend),
+        )
+        out_dir = Path(args.out)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        path = out_dir / "index_matches.json"
+        path.write_text(json.dumps(result.to_json(), ensure_ascii=False, indent=2), encoding="utf-8")
+        for f, matches in zip(result.files, result.matches):
+            best = f"{matches[0]['b']} ({matches[0]['score']:.3f})" if matches else "none"
+            print(f"- {f}: best archive match {best}")
+        print(f"Saved: {path}")
+        stats = {"failures": [str(f.path) for f in read.failures]}
+
+    for failed in stats.get("failures", []):
+        print(f"Failed to read: {failed}")
+    if cache is not None:
+        cache.close()
+    return 0
 
-    result = analyze_folder(
-        Path(args.input),
+
+def build_serve_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="plagiarism_detector serve",
+        description="Local HTTP/JSON service with a warm in-memory corpus (see docs/usage.en.md)",
+    )
+    p.add_argument("--input", default=None, help="Folder preloaded into the corpus (default: start empty)")
+    p.add_argument("--exts", default="", help="Comma-separated extensions (empty = all)")
+    p.add_argument("--no-recursive", action="store_true", help="Do not scan subfolders")
+    p.add_argument("--host", default="127.0.0.1", help="Address to bind (default: local only)")
+    p.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    p.add_argument("--max-docs", type=int, default=None, help="Keep at most this many documents (oldest are evicted)")
+    p.add_argument("--max-mb", type=int, default=None, help="Approximate memory bound of the corpus in MB")
+    p.add_argument("--no-texts", action="store_true", help="Do not keep texts (sequence metric estimated by LCS)")
+    p.add_argument("--candidates", type=int, default=50, help="Documents scored per query (by TF-IDF cosine) plus LSH mates")
+    p.add_argument(
+        "--min-score",
+        type=float,
+        default=0.5,
+        help="Default match cut for queries; lower values align more candidates (0 = exact top list, slowest)",
+    )
+    p.add_argument(
+        "--sequence-backend",
+        choices=SEQUENCE_BACKENDS,
+        default="blocks",
+        help="Character similarity backend (blocks keeps query latency low)",
+    )
+    p.add_argument("--winnow-weight", type=float, default=0.0, help="Weight of the winnowing containment metric")
+    p.add_argument("--max-concurrent", type=int, default=8, help="Requests processed at once (others get 503)")
+    p.add_argument("--workers", type=int, default=1, help="Processes for pair scoring in GET /result (0 = all CPUs)")
+    p.add_argument("--quiet", action="store_true", help="Do not log requests")
+    p.add_argument("--cache-dir", default=None, help="Extracted-text cache folder")
+    p.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help="Cache size limit in MB")
+    p.add_argument("--no-cache", action="store_true", help="Always re-extract PDF/DOCX text")
+    return p
+
+
+def serve_main(argv: List[str]) -> int:
+    args = build_serve_parser().parse_args(argv)
+    from .server import AnalysisServer, WarmCorpus
+    from .similarity import SimilarityConfig
+
+    weights = SimilarityConfig().weights
+    if args.winnow_weight > 0:
+        weights = tuple(w * (1.0 - args.winnow_weight) for w in weights) + (args.winnow_weight,)
+    corpus = WarmCorpus(
+        sim_cfg=SimilarityConfig(weights=weights, sequence_backend=args.sequence_backend),
+        max_docs=args.max_docs,
+        max_bytes=args.max_mb * 1024 * 1024 if args.max_mb else None,
+        store_texts=not args.no_texts,
+        candidates=args.candidates,
+        min_score=args.min_score,
+        workers=args.workers,
+    )
+    if args.input:
+        cache = _cache_from_args(args)
+        t0 = time.perf_counter()
+        read = corpus.add_folder(Path(args.input), exts=parse_exts(args.exts), recursive=not args.no_recursive, cache=cache)
+        if cache is not None:
+            cache.close()
+        print(f"Loaded: {len(corpus)} files in {time.perf_counter() - t0:.1f}s")
+        for failed in read.failures:
+            print(f"Failed to read: {failed.path} ({failed.error})")
+
+    server = AnalysisServer(corpus, (args.host, args.port), max_concurrent=args.max_concurrent, quiet=args.quiet)
+    host, port = server.server_address[:2]
+    print(f"Serving on http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def build_batch_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="plagiarism_detector batch",
+        description="Analyze many folders concurrently under one CPU budget; unchanged folders are skipped",
+    )
+    p.add_argument("--manifest", required=True, help="Folders to analyze: one per line, or a JSON list")
+    p.add_argument("--out", default="reports", help="Output root: one report folder per input folder")
+    p.add_argument("--cpu-budget", type=int, default=0, help="Processes analyzing at once over all jobs (0 = all CPUs)")
+    p.add_argument("--workers", type=int, default=1, help="Processes per job for pair scoring")
+    p.add_argument("--io-workers", type=int, default=4, help="Threads reading folders ahead of the analyses")
+    p.add_argument("--force", action="store_true", help="Re-run every job even if its inputs and settings are unchanged")
+    p.add_argument("--threshold", type=float, default=0.75, help="Suspicion threshold 0..1 (a manifest entry may override it)")
+    p.add_argument("--no-plot", action="store_true", help="Disable PNG reports")
+    p.add_argument("--exts", default="", help="Comma-separated extensions (empty = all)")
+    p.add_argument("--no-recursive", action="store_true", help="Do not scan subfolders")
+    p.add_argument("--candidates", choices=CANDIDATE_MODES, default="exhaustive", help="Pair selection (see main --help)")
+    p.add_argument("--sequence-backend", choices=SEQUENCE_BACKENDS, default="difflib", help="Character similarity backend")
+    p.add_argument("--tfidf-mode", choices=TFIDF_MODES, default="exact", help="TF-IDF cosine: exact or hashed")
+    p.add_argument("--evidence-seconds", type=float, default=DEFAULT_TIME_BUDGET, help="Evidence time budget per flagged pair")
+    p.add_argument("--cache-dir", default=None, help="Extracted-text cache folder")
+    p.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help="Cache size limit in MB")
+    p.add_argument("--no-cache", action="store_true", help="Always re-extract PDF/DOCX text")
+    return p
+
+
+def batch_main(argv: List[str]) -> int:
+    args = build_batch_parser().parse_args(argv)
+    import asyncio
+
+    from .batch import STATE_FILE, SUMMARY_FILE, BatchSettings, JobReport, load_manifest, run_batch, summary_json
+    from .similarity import SimilarityConfig
+
+    out_root = Path(args.out)
+    jobs = load_manifest(Path(args.manifest), out_root)
+    settings = BatchSettings(
         threshold=args.threshold,
-        exts=exts,
+        sim_cfg=SimilarityConfig(
+            candidate_mode=args.candidates, sequence_backend=args.sequence_backend, tfidf_mode=args.tfidf_mode
+        ),
+        exts=parse_exts(args.exts),
         recursive=not args.no_recursive,
+        evidence_seconds=args.evidence_seconds,
+        plots=not args.no_plot,
+    )
+    cache = _cache_from_args(args)
+    finished = 0
+
+    def on_done(r: JobReport) -> None:
+        nonlocal finished
+        finished += 1
+        detail = r.error if r.status == "failed" else f"{r.files} files"
+        if r.status == "done":
+            sec = r.seconds
+            detail += f", read {sec['read']:.1f}s, wait {sec['wait']:.1f}s, analyze {sec['analyze']:.1f}s"
+        print(f"[{finished}/{len(jobs)}] {r.status:<7} {r.input}: {detail}", flush=True)
+
+    t0 = time.perf_counter()
+    reports = asyncio.run(
+        run_batch(
+            jobs,
+            settings,
+            cpu_budget=args.cpu_budget or None,
+            workers_per_job=args.workers,
+            io_workers=args.io_workers,
+            state_path=out_root / STATE_FILE,
+            force=args.force,
+            cache=cache,
+            on_done=on_done,
+        )
+    )
+    if cache is not None:
+        cache.close()
+    summary = summary_json(reports, time.perf_counter() - t0)
+    out_root.mkdir(parents=True, exist_ok=True)
+    (out_root / SUMMARY_FILE).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    ran = sorted((r for r in reports if r.status == "done"), key=lambda r: r.seconds["total"], reverse=True)
+    if ran:
+        print(f"{'job':<40} {'files':>6} {'read':>8} {'wait':>8} {'analyze':>8} {'write':>8} {'total':>8}")
+        for r in ran:
+            sec = r.seconds
+            print(
+                f"{Path(r.input).name[:40]:<40} {r.files:>6} {sec['read']:>8.2f} {sec['wait']:>8.2f} "
+                f"{sec['analyze']:>8.2f} {sec['write']:>8.2f} {sec['total']:>8.2f}"
+            )
+    counts = summary["counts"]
+    print(
+        f"Batch: {counts['done']} done, {counts['skipped']} skipped, {counts['failed']} failed "
+        f"in {summary['seconds']:.1f}s -> {out_root / SUMMARY_FILE}"
     )
+    return 1 if counts["failed"] else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "index":
+        return index_main(argv[1:])
+    if argv and argv[0] == "serve":
+        return serve_main(argv[1:])
+    if argv and argv[0] == "batch":
+        return batch_main(argv[1:])
+    args = build_parser().parse_args(argv)
+    from .analyzer import analyze_folder
+    from .reporting import save_columnar, save_json, save_markdown
+    from .similarity import SimilarityConfig
+
+    exts = parse_exts(args.exts)
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    cache = _cache_from_args(args)
+
+    weights = SimilarityConfig().weights
+    if args.winnow_weight > 0:
+        weights = tuple(w * (1.0 - args.winnow_weight) for w in weights) + (args.winnow_weight,)
+
+    sim_cfg = SimilarityConfig(
+        weights=weights,
+        candidate_mode=args.candidates,
+        candidate_tfidf_floor=args.tfidf_floor,
+        lcs_mode=args.lcs_mode,
+        sequence_backend=args.sequence_backend,
+        max_sequence_chars=args.max_sequence_chars,
+        cascade=args.cascade,
+        tfidf_mode=args.tfidf_mode,
+        tfidf_features=args.tfidf_features,
+        tfidf_top_k=args.tfidf_top_k,
+    )
+
+    with profiled(Path(args.profile) if args.profile else None):
+        result = analyze_folder(
+            Path(args.input),
+            threshold=args.threshold,
+            preprocess_cfg=preprocess_from_args(args),
+            sim_cfg=sim_cfg,
+            exts=exts,
+            recursive=not args.no_recursive,
+            workers=args.workers,
+            cache=cache,
+            state_path=Path(args.state) if args.state else None,
+            low_memory=args.low_memory,
+            top_k=args.top_k,
+            pair_floor=args.pair_floor,
+            evidence_seconds=args.evidence_seconds,
+            corpus_store=Path(args.corpus_store) if args.corpus_store else None,
+        )
+    if cache is not None:
+        cache.close()
 
     save_json(result, out_dir / "report.json")
     save_markdown(result, out_dir / "report.md")
+    if args.columnar:
+        save_columnar(result, out_dir / "columnar")
     if not args.no_plot:
+        from .reporting import save_heatmap_png, save_similarity_histogram_png, save_top_pairs_bar_png
+
         save_heatmap_png(result, out_dir / "heatmap.png")
         save_similarity_histogram_png(result, out_dir / "similarity_hist.png")
         save_top_pairs_bar_png(result, out_dir / "top_pairs.png")
 
     print(f"Files: {len(result.files)}")
+    for f in result.config["reader"]["failures"]:
+        print(f"Failed to read: {f['path']} ({f['error']})")
+    cand = result.config.get("candidates")
+    if cand:
+        print(f"Candidate pairs scored: {cand['pairs_scored']}/{cand['pairs_total']}")
+    casc = result.config.get("cascade")
+    if casc:
+        print(
+            f"Cascade: {casc['pairs_bounded']}/{casc['pairs_evaluated']} pairs bounded, "
+            f"{casc['evaluations_saved']}/{casc['evaluations_total']} metric evaluations saved"
+        )
+    inc = result.config.get("incremental")
+    if inc:
+        print(f"Incremental: {inc['pairs_reused']} pairs reused, {inc['pairs_scored']} scored")
+    if cache is not None and (cache.stats.hits or cache.stats.misses):
+        print(f"Extraction cache: {cache.stats.hits} hits, {cache.stats.misses} misses")
     print(f"Saved: {out_dir / 'report.json'}")
     print(f"Saved: {out_dir / 'report.md'}")
+    if args.columnar:
+        print(f"Saved: {out_dir / 'columnar' / 'manifest.json'}")
     if not args.no_plot:
         print(f"Saved: {out_dir / 'heatmap.png'}")
+    if args.profile:
+        print(f"Saved: {args.profile}")
+    if args.metrics and result.metrics:
+        print_metrics(result.metrics)
 
     if result.top_pairs:
         print("Top pairs:")
@@ -78,12 +553,16 @@ def main() -> int:
                 details.append(f"ngram={float(p['ngram']):.3f}")
             if "lcs" in p:
                 details.append(f"lcs={float(p['lcs']):.3f}")
+            if "winnow" in p:
+                details.append(f"winnow={float(p['winnow']):.3f}")
 
             details_str = ", ".join(details)
             if details_str:
                 print(f"- {a} vs {b}: {score:.3f} ({details_str})")
             else:
                 print(f"- {a} vs {b}: {score:.3f}")
+            if p.get("evidence", {}).get("spans"):
+                print(f"  shared passages: {len(p['evidence']['spans'])}")
     else:
         print("Top pairs: none (folder empty or below threshold)")
 
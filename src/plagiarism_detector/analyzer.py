@@ -1,21 +1,54 @@
 from __future__ import annotations
 
+import hashlib
+import heapq
+import itertools
+import math
+import time
 from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
 import numpy as np
+from scipy import sparse
 
-from .preprocess import PreprocessConfig, detokenize, tokenize
-from .readers import read_folder
+from .cache import ExtractionCache
+from .candidates import (
+    lossless_tfidf_floor,
+    lsh_candidate_pairs,
+    minhash_permutations,
+    minhash_signature_from_keys,
+    tfidf_candidate_pairs,
+)
+from .evidence import attach_evidence
+from .hashed_tfidf import HashedTfidf, SparseCosine, TfidfLookup, cosine_topk
+from .instrumentation import SLOWEST, PairTimings, StageTimer
+from .incremental import (
+    AnalysisState,
+    document_fingerprint,
+    iter_reused,
+    load_state,
+    metric_config_key,
+    reusable_pairs,
+    save_state,
+)
+from .options import CANDIDATE_MODES, DEFAULT_TIME_BUDGET, TFIDF_MODES
+from .parallel import PairScoringState, resolve_workers, score_all_pairs
+from .preprocess import PreprocessConfig, iter_tokens, tokenize
+from .readers import Document, FolderReadResult, LazyTexts, ReadFailure, iter_text, list_folder, read_folder_detailed
 from .similarity import (
     SimilarityConfig,
-    cosine_tfidf_matrix,
-    lcs_similarity,
-    ngram_jaccard,
-    sequence_ratio,
+    cosine_tfidf_matrix_from_ids,
+    ngram_jaccard_sparse,
+    ngram_key_set,
+    split_weights,
 )
+from .sparse import SparseAccumulator, SparsePairs, condensed_index
+from .store import CorpusStore, StoreTexts, sync_corpus_store
+from .vocab import TokenIds, Vocabulary
+from .winnowing import WinnowIndex, containment
+from .winnowing import fingerprints as winnow_fingerprints
 
 
 @dataclass(frozen=True)
@@ -26,6 +59,150 @@ class AnalysisResult:
     top_pairs: List[Dict[str, Any]]
     threshold: float
     config: Dict[str, Any]
+    # Sparse mode (top_k set): similarity_matrix is empty and the kept pairs live here
+    sparse_pairs: Optional[SparsePairs] = None
+    # Cascade mode: sorted condensed indices (sparse.condensed_index) of pairs whose score is only a
+    # lower bound, because the remaining metrics could not lift them to the threshold / top-k
+    bounded_pairs: Optional[np.ndarray] = None
+    # Instrumentation: wall/CPU seconds per stage, per-metric calls and seconds, slowest pairs and files
+    metrics: Optional[Dict[str, Any]] = None
+
+
+class _ScoreSink:
+    # Pair scores: dense n x n matrix, or (sparse mode) a SparseAccumulator keeping top-k and floor pairs
+    def __init__(self, n: int, *, top_k: Optional[int], floor: float) -> None:
+        self.sparse: Optional[SparseAccumulator] = None
+        if top_k is not None:
+            self.sparse = SparseAccumulator(n, top_k=top_k, floor=floor)
+        else:
+            self.values = np.zeros((n, n), dtype=float)
+            np.fill_diagonal(self.values, 1.0)
+
+    def set(self, i: int, j: int, score: float) -> None:
+        if self.sparse is not None:
+            self.sparse.add(i, j, score)
+        else:
+            self.values[i, j] = score
+            self.values[j, i] = score
+
+    def set_row(self, i: int, cols: np.ndarray, scores: np.ndarray) -> None:
+        # Pairs (i, j) for all j in cols, every j > i
+        if self.sparse is not None:
+            self.sparse.add_row(i, cols, scores)
+        else:
+            self.values[i, cols] = scores
+            self.values[cols, i] = scores
+
+
+def _tfidf_pairs(tfidf: TfidfLookup, floor: float) -> Set[Tuple[int, int]]:
+    if isinstance(tfidf, SparseCosine):
+        return tfidf.pairs(floor)
+    return tfidf_candidate_pairs(tfidf, floor=floor)
+
+
+def _candidate_pairs(
+    ngram_sets: List[np.ndarray],
+    tfidf: TfidfLookup,
+    *,
+    threshold: float,
+    sim_cfg: SimilarityConfig,
+) -> Tuple[Set[Tuple[int, int]], List[np.ndarray], Dict[str, Any]]:
+    perms = minhash_permutations(sim_cfg.minhash_num_perm)
+    signatures = [minhash_signature_from_keys(keys, perms) for keys in ngram_sets]
+    lsh_pairs = lsh_candidate_pairs(signatures, bands=sim_cfg.lsh_bands)
+
+    floor = sim_cfg.candidate_tfidf_floor
+    if floor is None:
+        floor = lossless_tfidf_floor(threshold, sim_cfg.weights)
+    tfidf_pairs = _tfidf_pairs(tfidf, floor)
+
+    n = len(ngram_sets)
+    pairs = lsh_pairs | tfidf_pairs
+    stats = {
+        "mode": "lsh",
+        "pairs_total": n * (n - 1) // 2,
+        "pairs_scored": len(pairs),
+        "pairs_lsh": len(lsh_pairs),
+        "pairs_tfidf_floor": len(tfidf_pairs),
+        "tfidf_floor": round(float(floor), 6),
+    }
+    return pairs, signatures, stats
+
+
+def _winnow_candidate_pairs(
+    shared: sparse.csr_matrix,
+    tfidf: TfidfLookup,
+    *,
+    threshold: float,
+    sim_cfg: SimilarityConfig,
+) -> Tuple[Set[Tuple[int, int]], Dict[str, Any]]:
+    # Pairs sharing at least one winnowing fingerprint (a common run of winnow_k + winnow_window - 1
+    # tokens) plus the lossless TF-IDF floor, which keeps heavily paraphrased pairs
+    upper = sparse.triu(shared, k=1).tocoo()
+    winnow_pairs = set(zip(upper.row.tolist(), upper.col.tolist()))
+
+    floor = sim_cfg.candidate_tfidf_floor
+    if floor is None:
+        floor = lossless_tfidf_floor(threshold, sim_cfg.weights)
+    tfidf_pairs = _tfidf_pairs(tfidf, floor)
+
+    n = tfidf.shape[0]
+    pairs = winnow_pairs | tfidf_pairs
+    stats = {
+        "mode": "winnow",
+        "pairs_total": n * (n - 1) // 2,
+        "pairs_scored": len(pairs),
+        "pairs_winnow": len(winnow_pairs),
+        "pairs_tfidf_floor": len(tfidf_pairs),
+        "tfidf_floor": round(float(floor), 6),
+    }
+    return pairs, stats
+
+
+def _metrics_json(
+    timer: StageTimer,
+    pair_timings: PairTimings,
+    read: FolderReadResult,
+    files: List[str],
+    token_ids: List[TokenIds],
+    text_lengths: List[int],
+) -> Dict[str, Any]:
+    by_type: Dict[str, Dict[str, Any]] = {}
+    for path, seconds in read.seconds.items():
+        st = by_type.setdefault(Path(path).suffix.lower(), {"files": 0, "seconds": 0.0})
+        st["files"] += 1
+        st["seconds"] += seconds
+    return {
+        **timer.to_json(),
+        **pair_timings.to_json(files),
+        "slowest_files": [{"path": p, "seconds": round(t, 6)} for p, t in read.slowest(SLOWEST)],
+        "read_by_type": {k: {"files": v["files"], "seconds": round(v["seconds"], 6)} for k, v in sorted(by_type.items())},
+        "counters": {
+            "files": len(files),
+            "read_failures": len(read.failures),
+            "characters": int(sum(text_lengths)),
+            "tokens": int(sum(len(ids) for ids in token_ids)),
+            "pairs_scored": 0,
+        },
+    }
+
+
+def _stream_document(
+    path: Path, cfg: PreprocessConfig, vocab: Vocabulary, cache: Optional[ExtractionCache]
+) -> Tuple[TokenIds, int, str]:
+    # Token ids, character count and text fingerprint of one file, interned as its pieces are read
+    digest = hashlib.sha256()
+    chars = 0
+
+    def pieces() -> Iterator[str]:
+        nonlocal chars
+        for piece in iter_text(path, cache=cache):
+            chars += len(piece)
+            digest.update(piece.encode("utf-8", errors="surrogatepass"))
+            yield piece
+
+    ids = vocab.intern(tok for tok, _, _ in iter_tokens(pieces(), cfg))
+    return ids, chars, digest.hexdigest()
 
 
 def analyze_folder(
@@ -36,18 +213,137 @@ def analyze_folder(
     sim_cfg: SimilarityConfig = SimilarityConfig(),
     exts: Optional[Iterable[str]] = None,
     recursive: bool = True,
+    workers: int = 1,
+    cache: Optional[ExtractionCache] = None,
+    state_path: Optional[Path] = None,
+    low_memory: bool = False,
+    top_k: Optional[int] = None,
+    pair_floor: Optional[float] = None,
+    evidence_seconds: float = DEFAULT_TIME_BUDGET,
+    documents: Optional[Union[Sequence[Document], FolderReadResult]] = None,
+    corpus_store: Optional[Path] = None,
 ) -> AnalysisResult:
-    docs = read_folder(Path(folder), exts=exts, recursive=recursive)
-    files = [d.name for d in docs]
+    # evidence_seconds: per-pair time budget for the matched-span evidence of top_pairs (0 = no evidence).
+    # low_memory: stream documents one at a time, keep only compact features (token ids, n-gram keys,
+    # fingerprint) and reload raw text on demand for pairs that may reach the threshold.
+    # documents: analyze these already-read documents instead of reading `folder` (serve, batch); a
+    # FolderReadResult keeps its read failures and timings in the report.
+    # corpus_store: sync the folder into this store directory (store.sync_corpus_store) and analyze its
+    # memory-mapped token ids; unchanged files are neither read nor tokenized again.
+    timer = StageTimer()
+    streamed: List[Path] = []
+    store: Optional[CorpusStore] = None
+    store_rows: List[int] = []
+    store_counts: Dict[str, int] = {}
+    if corpus_store is not None:
+        if documents is not None:
+            raise ValueError("corpus_store reads the folder itself and cannot be used with documents")
+        with timer.stage("read"):
+            store, store_rows, read, store_counts = sync_corpus_store(
+                Path(corpus_store),
+                Path(folder),
+                preprocess_cfg=preprocess_cfg,
+                exts=exts,
+                recursive=recursive,
+                cache=cache,
+                workers=resolve_workers(workers),
+            )
+        doc_iter = iter(())
+    elif documents is not None:
+        if low_memory:
+            raise ValueError("low_memory reloads texts from files and cannot be used with documents")
+        read = documents if isinstance(documents, FolderReadResult) else FolderReadResult(documents=list(documents))
+        doc_iter = iter(read.documents)
+    elif low_memory:
+        read = FolderReadResult()
+        doc_iter = iter(())
+        streamed = list_folder(Path(folder), exts=exts, recursive=recursive)
+    else:
+        with timer.stage("read"):
+            read = read_folder_detailed(
+                Path(folder),
+                exts=exts,
+                recursive=recursive,
+                cache=cache,
+                workers=resolve_workers(workers),
+            )
+        doc_iter = iter(read.documents)
+
+    if sim_cfg.tfidf_mode not in TFIDF_MODES:
+        raise ValueError(f"Unknown tfidf_mode: {sim_cfg.tfidf_mode!r} (expected one of {TFIDF_MODES})")
+    # Hashed TF-IDF is accumulated while documents stream in (fixed width, no n-gram vocabulary)
+    hashed: Optional[HashedTfidf] = None
+    if sim_cfg.tfidf_mode == "hashed":
+        hashed = HashedTfidf(n_features=sim_cfg.tfidf_features, ngram_range=sim_cfg.tfidf_ngram_range)
+
+    # Tokens are interned once; every metric works on the int32 id arrays
+    vocab = Vocabulary()
+    files: List[str] = []
+    paths: List[Path] = []
+    token_ids: List[TokenIds] = []
+    fingerprints: List[str] = []
+    original_texts: List[str] = []
+    text_lengths: List[int] = []
+    if store is not None:
+        # Zero-copy views into the store's token array: forked scoring workers share the same pages
+        for r in store_rows:
+            name = store.name(r)
+            files.append(Path(name).name)
+            paths.append(Path(folder) / name)
+            text_lengths.append(store.chars(r))
+            token_ids.append(store.token_ids(r))
+            if hashed is not None:
+                hashed.add(token_ids[-1])
+            if state_path is not None:
+                fingerprints.append(store.fingerprint(r))
+    for path in streamed:
+        # low_memory: read and tokenized piece by piece (PDF page by page), no text is held whole
+        t0 = time.perf_counter()
+        with timer.stage("tokenize"):
+            try:
+                ids, chars, fingerprint = _stream_document(path, preprocess_cfg, vocab, cache)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                read.failures.append(ReadFailure(name=path.name, path=path, error=f"{type(e).__name__}: {e}"))
+                continue
+            files.append(path.name)
+            paths.append(path)
+            text_lengths.append(chars)
+            token_ids.append(ids)
+            if hashed is not None:
+                hashed.add(ids)
+            if state_path is not None:
+                fingerprints.append(fingerprint)
+        read.seconds[str(path)] = time.perf_counter() - t0
+    for d in timer.timed(doc_iter, "read"):
+        with timer.stage("tokenize"):
+            files.append(d.name)
+            paths.append(d.path)
+            text_lengths.append(len(d.text))
+            token_ids.append(vocab.intern(tokenize(d.text, preprocess_cfg)))
+            if hashed is not None:
+                hashed.add(token_ids[-1])
+            if state_path is not None:
+                fingerprints.append(document_fingerprint(d.text))
+            original_texts.append(d.text)
     created = datetime.now(timezone.utc).isoformat(timespec="seconds")
 
     cfg_dump: Dict[str, Any] = {
         "preprocess": asdict(preprocess_cfg),
         "similarity": asdict(sim_cfg),
-        "reader": {"exts": list(exts) if exts is not None else None, "recursive": recursive},
+        "reader": {
+            "exts": list(exts) if exts is not None else None,
+            "recursive": recursive,
+            "cache": cache.describe() if cache is not None else None,
+            "failures": [{"name": f.name, "path": str(f.path), "error": f.error} for f in read.failures],
+            "slowest_files": [{"path": p, "seconds": round(t, 6)} for p, t in read.slowest(10)],
+        },
+        "workers": resolve_workers(workers),
+        "low_memory": low_memory,
+        "corpus_store": None if store is None else {**store.describe(), **store_counts},
+        "sparse": None if top_k is None else {"top_k": top_k, "floor": threshold if pair_floor is None else pair_floor},
     }
 
-    if not docs:
+    if not files:
         return AnalysisResult(
             created_at_utc=created,
             files=[],
@@ -55,55 +351,236 @@ def analyze_folder(
             top_pairs=[],
             threshold=float(threshold),
             config=cfg_dump,
+            metrics=_metrics_json(timer, PairTimings(), read, files, token_ids, text_lengths),
         )
 
-    tokens = [tokenize(d.text, preprocess_cfg) for d in docs]
-    texts_for_tfidf = [detokenize(t) for t in tokens]
-    original_texts = [d.text for d in docs]
+    vocab_size = store.vocab_size if store is not None else len(vocab)
+    with timer.stage("ngram_keys"):
+        ngram_sets = [ngram_key_set(ids, sim_cfg.ngram_n, vocab_size) for ids in token_ids]
+    texts: Sequence[str]
+    if low_memory:
+        texts = LazyTexts(paths, cache=cache)
+    elif store is not None:
+        texts = StoreTexts(store, store_rows)
+    else:
+        texts = original_texts
+
+    floor = threshold if pair_floor is None else pair_floor
+    tfidf: TfidfLookup
+    with timer.stage("tfidf"):
+        if hashed is not None:
+            # Only top-k neighbours and pairs that could still reach the threshold (or the sparse floor) are kept
+            tfidf_floor = sim_cfg.candidate_tfidf_floor
+            if tfidf_floor is None:
+                tfidf_floor = lossless_tfidf_floor(min(threshold, floor), sim_cfg.weights)
+            tfidf = cosine_topk(hashed.matrix(), top_k=sim_cfg.tfidf_top_k, floor=tfidf_floor)
+            cfg_dump["tfidf"] = {"mode": "hashed", "floor": round(float(tfidf_floor), 6), "pairs_kept": len(tfidf)}
+        else:
+            tfidf = cosine_tfidf_matrix_from_ids(token_ids, vocab_size, ngram_range=sim_cfg.tfidf_ngram_range)
+    n = len(files)
+
+    w_tfidf, w_seq, w_ng, w_lcs, w_win = split_weights(sim_cfg.weights)
+    # Winnowing fingerprints: shared-fingerprint counts for all pairs from one sparse product. Needed for
+    # the 5th (winnow containment) weight and for the "winnow" candidate mode.
+    winnow_shared: Optional[sparse.csr_matrix] = None
+    winnow_sizes: Optional[np.ndarray] = None
+    if w_win > 0 or sim_cfg.candidate_mode == "winnow":
+        k, window = sim_cfg.winnow_k, sim_cfg.winnow_window
+        with timer.stage("winnow"):
+            winnow_index = WinnowIndex([winnow_fingerprints(ids, k=k, window=window) for ids in token_ids], k=k, window=window)
+            winnow_shared, winnow_sizes = winnow_index.shared_counts()
+
+    if sim_cfg.candidate_mode not in CANDIDATE_MODES:
+        raise ValueError(f"Unknown candidate_mode: {sim_cfg.candidate_mode!r} (expected one of {CANDIDATE_MODES})")
+
+    # Incremental mode: reuse per-pair metrics of unchanged documents from the previous run's state file
+    reused: Dict[Tuple[int, int], Tuple[float, float, float]] = {}
+    new_state: Optional[AnalysisState] = None
+    if state_path is not None:
+        with timer.stage("incremental"):
+            config_key = metric_config_key(preprocess_cfg, sim_cfg)
+            reused, cfg_dump["incremental"] = reusable_pairs(load_state(state_path), files, fingerprints, config_key)
+            cfg_dump["incremental"]["state"] = str(state_path)
+            new_state = AnalysisState(config_key=config_key, files=files, fingerprints=fingerprints)
 
-    tfidf = cosine_tfidf_matrix(texts_for_tfidf, ngram_range=sim_cfg.tfidf_ngram_range)
-    n = len(docs)
+    candidates: Optional[Set[Tuple[int, int]]] = None
+    signatures: List[np.ndarray] = []
+    with timer.stage("candidates"):
+        if sim_cfg.candidate_mode == "lsh":
+            candidates, signatures, cfg_dump["candidates"] = _candidate_pairs(
+                ngram_sets, tfidf, threshold=threshold, sim_cfg=sim_cfg
+            )
+        elif sim_cfg.candidate_mode == "winnow":
+            assert winnow_shared is not None
+            candidates, cfg_dump["candidates"] = _winnow_candidate_pairs(
+                winnow_shared, tfidf, threshold=threshold, sim_cfg=sim_cfg
+            )
 
-    w_tfidf, w_seq, w_ng, w_lcs = sim_cfg.weights
-    mat = np.zeros((n, n), dtype=float)
-    np.fill_diagonal(mat, 1.0)
+    # All-pairs n-gram Jaccard from one sparse product (candidate pairs only in candidate mode); low_memory
+    # keeps per-pair set intersections, since the product can hold up to n^2 entries when many documents
+    # share boilerplate
+    with timer.stage("ngram_jaccard"):
+        ngram_jaccard, ngram_sizes = (None, None) if low_memory else ngram_jaccard_sparse(ngram_sets, pairs=candidates)
+
+    def win_row(i: int) -> Optional[np.ndarray]:
+        if w_win <= 0 or winnow_shared is None or winnow_sizes is None:
+            return None
+        return containment(winnow_shared, winnow_sizes, i)
+
+    sink = _ScoreSink(n, top_k=top_k, floor=floor)
+    # Pairs that must be scored exactly: >= threshold (top_pairs) and, in sparse mode, >= floor
+    cascade_cut = min(threshold, floor) if top_k is not None else threshold
 
     # Collect per-pair breakdown only for top pairs (avoid huge JSON)
     breakdown_candidates: List[Dict[str, Any]] = []
 
-    for i in range(n):
-        for j in range(i + 1, n):
+    if candidates is not None:
+        with timer.stage("estimates"):
+            # Columns scored below (candidates and reused pairs), per row
+            scored_cols: Dict[int, List[int]] = {}
+            for i, j in itertools.chain(candidates, reused):
+                scored_cols.setdefault(i, []).append(j)
+            if not signatures:
+                # winnow candidates: MinHash signatures for the estimates only
+                perms = minhash_permutations(sim_cfg.minhash_num_perm)
+                signatures = [minhash_signature_from_keys(keys, perms) for keys in ngram_sets]
+            sig_matrix = np.vstack(signatures) if signatures else np.zeros((0, 1), dtype=np.uint64)
+            for i in range(n - 1):
+                # Never scored: cheap estimate from TF-IDF, winnowing and the MinHash n-gram Jaccard
+                # (sequence/LCS taken as 0), for the whole row at once
+                todo = np.ones(n - i - 1, dtype=bool)
+                todo[np.asarray(scored_cols.get(i, []), dtype=np.int64) - (i + 1)] = False
+                cols = np.flatnonzero(todo) + (i + 1)
+                if not cols.size:
+                    continue
+                t_row = tfidf.upper_row(i) if isinstance(tfidf, SparseCosine) else np.asarray(tfidf[i, i + 1 :], dtype=float)
+                s_ng = np.count_nonzero(sig_matrix[cols] == sig_matrix[i], axis=1) / sig_matrix.shape[1]
+                est = w_tfidf * t_row[cols - (i + 1)] + w_ng * s_ng
+                w_row = win_row(i)
+                if w_row is not None:
+                    est += w_win * w_row[cols]
+                sink.set_row(i, cols, np.clip(est, 0.0, 1.0))
+
+    state = PairScoringState(
+        token_ids=token_ids,
+        ngram_sets=ngram_sets,
+        texts=texts,
+        sim_cfg=sim_cfg,
+        candidates=candidates,
+        skip=reused or None,
+        tfidf=tfidf if low_memory or sim_cfg.cascade else None,
+        sequence_floor=threshold if low_memory else None,
+        cascade_cut=cascade_cut if sim_cfg.cascade else None,
+        top_k=top_k,
+        text_lengths=text_lengths,
+        ngram_jaccard=ngram_jaccard,
+        ngram_sizes=ngram_sizes,
+        winnow_shared=winnow_shared if w_win > 0 else None,
+        winnow_sizes=winnow_sizes if w_win > 0 else None,
+    )
+    pair_timings = PairTimings()
+    scored = score_all_pairs(state, workers=workers, timings=pair_timings)
+    if reused:
+        scored = heapq.merge(iter_reused(reused), scored, key=lambda p: (p[0], p[1]))
+
+    sequence_estimated = 0
+    bounded: List[int] = []
+    skipped = {"ngram": 0, "lcs": 0, "sequence": 0}
+    pairs_evaluated = 0
+    row_i, row_win = -1, None
+    with timer.stage("score_pairs"):
+        for pair in scored:
+            i, j, s_seq, s_ng, s_lcs = pair
+            pairs_evaluated += 1
+            if i != row_i:
+                row_i, row_win = i, win_row(i)
+            if sim_cfg.cascade and (math.isnan(s_seq) or math.isnan(s_ng) or math.isnan(s_lcs)):
+                # Bounded: the pair stays below the cut; skipped terms count as 0 (a lower bound)
+                for name, value in (("ngram", s_ng), ("lcs", s_lcs), ("sequence", s_seq)):
+                    if math.isnan(value):
+                        skipped[name] += 1
+                s_seq, s_ng, s_lcs = (0.0 if math.isnan(x) else x for x in (s_seq, s_ng, s_lcs))
+                bounded.append(condensed_index(i, j, n))
+            elif math.isnan(s_seq):
+                # low_memory: pair cannot reach the threshold; token LCS stands in for the character-level ratio
+                s_seq = s_lcs
+                sequence_estimated += 1
+            elif new_state is not None:
+                new_state.add(pair)
             s_tfidf = float(tfidf[i, j])
-            s_seq = sequence_ratio(original_texts[i], original_texts[j])
-            s_ng = ngram_jaccard(tokens[i], tokens[j], n=sim_cfg.ngram_n)
-            s_lcs = lcs_similarity(tokens[i], tokens[j], max_tokens=sim_cfg.max_lcs_tokens)
+            s_win = float(row_win[j]) if row_win is not None else 0.0
 
-            score = w_tfidf * s_tfidf + w_seq * s_seq + w_ng * s_ng + w_lcs * s_lcs
+            score = w_tfidf * s_tfidf + w_seq * s_seq + w_ng * s_ng + w_lcs * s_lcs + w_win * s_win
             score = float(np.clip(score, 0.0, 1.0))
 
-            mat[i, j] = score
-            mat[j, i] = score
+            sink.set(i, j, score)
 
             if score >= threshold:
-                breakdown_candidates.append(
-                    {
-                        "a": files[i],
-                        "b": files[j],
-                        "score": round(score, 6),
-                        "tfidf": round(s_tfidf, 6),
-                        "sequence": round(float(s_seq), 6),
-                        "ngram": round(float(s_ng), 6),
-                        "lcs": round(float(s_lcs), 6),
-                    }
-                )
+                entry = {
+                    "a": files[i],
+                    "b": files[j],
+                    "i": i,  # positions in files: names repeat across subfolders
+                    "j": j,
+                    "score": round(score, 6),
+                    "tfidf": round(s_tfidf, 6),
+                    "sequence": round(float(s_seq), 6),
+                    "ngram": round(float(s_ng), 6),
+                    "lcs": round(float(s_lcs), 6),
+                }
+                if row_win is not None:
+                    entry["winnow"] = round(s_win, 6)
+                breakdown_candidates.append(entry)
 
     breakdown_candidates.sort(key=lambda x: x["score"], reverse=True)
+    top_pairs = breakdown_candidates[:10]
+    if evidence_seconds > 0 and top_pairs:
+        # Only reported pairs pay for alignment; low_memory reloads their texts
+        with timer.stage("evidence"):
+            cfg_dump["evidence"] = attach_evidence(
+                top_pairs, texts, preprocess_cfg=preprocess_cfg, sim_cfg=sim_cfg, time_budget=evidence_seconds
+            )
+
+    if isinstance(texts, LazyTexts):
+        cfg_dump["lazy_text"] = {"pairs_sequence_estimated": sequence_estimated}
+
+    bounded_pairs: Optional[np.ndarray] = None
+    if sim_cfg.cascade:
+        # Reused (incremental) pairs need no evaluation and are not counted
+        pairs_computed = pairs_evaluated - len(reused)
+        bounded_pairs = np.sort(np.asarray(bounded, dtype=np.int64))
+        cfg_dump["cascade"] = {
+            "cut": round(float(cascade_cut), 6),
+            "top_k": top_k,
+            "pairs_evaluated": pairs_computed,
+            "pairs_bounded": len(bounded),
+            "evaluations_total": 3 * pairs_computed,
+            "evaluations_saved": sum(skipped.values()),
+            "saved_by_metric": skipped,
+        }
+
+    with timer.stage("finalize"):
+        if new_state is not None and state_path is not None:
+            cfg_dump["incremental"]["pairs_scored"] = len(new_state) - cfg_dump["incremental"]["pairs_reused"]
+            save_state(new_state, state_path)
+
+        if sink.sparse is not None:
+            sparse_pairs: Optional[SparsePairs] = sink.sparse.result()
+            matrix: List[List[float]] = []
+        else:
+            sparse_pairs = None
+            matrix = [[round(float(x), 6) for x in row] for row in sink.values.tolist()]
+
+    metrics = _metrics_json(timer, pair_timings, read, files, token_ids, text_lengths)
+    metrics["counters"]["pairs_scored"] = pairs_evaluated - len(reused)
 
     return AnalysisResult(
         created_at_utc=created,
         files=files,
-        similarity_matrix=[[round(float(x), 6) for x in row] for row in mat.tolist()],
-        top_pairs=breakdown_candidates[:10],
+        similarity_matrix=matrix,
+        top_pairs=top_pairs,
         threshold=float(threshold),
         config=cfg_dump,
+        sparse_pairs=sparse_pairs,
+        bounded_pairs=bounded_pairs,
+        metrics=metrics,
     )
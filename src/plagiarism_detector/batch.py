@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from . import __version__
+from .cache import ExtractionCache
+from .options import DEFAULT_TIME_BUDGET
+from .preprocess import PreprocessConfig
+from .readers import FolderReadResult, list_folder, read_folder_detailed
+from .similarity import SimilarityConfig
+
+# Batch runs: many folders analyzed concurrently under one CPU budget. Folder reading (I/O, cache lookups)
+# runs in a thread pool and overlaps with the analyses, which run in worker processes that write their
+# reports as soon as they finish. A job is skipped when its input files and settings are unchanged.
+
+STATE_FILE = "batch_state.json"
+SUMMARY_FILE = "batch_summary.json"
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    input: Path
+    out: Path
+    threshold: Optional[float] = None  # None = batch default
+
+
+@dataclass(frozen=True)
+class BatchSettings:
+    threshold: float = 0.75
+    preprocess_cfg: PreprocessConfig = PreprocessConfig()
+    sim_cfg: SimilarityConfig = SimilarityConfig()
+    exts: Optional[List[str]] = None
+    recursive: bool = True
+    evidence_seconds: float = DEFAULT_TIME_BUDGET
+    plots: bool = True
+
+
+@dataclass(frozen=True)
+class JobReport:
+    input: str
+    out: str
+    status: str  # "done" | "skipped" | "failed"
+    files: int = 0
+    seconds: Dict[str, float] = field(default_factory=dict)  # queued, read, wait, analyze, write, total
+    error: Optional[str] = None
+
+
+def load_manifest(path: Path, out_root: Path) -> List[BatchJob]:
+    # JSON: a list of folders or {"input", "out", "threshold"} objects; otherwise one folder per line
+    # (blank lines and # comments ignored). Relative paths are relative to the manifest; reports go to
+    # <out_root>/<folder name> unless "out" is given.
+    path = Path(path)
+    base = path.parent
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() == ".json":
+        entries = [e if isinstance(e, dict) else {"input": e} for e in json.loads(text)]
+    else:
+        lines = (line.strip() for line in text.splitlines())
+        entries = [{"input": line} for line in lines if line and not line.startswith("#")]
+
+    jobs: List[BatchJob] = []
+    for e in entries:
+        folder = base / Path(e["input"]).expanduser()
+        out = Path(e["out"]) if e.get("out") else Path(out_root) / folder.name
+        threshold = e.get("threshold")
+        jobs.append(BatchJob(folder, out, float(threshold) if threshold is not None else None))
+    seen: Dict[Path, Path] = {}
+    for job in jobs:
+        other = seen.setdefault(job.out.resolve(), job.input)
+        if other != job.input:
+            raise ValueError(f"Folders {other} and {job.input} write to the same output {job.out} (set 'out')")
+    return jobs
+
+
+def job_key(job: BatchJob, settings: BatchSettings) -> str:
+    # Changes when a file is added, removed or modified (size, mtime) or when any setting changes
+    h = hashlib.sha256()
+    config = asdict(settings)
+    config["threshold"] = job.threshold if job.threshold is not None else settings.threshold
+    h.update(json.dumps({"version": __version__, "config": config}, sort_keys=True, default=str).encode("utf-8"))
+    for p in list_folder(job.input, exts=settings.exts, recursive=settings.recursive):
+        st = p.stat()
+        h.update(f"\0{p.relative_to(job.input).as_posix()}\0{st.st_size}\0{st.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()
+
+
+class _CpuBudget:
+    # Counting semaphore over CPU slots: a job holding n slots runs its analysis with n processes
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self._free = total
+        self._cond = asyncio.Condition()
+
+    async def acquire(self, n: int) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._free >= n)
+            self._free -= n
+
+    async def release(self, n: int) -> None:
+        async with self._cond:
+            self._free += n
+            self._cond.notify_all()
+
+
+def _analyze_and_save(job: BatchJob, read: FolderReadResult, settings: BatchSettings, workers: int) -> Dict[str, Any]:
+    # Runs in a worker process: analysis and every report of one folder
+    from .analyzer import analyze_folder
+    from .reporting import save_json, save_markdown
+
+    t0 = time.perf_counter()
+    result = analyze_folder(
+        job.input,
+        threshold=job.threshold if job.threshold is not None else settings.threshold,
+        preprocess_cfg=settings.preprocess_cfg,
+        sim_cfg=settings.sim_cfg,
+        workers=workers,
+        evidence_seconds=settings.evidence_seconds,
+        documents=read,
+    )
+    t1 = time.perf_counter()
+    job.out.mkdir(parents=True, exist_ok=True)
+    save_json(result, job.out / "report.json")
+    save_markdown(result, job.out / "report.md")
+    if settings.plots:
+        from .reporting import save_heatmap_png, save_similarity_histogram_png, save_top_pairs_bar_png
+
+        save_heatmap_png(result, job.out / "heatmap.png")
+        save_similarity_histogram_png(result, job.out / "similarity_hist.png")
+        save_top_pairs_bar_png(result, job.out / "top_pairs.png")
+    return {"files": len(result.files), "analyze": t1 - t0, "write": time.perf_counter() - t1}
+
+
+def _load_state(path: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(path: Path, state: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+async def run_batch(
+    jobs: List[BatchJob],
+    settings: BatchSettings = BatchSettings(),
+    *,
+    cpu_budget: Optional[int] = None,
+    workers_per_job: int = 1,
+    io_workers: int = 4,
+    prefetch: Optional[int] = None,
+    state_path: Optional[Path] = None,
+    force: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    on_done: Optional[Callable[[JobReport], None]] = None,
+) -> List[JobReport]:
+    # cpu_budget: processes analyzing at once over all jobs (default: all CPUs); a job uses workers_per_job
+    # of them. prefetch: folders read ahead of the analyses (default: 2 x cpu_budget), bounds memory.
+    # state_path: finished jobs and their keys, for resuming (force = ignore it). Returns reports in job order.
+    cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+    per_job = max(1, min(workers_per_job, cpu_budget))
+    budget = _CpuBudget(cpu_budget)
+    pending = asyncio.Semaphore(max(1, prefetch or 2 * cpu_budget))
+    state: Dict[str, Any] = _load_state(state_path) if state_path is not None else {}
+    loop = asyncio.get_running_loop()
+    t_start = time.perf_counter()
+
+    io = ThreadPoolExecutor(max_workers=max(1, io_workers), thread_name_prefix="batch-io")
+    # spawn: worker processes start their own pools for pair scoring, and forking a threaded parent is unsafe
+    cpu = ProcessPoolExecutor(max_workers=cpu_budget // per_job, mp_context=mp.get_context("spawn"))
+
+    async def run(job: BatchJob) -> JobReport:
+        seconds: Dict[str, float] = {}
+        async with pending:
+            t0 = time.perf_counter()
+            seconds["queued"] = t0 - t_start
+            try:
+                if not job.input.is_dir():
+                    raise FileNotFoundError(f"No such folder: {job.input}")
+                key = await loop.run_in_executor(io, job_key, job, settings)
+                done = state.get(str(job.out))
+                if not force and done and done.get("key") == key and (job.out / "report.json").exists():
+                    return JobReport(str(job.input), str(job.out), "skipped", int(done.get("files", 0)))
+                t1 = time.perf_counter()
+                read = await loop.run_in_executor(
+                    io,
+                    lambda: read_folder_detailed(job.input, exts=settings.exts, recursive=settings.recursive, cache=cache),
+                )
+                t2 = time.perf_counter()
+                seconds["read"] = t2 - t1
+                await budget.acquire(per_job)
+                try:
+                    seconds["wait"] = time.perf_counter() - t2
+                    out = await loop.run_in_executor(cpu, _analyze_and_save, job, read, settings, per_job)
+                finally:
+                    await budget.release(per_job)
+            except Exception as e:  # pylint: disable=broad-except
+                seconds["total"] = time.perf_counter() - t0
+                return JobReport(str(job.input), str(job.out), "failed", seconds=seconds, error=f"{type(e).__name__}: {e}")
+            seconds.update(analyze=out["analyze"], write=out["write"], total=time.perf_counter() - t0)
+            if state_path is not None:
+                state[str(job.out)] = {
+                    "input": str(job.input),
+                    "key": key,
+                    "files": out["files"],
+                    "finished_at_utc": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "seconds": round(seconds["total"], 3),
+                }
+                _save_state(state_path, state)  # in the event loop: one writer
+            return JobReport(str(job.input), str(job.out), "done", out["files"], seconds)
+
+    async def run_and_report(job: BatchJob) -> JobReport:
+        report = await run(job)
+        report.seconds.update((k, round(v, 6)) for k, v in report.seconds.items())
+        if on_done is not None:
+            on_done(report)
+        return report
+
+    try:
+        return list(await asyncio.gather(*(run_and_report(job) for job in jobs)))
+    finally:
+        io.shutdown()
+        cpu.shutdown()
+
+
+def summary_json(reports: Iterable[JobReport], seconds: float) -> Dict[str, Any]:
+    reports = list(reports)
+    return {
+        "created_at_utc": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "seconds": round(seconds, 3),
+        "counts": {s: sum(r.status == s for r in reports) for s in ("done", "skipped", "failed")},
+        "jobs": [asdict(r) for r in reports],
+    }
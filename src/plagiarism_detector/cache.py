@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Bump when extraction output of readers.read_pdf / read_docx changes: old entries become misses
+READER_VERSION = "1"
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "plagiarism_detector"
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+
+# Content-addressed cache of extracted text: SHA-256 of file bytes -> text (+ reader version).
+# One SQLite file; least recently used entries are evicted once total text size exceeds `max_bytes`.
+# The database is created lazily on first use.
+class ExtractionCache:
+    def __init__(self, directory: Path, *, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = int(max_bytes)
+        self.stats = CacheStats()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._total = 0  # text bytes in the table, summed once on connect and kept up to date by put()
+        self._pid = os.getpid()  # process that opened _conn
+        self._inherited: List[sqlite3.Connection] = []
+
+    @property
+    def path(self) -> Path:
+        return self.directory / "extracted_text.sqlite3"
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None and self._pid != os.getpid():
+            # Forked worker: a SQLite connection must not be used across fork(). Kept unclosed (closing it
+            # here would touch the parent's locks); this process opens its own.
+            self._inherited.append(self._conn)
+            self._conn = None
+        if self._conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " reader_version TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+            conn.commit()
+            self._total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT reader_version, text FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or row[0] != READER_VERSION:
+                self.stats.misses += 1
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.stats.hits += 1
+            return str(row[1])
+
+    def put(self, key: str, text: str) -> None:
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            conn = self._connect()
+            old = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, reader_version, text, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, READER_VERSION, text, size, time.time()),
+            )
+            self.stats.writes += 1
+            self._total += size - (old[0] if old is not None else 0)
+            if self._total > self.max_bytes:
+                self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # Oldest first, a few rows per query; the running total misses other processes' writes until they
+        # reconnect, so a shared cache can briefly exceed max_bytes
+        while self._total > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC LIMIT 64").fetchall()
+            if not rows:
+                self._total = 0
+                break
+            for key, size in rows:
+                if self._total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._total -= size
+                self.stats.evictions += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "dir": str(self.directory),
+            "max_bytes": self.max_bytes,
+            "reader_version": READER_VERSION,
+            **asdict(self.stats),
+        }
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import hashlib
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .similarity import mix64
+
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+
+def shingle_hash(shingle: Hashable) -> int:
+    # Stable across processes (unlike built-in hash() with PYTHONHASHSEED)
+    if isinstance(shingle, tuple):
+        data = "\x1f".join(str(x) for x in shingle)
+    else:
+        data = str(shingle)
+    return int.from_bytes(hashlib.blake2b(data.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash_permutations(num_perm: int, *, seed: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    if num_perm <= 0:
+        raise ValueError("num_perm must be > 0")
+    rng = np.random.default_rng(seed)
+    # multiply-shift hashing: a must be odd, arithmetic wraps modulo 2**64
+    a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_from_hashes(hashes: np.ndarray, permutations: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    a, b = permutations
+    if hashes.size == 0:
+        return np.full(a.shape[0], _MAX_HASH, dtype=np.uint64)
+
+    sig = np.full(a.shape[0], np.iinfo(np.uint64).max, dtype=np.uint64)
+    # chunk shingles to keep the (chunk x num_perm) buffer small
+    for start in range(0, hashes.size, 4096):
+        h = hashes[start : start + 4096, None]
+        phv = (h * a[None, :] + b[None, :]) >> np.uint64(32)
+        np.minimum(sig, phv.min(axis=0), out=sig)
+    return sig
+
+
+def minhash_signature_from_keys(keys: np.ndarray, permutations: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    # For integer n-gram keys (similarity.ngram_keys / ngram_key_set)
+    return minhash_from_hashes(mix64(np.unique(keys)), permutations)
+
+
+def lsh_candidate_pairs(signatures: Sequence[np.ndarray], *, bands: int) -> Set[Tuple[int, int]]:
+    if not signatures:
+        return set()
+    num_perm = len(signatures[0])
+    if bands <= 0 or num_perm % bands != 0:
+        raise ValueError("bands must be > 0 and divide the signature length")
+    rows = num_perm // bands
+
+    pairs: Set[Tuple[int, int]] = set()
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = defaultdict(list)
+        lo, hi = band * rows, (band + 1) * rows
+        for idx, sig in enumerate(signatures):
+            buckets[sig[lo:hi].tobytes()].append(idx)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def lsh_band_keys(signatures: np.ndarray, *, bands: int) -> np.ndarray:
+    # (bands x n_docs) uint64 bucket key per band of a (n_docs x num_perm) signature matrix. Two documents
+    # share a bucket in lsh_candidate_pairs exactly when their band slices are equal, which here means
+    # equal keys up to 64-bit hash collisions; the keys can be sorted and stored for lookups.
+    sig = np.asarray(signatures, dtype=np.uint64)
+    if sig.ndim != 2:
+        raise ValueError("signatures must be a 2-D array")
+    num_perm = sig.shape[1]
+    if bands <= 0 or num_perm % bands != 0:
+        raise ValueError("bands must be > 0 and divide the signature length")
+    rows = num_perm // bands
+
+    keys = np.zeros((bands, sig.shape[0]), dtype=np.uint64)
+    for band in range(bands):
+        h = np.full(sig.shape[0], band, dtype=np.uint64)
+        for r in range(band * rows, (band + 1) * rows):
+            h = mix64(h ^ sig[:, r])
+        keys[band] = h
+    return keys
+
+
+def lossless_tfidf_floor(threshold: float, weights: Sequence[float]) -> float:
+    # Smallest TF-IDF cosine a pair needs to reach `threshold` when every other metric is 1.0
+    w_tfidf = float(weights[0])
+    if w_tfidf <= 0.0:
+        return 0.0
+    rest = float(sum(weights[1:]))
+    return float(max(0.0, (threshold - rest) / w_tfidf))
+
+
+def tfidf_candidate_pairs(tfidf: np.ndarray, *, floor: float) -> Set[Tuple[int, int]]:
+    n = tfidf.shape[0]
+    if n < 2:
+        return set()
+    rows, cols = np.triu_indices(n, k=1)
+    mask = tfidf[rows, cols] >= floor
+    return set(zip(rows[mask].tolist(), cols[mask].tolist()))
+
+
+def candidate_recall(
+    exhaustive_pairs: Iterable[Tuple[int, int]],
+    candidate_pairs: Iterable[Tuple[int, int]],
+) -> Optional[float]:
+    truth = set(exhaustive_pairs)
+    if not truth:
+        return None
+    found = truth & set(candidate_pairs)
+    return float(len(found) / len(truth))
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+SEQUENCE_BACKENDS = ("difflib", "blocks")
+
+# Anchor length for the k-gram index: shorter shared fragments are only found inside small gaps
+DEFAULT_MIN_MATCH = 8
+# Gaps between anchored blocks up to this size are aligned exactly with difflib (typos, small edits)
+GAP_FILL_MAX = 64
+# Candidate positions in b examined per anchor (bounds work on repetitive text)
+MAX_CANDIDATES = 4
+# Re-alignment levels for large gaps between chosen blocks
+MAX_DEPTH = 3
+
+
+def _kgram_index(b: str, k: int) -> Dict[str, List[int]]:
+    index: Dict[str, List[int]] = {}
+    for p in range(len(b) - k + 1):
+        index.setdefault(b[p : p + k], []).append(p)
+    return index
+
+
+def _extend(a: str, i: int, b: str, p: int, start: int) -> int:
+    # Length of the common prefix of a[i:] and b[p:], known to be at least `start`
+    n = start
+    step = 64
+    la, lb = len(a), len(b)
+    while i + n < la and p + n < lb:
+        if a[i + n : i + n + step] == b[p + n : p + n + step]:
+            n += step
+            continue
+        if step == 1:
+            break
+        step //= 4
+    return min(n, la - i, lb - p)
+
+
+def _scan_blocks(a: str, b: str, k: int, *, min_matched: int = 0) -> Optional[List[Tuple[int, int, int]]]:
+    # Left-to-right scan of `a`: every k-gram found in b is extended to a maximal match, preferring
+    # candidates near the current diagonal. Blocks never overlap in `a` but may cross in `b`.
+    # Returns None as soon as fewer than `min_matched` characters of `a` can still end up matched.
+    index = _kgram_index(b, k)
+    blocks: List[Tuple[int, int, int]] = []
+    i = 0
+    diag = 0
+    la = len(a)
+    possible = 0  # a-characters in blocks or in unmatched runs short enough for gap filling
+    run = 0
+    while i <= la - k:
+        if min_matched and possible + min(run, GAP_FILL_MAX) + (la - i) < min_matched:
+            return None
+        positions = index.get(a[i : i + k])
+        best_p, best_n = -1, 0
+        if positions:
+            mid = bisect_left(positions, i + diag)
+            lo = max(0, mid - MAX_CANDIDATES // 2)
+            for p in positions[lo : lo + MAX_CANDIDATES]:
+                n = _extend(a, i, b, p, k)
+                if n > best_n or (n == best_n and abs(p - i - diag) < abs(best_p - i - diag)):
+                    best_p, best_n = p, n
+        if best_n:
+            blocks.append((i, best_p, best_n))
+            if run <= GAP_FILL_MAX:
+                possible += run
+            possible += best_n
+            run = 0
+            diag = best_p - i
+            i += best_n
+        else:
+            run += 1
+            i += 1
+    return blocks
+
+
+def _heaviest_chain(blocks: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+    # Subset of blocks increasing and non-overlapping in both texts with the largest total size
+    # (weighted LIS over b offsets; prefix maxima in a Fenwick tree, O(B log B)).
+    if not blocks:
+        return []
+    ends = sorted({j + size for _, j, size in blocks})
+    tree = [(0, -1)] * (len(ends) + 1)  # (best total, block index) per Fenwick node
+
+    def query(pos: int) -> Tuple[int, int]:
+        best = (0, -1)
+        while pos > 0:
+            if tree[pos][0] > best[0]:
+                best = tree[pos]
+            pos -= pos & -pos
+        return best
+
+    def update(pos: int, value: Tuple[int, int]) -> None:
+        while pos < len(tree):
+            if value[0] > tree[pos][0]:
+                tree[pos] = value
+            pos += pos & -pos
+
+    total = [0] * len(blocks)
+    parent = [-1] * len(blocks)
+    for idx, (_, j, size) in enumerate(blocks):
+        # chains ending at or before b offset j (blocks are already increasing in `a`)
+        prev_total, prev_idx = query(bisect_right(ends, j))
+        total[idx] = prev_total + size
+        parent[idx] = prev_idx
+        update(bisect_left(ends, j + size) + 1, (total[idx], idx))
+
+    idx = max(range(len(blocks)), key=total.__getitem__)
+    chain: List[Tuple[int, int, int]] = []
+    while idx >= 0:
+        chain.append(blocks[idx])
+        idx = parent[idx]
+    chain.reverse()
+    return chain
+
+
+def _align(
+    a: str,
+    b: str,
+    k: int,
+    depth: int,
+    out: List[Tuple[int, int, int]],
+    a_off: int = 0,
+    b_off: int = 0,
+    min_matched: int = 0,
+) -> bool:
+    # Appends the matching blocks of a vs b (shifted by the offsets) to `out`. Large gaps between the
+    # chosen blocks are aligned again recursively (as difflib does around its longest match), small
+    # ones exactly with difflib. Returns False on an early exit (see _scan_blocks).
+    if len(a) <= GAP_FILL_MAX and len(b) <= GAP_FILL_MAX:
+        if a and b:
+            for m in SequenceMatcher(None, a, b, autojunk=False).get_matching_blocks()[:-1]:
+                out.append((a_off + m.a, b_off + m.b, m.size))
+        return True
+    if depth < 0 or len(a) < k or len(b) < k:
+        return True
+    scanned = _scan_blocks(a, b, k, min_matched=min_matched)
+    if scanned is None:
+        return False
+
+    prev_a = prev_b = 0
+    for i, j, size in _heaviest_chain(scanned) + [(len(a), len(b), 0)]:
+        _align(a[prev_a:i], b[prev_b:j], k, depth - 1, out, a_off + prev_a, b_off + prev_b)
+        if size:
+            out.append((a_off + i, b_off + j, size))
+        prev_a, prev_b = i + size, j + size
+    return True
+
+
+def matching_blocks(a: str, b: str, *, min_match: int = DEFAULT_MIN_MATCH) -> List[Tuple[int, int, int]]:
+    # Ordered, non-overlapping (i, j, size) blocks like SequenceMatcher.get_matching_blocks() (without
+    # the sentinel), from a hash index of b's k-grams and a heaviest-chain selection: ~linear, not quadratic.
+    out: List[Tuple[int, int, int]] = []
+    _align(a, b, max(1, min_match), MAX_DEPTH, out)
+    return out
+
+
+def blocks_ratio(
+    a: str,
+    b: str,
+    *,
+    min_match: int = DEFAULT_MIN_MATCH,
+    min_ratio: Optional[float] = None,
+) -> float:
+    # Same scale as SequenceMatcher.ratio(): 2 * matched characters / total length.
+    # With `min_ratio`, returns 0.0 as soon as the result provably stays below it.
+    total = len(a) + len(b)
+    if total == 0:
+        return 1.0
+    min_matched = 0
+    if min_ratio is not None:
+        if 2.0 * min(len(a), len(b)) / total < min_ratio:
+            return 0.0
+        min_matched = int(min_ratio * total / 2.0)
+
+    out: List[Tuple[int, int, int]] = []
+    if not _align(a, b, max(1, min_match), MAX_DEPTH, out, min_matched=min_matched):
+        return 0.0
+    return float(2.0 * sum(size for _, _, size in out) / total)
+
+
+def difflib_ratio(a: str, b: str) -> float:
+    return float(SequenceMatcher(None, a, b).ratio())
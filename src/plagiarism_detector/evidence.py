@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import re
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .options import DEFAULT_TIME_BUDGET
+from .preprocess import PreprocessConfig, tokenize_with_offsets
+from .similarity import SimilarityConfig
+from .winnowing import fingerprints, shared_passages
+
+MAX_SPANS = 10  # longest spans kept per pair
+SNIPPET_CHARS = 160
+# Passages shorter than this many tokens are not reported
+MIN_SPAN_TOKENS = 8
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _snippet(text: str) -> str:
+    text = _WS_RE.sub(" ", text).strip()
+    return text if len(text) <= SNIPPET_CHARS else text[: SNIPPET_CHARS - 1].rstrip() + "…"
+
+
+def _extend(ids_a: List[int], ids_b: List[int], a0: int, a1: int, b0: int, b1: int, a_min: int) -> Tuple[int, int, int, int]:
+    # Winnowing may miss up to window - 1 tokens at either end of a passage: grow it over equal tokens
+    # (backwards no further than `a_min`, the end of the previous span, so the total work stays linear)
+    while a0 > a_min and b0 > 0 and ids_a[a0 - 1] == ids_b[b0 - 1]:
+        a0 -= 1
+        b0 -= 1
+    while a1 < len(ids_a) and b1 < len(ids_b) and ids_a[a1] == ids_b[b1]:
+        a1 += 1
+        b1 += 1
+    return a0, a1, b0, b1
+
+
+def pair_evidence(
+    text_a: str,
+    text_b: str,
+    *,
+    preprocess_cfg: PreprocessConfig = PreprocessConfig(),
+    sim_cfg: SimilarityConfig = SimilarityConfig(),
+    time_budget: float = DEFAULT_TIME_BUDGET,
+    max_spans: int = MAX_SPANS,
+) -> Dict[str, Any]:
+    # Shared passages of two texts as [start, end) character offsets into both originals, found with
+    # winnowing fingerprints over the token stream (near-linear) and mapped back via token offsets.
+    deadline = time.perf_counter() + time_budget
+    tokens_a, offsets_a = tokenize_with_offsets(text_a, preprocess_cfg)
+    tokens_b, offsets_b = tokenize_with_offsets(text_b, preprocess_cfg)
+    ids: Dict[str, int] = {}
+    ids_a = [ids.setdefault(t, len(ids)) for t in tokens_a]
+    ids_b = [ids.setdefault(t, len(ids)) for t in tokens_b]
+
+    k, window = sim_cfg.winnow_k, sim_cfg.winnow_window
+    passages = shared_passages(
+        fingerprints(np.asarray(ids_a, dtype=np.int64), k=k, window=window),
+        fingerprints(np.asarray(ids_b, dtype=np.int64), k=k, window=window),
+        k=k,
+        window=window,
+        min_tokens=k,
+        deadline=deadline,
+    )
+    truncated = time.perf_counter() > deadline
+
+    spans: List[Tuple[int, int, int, int]] = []
+    for p in passages:
+        if time.perf_counter() > deadline:
+            truncated = True
+            break
+        a_min = spans[-1][1] if spans else 0
+        if p.a_start < a_min:
+            continue  # already covered by the previous (grown) span
+        a0, a1, b0, b1 = _extend(ids_a, ids_b, p.a_start, p.a_end, p.b_start, p.b_end, a_min)
+        if a1 - a0 >= MIN_SPAN_TOKENS:
+            spans.append((a0, a1, b0, b1))
+
+    spans = sorted(sorted(spans, key=lambda s: s[1] - s[0], reverse=True)[:max_spans])
+    chars = [(offsets_a[a0][0], offsets_a[a1 - 1][1], offsets_b[b0][0], offsets_b[b1 - 1][1]) for a0, a1, b0, b1 in spans]
+    return {
+        "spans": [list(c) for c in chars],
+        "snippets": [_snippet(text_a[c[0] : c[1]]) for c in chars],
+        "truncated": truncated,
+    }
+
+
+def attach_evidence(
+    pairs: List[Dict[str, Any]],
+    texts: Sequence[str],
+    *,
+    preprocess_cfg: PreprocessConfig = PreprocessConfig(),
+    sim_cfg: SimilarityConfig = SimilarityConfig(),
+    time_budget: float = DEFAULT_TIME_BUDGET,
+    max_spans: int = MAX_SPANS,
+) -> Dict[str, Any]:
+    # Adds an "evidence" entry to every pair (top_pairs-style dicts with document indices "i"/"j", in place);
+    # only these pairs pay for it
+    t0 = time.perf_counter()
+    truncated = 0
+    for p in pairs:
+        ev = pair_evidence(
+            texts[p["i"]],
+            texts[p["j"]],
+            preprocess_cfg=preprocess_cfg,
+            sim_cfg=sim_cfg,
+            time_budget=time_budget,
+            max_spans=max_spans,
+        )
+        truncated += int(ev["truncated"])
+        p["evidence"] = ev
+    return {
+        "pairs": len(pairs),
+        "pairs_truncated": truncated,
+        "time_budget_per_pair": time_budget,
+        "seconds": round(time.perf_counter() - t0, 6),
+    }
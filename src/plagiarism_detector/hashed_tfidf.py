@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+from scipy import sparse
+
+from .options import DEFAULT_FEATURES, DEFAULT_TOP_K
+from .similarity import feature_counts, mix64
+
+# Rows per sparse x sparse-transpose chunk in cosine_topk, capped so a chunk has at most BLOCK_ENTRIES cells
+BLOCK_ROWS = 512
+BLOCK_ENTRIES = 2**22
+
+
+class HashedTfidf:
+    # TF-IDF in a fixed-width hashed feature space, built in one streaming pass: every document is
+    # reduced to its hashed n-gram counts as it arrives and only the document frequencies (one array of
+    # n_features) are shared. Weighting follows TfidfTransformer's defaults (smooth idf, l2 norm), so
+    # without hash collisions the cosines equal the exact ones.
+    def __init__(self, *, n_features: int = DEFAULT_FEATURES, ngram_range: Tuple[int, int] = (1, 2)) -> None:
+        if n_features <= 0:
+            raise ValueError("n_features must be > 0")
+        self.n_features = int(n_features)
+        self.ngram_range = ngram_range
+        self.df = np.zeros(self.n_features, dtype=np.int64)
+        self._cols: List[np.ndarray] = []
+        self._counts: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self._cols)
+
+    def add(self, ids: Sequence[int]) -> None:
+        cols, counts = hashed_counts(ids, n_features=self.n_features, ngram_range=self.ngram_range)
+        self._cols.append(cols)
+        self._counts.append(counts)
+        self.df[cols] += 1
+
+    def matrix(self) -> sparse.csr_matrix:
+        return tfidf_rows(self._cols, self._counts, self.df, len(self._cols))
+
+
+def hashed_counts(
+    ids: Sequence[int], *, n_features: int = DEFAULT_FEATURES, ngram_range: Tuple[int, int] = (1, 2)
+) -> Tuple[np.ndarray, np.ndarray]:
+    # One document's hashed n-gram counts as (sorted unique int32 columns, float64 counts)
+    keys, counts = feature_counts(np.asarray(ids, dtype=np.int64), ngram_range)
+    cols = (mix64(keys) % np.uint64(n_features)).astype(np.int32)
+    cols, inverse = np.unique(cols, return_inverse=True)
+    return cols, np.bincount(inverse.ravel(), weights=counts, minlength=cols.size)
+
+
+def tfidf_rows(cols: Sequence[np.ndarray], counts: Sequence[np.ndarray], df: np.ndarray, n_docs: int) -> sparse.csr_matrix:
+    # L2-normalized TF-IDF rows (smooth idf over n_docs documents) of hashed counts, float32
+    idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+    indptr = np.cumsum([0] + [c.size for c in cols])
+    indices = np.concatenate(cols) if len(cols) else np.zeros(0, dtype=np.int32)
+    data = np.concatenate(counts) if len(cols) else np.zeros(0, dtype=np.float64)
+    data = data * idf[indices]
+    X = sparse.csr_matrix((data, indices, indptr), shape=(len(cols), df.size))
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    X = sparse.diags(np.where(norms > 0, 1.0 / np.maximum(norms, 1e-30), 0.0)) @ X
+    return X.tocsr().astype(np.float32)
+
+
+class SparseCosine:
+    # Pairwise cosine kept only for selected pairs (top-k per row and >= floor), looked up like the dense
+    # matrix: tfidf[i, j]. Pairs are sorted condensed keys i * n + j (i < j) with float64 values; pairs
+    # that were not kept read as 0.0, their cosine is below `floor`.
+    def __init__(self, n: int, keys: np.ndarray, values: np.ndarray, top_keys: np.ndarray, floor: float) -> None:
+        self.shape = (n, n)
+        self.keys = keys
+        self.values = values
+        self.top_keys = top_keys
+        self.floor = float(floor)
+
+    def __len__(self) -> int:
+        return int(self.keys.size)
+
+    def __getitem__(self, key: Tuple[int, int]) -> float:
+        i, j = key
+        if i == j:
+            return 1.0
+        k = min(i, j) * self.shape[0] + max(i, j)
+        pos = int(np.searchsorted(self.keys, k))
+        if pos < self.keys.size and self.keys[pos] == k:
+            return float(self.values[pos])
+        return 0.0
+
+    def upper_row(self, i: int) -> np.ndarray:
+        # Dense tfidf[i, i + 1 :]: row i's kept pairs are one contiguous run of the sorted keys
+        n = self.shape[0]
+        row = np.zeros(n - i - 1, dtype=float)
+        lo, hi = np.searchsorted(self.keys, [i * n + i + 1, i * n + n])
+        row[self.keys[lo:hi] - (i * n + i + 1)] = self.values[lo:hi]
+        return row
+
+    def _to_pairs(self, keys: np.ndarray) -> Set[Tuple[int, int]]:
+        n = self.shape[0]
+        return set(zip((keys // n).tolist(), (keys % n).tolist()))
+
+    def pairs(self, floor: Optional[float] = None) -> Set[Tuple[int, int]]:
+        # Kept pairs with cosine >= floor plus every top-k neighbour pair
+        floor = self.floor if floor is None else floor
+        return self._to_pairs(np.union1d(self.keys[self.values >= floor], self.top_keys))
+
+
+# Either form of the pairwise TF-IDF cosine; both support tfidf[i, j] and .shape
+TfidfLookup = Union[np.ndarray, SparseCosine]
+
+
+def cosine_topk(
+    X: sparse.csr_matrix,
+    *,
+    top_k: int = DEFAULT_TOP_K,
+    floor: float = 1.0,
+    block_rows: int = BLOCK_ROWS,
+) -> SparseCosine:
+    # Row blocks of X @ X.T as sparse chunks; each row keeps its top_k neighbours and every cosine >= floor.
+    # Peak memory is one block of products (at most BLOCK_ENTRIES rows x n), never the dense n x n matrix.
+    n = X.shape[0]
+    block_rows = max(1, min(block_rows, BLOCK_ENTRIES // max(n, 1)))
+    XT = X.T.tocsr()
+    keys: List[np.ndarray] = []
+    values: List[np.ndarray] = []
+    top_keys: List[np.ndarray] = []
+    for start in range(0, n, block_rows):
+        S = (X[start : start + block_rows] @ XT).tocsr()
+        data = S.data
+        selected = [np.flatnonzero(data >= floor)]
+        top = np.zeros(0, dtype=np.int64)
+        if top_k > 0:
+            best: List[np.ndarray] = []
+            for r in range(S.shape[0]):
+                lo, hi = S.indptr[r], S.indptr[r + 1]
+                seg = data[lo:hi].copy()
+                seg[S.indices[lo:hi] == start + r] = -1.0  # never the document itself
+                if seg.size > top_k:
+                    part = np.argpartition(seg, seg.size - top_k)[-top_k:]
+                else:
+                    part = np.arange(seg.size)
+                best.append(part[seg[part] > 0] + lo)
+            top = np.concatenate(best) if best else top
+            selected.append(top)
+        idx = np.unique(np.concatenate(selected))
+        # only the selected entries are mapped back to (row, col)
+        rows = np.searchsorted(S.indptr, idx, side="right").astype(np.int64) - 1 + start
+        cols = S.indices[idx].astype(np.int64)
+        vals = np.clip(data[idx].astype(np.float64), 0.0, 1.0)
+        ok = (cols != rows) & (vals > 0)
+        pair_keys = np.minimum(rows, cols) * n + np.maximum(rows, cols)
+        keys.append(pair_keys[ok])
+        values.append(vals[ok])
+        top_keys.append(pair_keys[np.isin(idx, top) & ok])
+
+    all_keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+    uniq, first = np.unique(all_keys, return_index=True)  # both (i, j) and (j, i) were kept
+    all_values = np.concatenate(values) if values else np.zeros(0, dtype=np.float64)
+    top_all = np.unique(np.concatenate(top_keys)) if top_keys else np.zeros(0, dtype=np.int64)
+    return SparseCosine(n, uniq, all_values[first], top_all, floor)
+
+
+def hashed_cosine_topk(
+    docs: Iterable[Sequence[int]],
+    *,
+    n_features: int = DEFAULT_FEATURES,
+    ngram_range: Tuple[int, int] = (1, 2),
+    top_k: int = DEFAULT_TOP_K,
+    floor: float = 1.0,
+) -> SparseCosine:
+    model = HashedTfidf(n_features=n_features, ngram_range=ngram_range)
+    for ids in docs:
+        model.add(ids)
+    return cosine_topk(model.matrix(), top_k=top_k, floor=floor)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from array import array
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .parallel import PairScores
+from .preprocess import PreprocessConfig
+from .similarity import SimilarityConfig
+
+STATE_VERSION = 1
+
+# IDF depends on the whole corpus, so TF-IDF is never stored: the sparse product is recomputed on every run.
+TFIDF_POLICY = "recompute"
+
+
+def document_fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def metric_config_key(preprocess_cfg: PreprocessConfig, sim_cfg: SimilarityConfig) -> str:
+    # Only settings that change the stored per-pair values (sequence, ngram, lcs); weights,
+    # threshold and candidate selection are applied on top and may differ between runs.
+    relevant = {
+        "preprocess": asdict(preprocess_cfg),
+        "ngram_n": sim_cfg.ngram_n,
+        "max_lcs_tokens": sim_cfg.max_lcs_tokens,
+        "lcs_mode": sim_cfg.lcs_mode,
+        "sequence_backend": sim_cfg.sequence_backend,
+        "max_sequence_chars": sim_cfg.max_sequence_chars,
+    }
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class AnalysisState:
+    config_key: str
+    files: List[str]
+    fingerprints: List[str]
+    pair_a: array = field(default_factory=lambda: array("i"))
+    pair_b: array = field(default_factory=lambda: array("i"))
+    sequence: array = field(default_factory=lambda: array("d"))
+    ngram: array = field(default_factory=lambda: array("d"))
+    lcs: array = field(default_factory=lambda: array("d"))
+
+    def add(self, scores: PairScores) -> None:
+        i, j, s_seq, s_ng, s_lcs = scores
+        self.pair_a.append(i)
+        self.pair_b.append(j)
+        self.sequence.append(s_seq)
+        self.ngram.append(s_ng)
+        self.lcs.append(s_lcs)
+
+    def __len__(self) -> int:
+        return len(self.pair_a)
+
+
+def save_state(state: AnalysisState, path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "version": STATE_VERSION,
+        "config_key": state.config_key,
+        "files": state.files,
+        "fingerprints": state.fingerprints,
+    }
+    with path.open("wb") as f:
+        np.savez_compressed(
+            f,
+            meta=np.array(json.dumps(meta, ensure_ascii=False)),
+            pair_a=np.frombuffer(state.pair_a, dtype=np.int32),
+            pair_b=np.frombuffer(state.pair_b, dtype=np.int32),
+            sequence=np.frombuffer(state.sequence, dtype=np.float64),
+            ngram=np.frombuffer(state.ngram, dtype=np.float64),
+            lcs=np.frombuffer(state.lcs, dtype=np.float64),
+        )
+
+
+def load_state(path: Path) -> Optional[AnalysisState]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("version") != STATE_VERSION:
+            return None
+        return AnalysisState(
+            config_key=meta["config_key"],
+            files=list(meta["files"]),
+            fingerprints=list(meta["fingerprints"]),
+            pair_a=array("i", data["pair_a"].astype(np.int32).tobytes()),
+            pair_b=array("i", data["pair_b"].astype(np.int32).tobytes()),
+            sequence=array("d", data["sequence"].astype(np.float64).tobytes()),
+            ngram=array("d", data["ngram"].astype(np.float64).tobytes()),
+            lcs=array("d", data["lcs"].astype(np.float64).tobytes()),
+        )
+
+
+def reusable_pairs(
+    prev: Optional[AnalysisState],
+    files: Sequence[str],
+    fingerprints: Sequence[str],
+    config_key: str,
+) -> Tuple[Dict[Tuple[int, int], Tuple[float, float, float]], Dict[str, Any]]:
+    # Maps pairs of unchanged documents (same name, same text fingerprint) from the previous run
+    # onto current indices. Pairs involving new or changed documents are left out and get scored.
+    prev_files = prev.files if prev is not None else []
+    prev_fp = dict(zip(prev_files, prev.fingerprints)) if prev is not None else {}
+    stats: Dict[str, Any] = {
+        "tfidf_policy": TFIDF_POLICY,
+        "documents_new": sum(1 for f in files if f not in prev_fp),
+        "documents_changed": sum(1 for f, fp in zip(files, fingerprints) if f in prev_fp and prev_fp[f] != fp),
+        "documents_removed": len(set(prev_fp) - set(files)),
+        "config_changed": prev is not None and prev.config_key != config_key,
+        "pairs_reused": 0,
+    }
+    if prev is None or prev.config_key != config_key:
+        return {}, stats
+
+    # Names are the document identity; ambiguous (duplicate) names are always rescored
+    current = {f: idx for idx, f in enumerate(files)}
+    ambiguous = {f for f, c in Counter(files).items() if c > 1} | {f for f, c in Counter(prev_files).items() if c > 1}
+    remap: Dict[int, int] = {}
+    for old_idx, name in enumerate(prev_files):
+        new_idx = None if name in ambiguous else current.get(name)
+        if new_idx is not None and fingerprints[new_idx] == prev.fingerprints[old_idx]:
+            remap[old_idx] = new_idx
+
+    reused: Dict[Tuple[int, int], Tuple[float, float, float]] = {}
+    for a, b, s_seq, s_ng, s_lcs in zip(prev.pair_a, prev.pair_b, prev.sequence, prev.ngram, prev.lcs):
+        i = remap.get(a)
+        j = remap.get(b)
+        # sequence_ratio is not guaranteed symmetric, so only reuse pairs that keep their orientation
+        if i is None or j is None or i >= j:
+            continue
+        reused[(i, j)] = (s_seq, s_ng, s_lcs)
+    stats["pairs_reused"] = len(reused)
+    return reused, stats
+
+
+def iter_reused(reused: Dict[Tuple[int, int], Tuple[float, float, float]]) -> Iterator[PairScores]:
+    # Row-major order, to be merged with the freshly scored stream
+    for i, j in sorted(reused):
+        s_seq, s_ng, s_lcs = reused[(i, j)]
+        yield (i, j, s_seq, s_ng, s_lcs)
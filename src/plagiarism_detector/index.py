@@ -0,0 +1,534 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .cache import ExtractionCache
+from .candidates import lsh_band_keys, minhash_permutations, minhash_signature_from_keys, shingle_hash
+from .incremental import document_fingerprint
+from .preprocess import PreprocessConfig, tokenize
+from .readers import Document, FolderReadResult, iter_documents, relative_name
+from .similarity import (
+    KEY_VOCAB,
+    SimilarityConfig,
+    feature_counts,
+    ngram_jaccard_keys,
+    ngram_key_set,
+    sequence_ratio,
+    split_weights,
+    token_lcs_similarity,
+)
+from .store import ArrayStore, ArrayWriter, now_utc, save_npy
+from .winnowing import fingerprints as winnow_fingerprints
+from .winnowing import winnow_similarity
+
+INDEX_VERSION = 1
+
+# Documents per step when counting document frequencies during a build
+_DF_CHUNK = 5000
+# Query documents per sparse product with the archive TF-IDF matrix (one archive scan per block)
+_QUERY_BLOCK = 256
+
+# Append-only raw arrays (np.memmap) and their dtypes; per-document extents live in *_offsets.npy
+_BINS = {
+    "vocab": np.uint64,  # token hash per token id
+    "tokens": np.int32,
+    "texts": np.uint8,  # UTF-8
+    "names": np.uint8,  # UTF-8, path relative to the archive folder
+    "fingerprints": np.uint8,  # raw SHA-256 of the text, 32 bytes per document
+    "ngrams": np.uint64,  # sorted unique word n-gram keys (n = ngram_n)
+    "minhash": np.uint32,  # num_perm values per document
+    "tfidf_indices": np.int32,
+    "tfidf_data": np.float32,
+}
+_OFFSETS = ("tokens", "texts", "names", "ngrams", "tfidf")
+
+
+def _tfidf_row(keys: np.ndarray, counts: np.ndarray, features: np.ndarray, idf: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Frozen vocabulary: keys unknown to the index are dropped (as TfidfVectorizer(vocabulary=...) does)
+    pos = np.searchsorted(features, keys)
+    pos = np.minimum(pos, max(features.size - 1, 0))
+    known = features.size > 0
+    hit = (features[pos] == keys) if known else np.zeros(keys.size, dtype=bool)
+    cols = pos[hit].astype(np.int32)
+    vals = counts[hit].astype(np.float64) * idf[cols]
+    norm = float(np.sqrt(np.dot(vals, vals)))
+    if norm > 0:
+        vals /= norm
+    return cols, vals.astype(np.float32)
+
+
+# Reference archive index: a directory of memory-mapped arrays plus manifest.json (store.ArrayStore).
+# Opening reads only the manifest; arrays are mapped on first access. See build_index / update_index /
+# query_index.
+class ReferenceIndex(ArrayStore):
+    BINS = _BINS
+
+    def __init__(self, directory: Path, manifest: Dict[str, Any]) -> None:
+        super().__init__(directory, manifest)
+        self._vocab_sorted: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def open(cls, directory: Path) -> "ReferenceIndex":
+        directory = Path(directory)
+        manifest = json.loads((directory / "manifest.json").read_text(encoding="utf-8"))
+        if manifest.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version: {manifest.get('version')!r}")
+        return cls(directory, manifest)
+
+    @property
+    def preprocess_cfg(self) -> PreprocessConfig:
+        return PreprocessConfig(**self.manifest["preprocess"])
+
+    @property
+    def ngram_n(self) -> int:
+        return int(self.manifest["ngram_n"])
+
+    @property
+    def tfidf_ngram_range(self) -> Tuple[int, int]:
+        lo, hi = self.manifest["tfidf_ngram_range"]
+        return int(lo), int(hi)
+
+    @property
+    def has_texts(self) -> bool:
+        return bool(self.manifest["store_texts"])
+
+    def _bin(self, name: str) -> np.ndarray:
+        arr = super()._bin(name)
+        if name == "minhash" and arr.ndim == 1:
+            arr = self._arrays[name] = arr.reshape(-1, int(self.manifest["minhash_num_perm"]))
+        return arr
+
+    def name(self, i: int) -> str:
+        return bytes(self._slice("names", i)).decode("utf-8")
+
+    def fingerprint(self, i: int) -> str:
+        return bytes(self._bin("fingerprints")[32 * i : 32 * (i + 1)]).hex()
+
+    def text(self, i: int) -> str:
+        return bytes(self._slice("texts", i)).decode("utf-8")
+
+    def token_ids(self, i: int) -> np.ndarray:
+        return self._slice("tokens", i)
+
+    def ngram_set(self, i: int) -> np.ndarray:
+        return self._slice("ngrams", i)
+
+    @property
+    def active(self) -> np.ndarray:
+        return self._npy("active")
+
+    @property
+    def features(self) -> np.ndarray:
+        # Sorted TF-IDF feature keys (frozen vocabulary) and their IDF
+        return self._npy("features")
+
+    @property
+    def idf(self) -> np.ndarray:
+        return self._npy("idf")
+
+    @property
+    def tfidf(self) -> sparse.csr_matrix:
+        # Backed by the memory maps (no copy while dtypes match)
+        shape = (len(self), int(self.manifest["n_features"]))
+        return sparse.csr_matrix(
+            (self._bin("tfidf_data"), self._bin("tfidf_indices"), self._npy("tfidf_offsets")), shape=shape, copy=False
+        )
+
+    def lookup(self, tokens: Sequence[str]) -> np.ndarray:
+        # Token ids of the index vocabulary; unknown tokens get fresh ids past its end (one per distinct
+        # token), so they never match archive tokens but keep their identity within the document
+        vocab = self._bin("vocab")
+        if self._vocab_sorted is None:
+            order = np.argsort(vocab, kind="stable")
+            self._vocab_sorted = (order, vocab[order])
+        order, sorted_hashes = self._vocab_sorted
+        hashes = np.fromiter((shingle_hash(t) for t in tokens), dtype=np.uint64, count=len(tokens))
+        out = np.empty(len(tokens), dtype=np.int64)
+        if vocab.size:
+            pos = np.minimum(np.searchsorted(sorted_hashes, hashes), vocab.size - 1)
+            found = sorted_hashes[pos] == hashes
+        else:
+            pos = np.zeros(len(tokens), dtype=np.int64)
+            found = np.zeros(len(tokens), dtype=bool)
+        out[found] = order[pos[found]]
+        unknown: Dict[int, int] = {}
+        for k in np.flatnonzero(~found).tolist():
+            out[k] = unknown.setdefault(int(hashes[k]), vocab.size + len(unknown))
+        return out
+
+    def lsh_candidates(self, signature: np.ndarray, *, max_bucket: Optional[int] = None) -> Set[int]:
+        # Bucket mates over all bands; a bucket larger than max_bucket (shared boilerplate) is skipped
+        keys = self._npy("lsh_keys")
+        docs = self._npy("lsh_docs")
+        query = lsh_band_keys(signature[None, :], bands=int(self.manifest["lsh_bands"]))[:, 0]
+        out: Set[int] = set()
+        for band in range(keys.shape[0]):
+            lo = np.searchsorted(keys[band], query[band], side="left")
+            hi = np.searchsorted(keys[band], query[band], side="right")
+            if max_bucket is None or hi - lo <= max_bucket:
+                out.update(docs[band, lo:hi].tolist())
+        return out
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "dir": str(self.directory),
+            "n_docs": len(self),
+            "n_active": int(np.count_nonzero(self.active)),
+            **{k: v for k, v in self.manifest.items() if k != "n_docs"},
+        }
+
+
+class _IndexWriter(ArrayWriter):
+    # Appends documents to the raw arrays of an index directory. TF-IDF vectors need the frozen IDF:
+    # on a build it is computed from the appended documents in finish(); on an update it is read back.
+    BINS = _BINS
+    OFFSETS = _OFFSETS
+
+    def __init__(self, directory: Path, manifest: Dict[str, Any]) -> None:
+        super().__init__(directory, manifest)
+        self.perms = minhash_permutations(int(manifest["minhash_num_perm"]))
+        self.active: List[bool] = np.load(directory / "active.npy").tolist() if (directory / "active.npy").exists() else []
+        vocab_path = directory / "vocab.bin"
+        vocab = np.fromfile(vocab_path, dtype=np.uint64) if vocab_path.exists() else np.zeros(0, dtype=np.uint64)
+        vocab = vocab[: int(manifest.get("n_vocab") or 0)]
+        self.vocab: Dict[int, int] = {int(h): i for i, h in enumerate(vocab.tolist())}
+        self.new_vocab: List[int] = []
+        n = len(self.active)
+        self._truncate(
+            {
+                "tokens": self.offsets["tokens"][-1],
+                "texts": self.offsets["texts"][-1],
+                "names": self.offsets["names"][-1],
+                "ngrams": self.offsets["ngrams"][-1],
+                "tfidf_indices": self.offsets["tfidf"][-1],
+                "tfidf_data": self.offsets["tfidf"][-1],
+                "fingerprints": 32 * n,
+                "minhash": int(self.manifest["minhash_num_perm"]) * n,
+                "vocab": len(self.vocab),
+            }
+        )
+        self.pending = Path(tempfile.mkdtemp(prefix="pending_", dir=str(directory)))
+        self.pending_offsets = [0]
+
+    def _append_pending(self, keys: np.ndarray, counts: np.ndarray) -> None:
+        for name, arr in (("keys", keys.astype(np.uint64)), ("counts", counts.astype(np.int32))):
+            f = self.files.get(f"pending_{name}")
+            if f is None:
+                f = self.files[f"pending_{name}"] = (self.pending / f"{name}.bin").open("ab")
+            f.write(arr.tobytes())
+        self.pending_offsets.append(self.pending_offsets[-1] + keys.size)
+
+    def intern(self, tokens: Sequence[str]) -> np.ndarray:
+        ids = np.empty(len(tokens), dtype=np.int32)
+        for k, tok in enumerate(tokens):
+            h = shingle_hash(tok)
+            idx = self.vocab.get(h)
+            if idx is None:
+                idx = self.vocab[h] = len(self.vocab)
+                self.new_vocab.append(h)
+            ids[k] = idx
+        return ids
+
+    def add(self, name: str, text: str) -> None:
+        cfg = PreprocessConfig(**self.manifest["preprocess"])
+        ids = self.intern(tokenize(text, cfg))
+        ngrams = ngram_key_set(ids, int(self.manifest["ngram_n"]), KEY_VOCAB)
+        text_bytes = text.encode("utf-8", errors="surrogatepass") if self.manifest["store_texts"] else b""
+        name_bytes = name.encode("utf-8")
+
+        self._extend("tokens", ids)
+        self._extend("texts", np.frombuffer(text_bytes, dtype=np.uint8))
+        self._extend("names", np.frombuffer(name_bytes, dtype=np.uint8))
+        self._append(
+            "fingerprints",
+            np.frombuffer(hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).digest(), dtype=np.uint8),
+        )
+        self._extend("ngrams", ngrams)
+        self._append("minhash", minhash_signature_from_keys(ngrams, self.perms).astype(np.uint32))
+        self.active.append(True)
+
+        keys, counts = feature_counts(ids, tuple(self.manifest["tfidf_ngram_range"]))
+        self._append_pending(keys, counts)
+
+    def deactivate(self, i: int) -> None:
+        self.active[i] = False
+
+    def _pending_docs(self) -> Iterable[Tuple[np.ndarray, np.ndarray]]:
+        if self.pending_offsets[-1] == 0:
+            for _ in self.pending_offsets[1:]:
+                yield np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int32)
+            return
+        keys = np.memmap(self.pending / "keys.bin", dtype=np.uint64, mode="r")
+        counts = np.memmap(self.pending / "counts.bin", dtype=np.int32, mode="r")
+        for a, b in zip(self.pending_offsets, self.pending_offsets[1:]):
+            yield np.asarray(keys[a:b]), np.asarray(counts[a:b])
+
+    def _fit_idf(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Document frequencies over the pending documents, merged chunk by chunk to bound memory
+        features = np.zeros(0, dtype=np.uint64)
+        df = np.zeros(0, dtype=np.int64)
+        chunk: List[np.ndarray] = []
+
+        def merge() -> None:
+            nonlocal features, df
+            if not chunk:
+                return
+            keys, counts = np.unique(np.concatenate(chunk), return_counts=True)
+            merged, inverse = np.unique(np.concatenate([features, keys]), return_inverse=True)
+            df = np.bincount(inverse.ravel(), weights=np.concatenate([df, counts]), minlength=merged.size).astype(np.int64)
+            features = merged
+            chunk.clear()
+
+        for keys, _ in self._pending_docs():
+            chunk.append(keys)
+            if len(chunk) >= _DF_CHUNK:
+                merge()
+        merge()
+        n = len(self.pending_offsets) - 1
+        # sklearn's smooth IDF, as in similarity.cosine_tfidf_matrix
+        idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+        return features, idf
+
+    def finish(self) -> Dict[str, Any]:
+        self._close()
+
+        if self.manifest.get("n_features") is None:
+            features, idf = self._fit_idf()
+            save_npy(self.directory / "features.npy", features)
+            save_npy(self.directory / "idf.npy", idf)
+            self.manifest["n_features"] = int(features.size)
+        else:
+            features = np.load(self.directory / "features.npy")
+            idf = np.load(self.directory / "idf.npy")
+
+        for keys, counts in self._pending_docs():
+            cols, vals = _tfidf_row(keys, counts, features, idf)
+            self._append("tfidf_indices", cols)
+            self._append("tfidf_data", vals)
+            self.offsets["tfidf"].append(self.offsets["tfidf"][-1] + cols.size)
+        self._append("vocab", np.asarray(self.new_vocab, dtype=np.uint64))
+        self._close()
+        shutil.rmtree(self.pending, ignore_errors=True)
+
+        n = len(self.active)
+        num_perm = int(self.manifest["minhash_num_perm"])
+        signatures = np.fromfile(self.directory / "minhash.bin", dtype=np.uint32).reshape(n, num_perm)
+        band_keys = lsh_band_keys(signatures, bands=int(self.manifest["lsh_bands"]))
+        order = np.argsort(band_keys, axis=1, kind="stable")
+        save_npy(self.directory / "lsh_keys.npy", np.take_along_axis(band_keys, order, axis=1))
+        save_npy(self.directory / "lsh_docs.npy", order.astype(np.int32))
+        save_npy(self.directory / "active.npy", np.asarray(self.active, dtype=bool))
+        return self._commit(n_docs=n, n_vocab=len(self.vocab))
+
+
+def build_index(
+    archive: Path,
+    index_dir: Path,
+    *,
+    preprocess_cfg: PreprocessConfig = PreprocessConfig(),
+    sim_cfg: SimilarityConfig = SimilarityConfig(),
+    exts: Optional[Iterable[str]] = None,
+    recursive: bool = True,
+    cache: Optional[ExtractionCache] = None,
+    store_texts: bool = True,
+) -> Dict[str, Any]:
+    # Streams the archive once (one document in memory at a time); IDF is frozen at this point
+    index_dir = Path(index_dir)
+    if (index_dir / "manifest.json").exists():
+        raise FileExistsError(f"Index already exists: {index_dir} (use update_index)")
+    index_dir.mkdir(parents=True, exist_ok=True)
+    manifest: Dict[str, Any] = {
+        "version": INDEX_VERSION,
+        "created_at_utc": now_utc(),
+        "preprocess": asdict(preprocess_cfg),
+        "ngram_n": sim_cfg.ngram_n,
+        "tfidf_ngram_range": list(sim_cfg.tfidf_ngram_range),
+        "minhash_num_perm": sim_cfg.minhash_num_perm,
+        "lsh_bands": sim_cfg.lsh_bands,
+        "store_texts": store_texts,
+        "n_features": None,
+    }
+    writer = _IndexWriter(index_dir, manifest)
+    read = FolderReadResult()
+    root = Path(archive)
+    for doc in iter_documents(root, exts=exts, recursive=recursive, cache=cache, report=read):
+        writer.add(relative_name(doc, root), doc.text)
+    writer.finish()
+    return {"documents_added": len(writer.active), "failures": [str(f.path) for f in read.failures]}
+
+
+def update_index(
+    archive: Path,
+    index_dir: Path,
+    *,
+    exts: Optional[Iterable[str]] = None,
+    recursive: bool = True,
+    cache: Optional[ExtractionCache] = None,
+) -> Dict[str, Any]:
+    # Adds new documents and replaces changed ones (same relative name, new text) with the frozen
+    # vocabulary/IDF of the build; refitting IDF needs a rebuild. Unchanged documents are skipped.
+    index = ReferenceIndex.open(index_dir)
+    current: Dict[str, int] = {}
+    for i in np.flatnonzero(index.active).tolist():
+        current[index.name(i)] = i
+
+    writer = _IndexWriter(Path(index_dir), dict(index.manifest))
+    stats: Dict[str, Any] = {"documents_added": 0, "documents_replaced": 0, "documents_unchanged": 0}
+    read = FolderReadResult()
+    root = Path(archive)
+    for doc in iter_documents(root, exts=exts, recursive=recursive, cache=cache, report=read):
+        name = relative_name(doc, root)
+        old = current.get(name)
+        if old is not None:
+            if index.fingerprint(old) == document_fingerprint(doc.text):
+                stats["documents_unchanged"] += 1
+                continue
+            writer.deactivate(old)
+            stats["documents_replaced"] += 1
+        else:
+            stats["documents_added"] += 1
+        writer.add(name, doc.text)
+    writer.finish()
+    stats["failures"] = [str(f.path) for f in read.failures]
+    return stats
+
+
+@dataclass(frozen=True)
+class IndexQueryResult:
+    created_at_utc: str
+    files: List[str]
+    matches: List[List[Dict[str, Any]]]  # per query file: best archive matches, top_pairs-style breakdown
+    threshold: float
+    config: Dict[str, Any]
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "created_at_utc": self.created_at_utc,
+            "threshold": self.threshold,
+            "config": self.config,
+            "results": [{"file": f, "matches": m} for f, m in zip(self.files, self.matches)],
+        }
+
+
+def query_index(
+    index: ReferenceIndex,
+    documents: Sequence[Document],
+    *,
+    top: int = 5,
+    candidates: int = 50,
+    threshold: float = 0.0,
+    sim_cfg: SimilarityConfig = SimilarityConfig(),
+) -> IndexQueryResult:
+    # Per query document: the `candidates` archive documents with the highest frozen-IDF TF-IDF cosine
+    # plus its MinHash/LSH bucket mates (buckets of at most sim_cfg.lsh_max_bucket documents) are scored
+    # with the full metric breakdown; the best `top` matches with score >= threshold are kept.
+    # Tokenization and n-gram settings come from the index.
+    w_tfidf, w_seq, w_ng, w_lcs, w_win = split_weights(sim_cfg.weights)
+    win_k, win_w = sim_cfg.winnow_k, sim_cfg.winnow_window
+    pre = index.preprocess_cfg
+    perms = minhash_permutations(int(index.manifest["minhash_num_perm"]))
+    features = index.features
+    idf = index.idf
+    active = np.asarray(index.active)
+
+    ids_list: List[np.ndarray] = []
+    rows: List[Tuple[np.ndarray, np.ndarray]] = []
+    for doc in documents:
+        ids = index.lookup(tokenize(doc.text, pre))
+        ids_list.append(ids)
+        rows.append(_tfidf_row(*feature_counts(ids, index.tfidf_ngram_range), features, idf))
+
+    n_features = int(index.manifest["n_features"])
+    indptr = np.cumsum([0] + [c.size for c, _ in rows])
+    query = sparse.csr_matrix(
+        (
+            np.concatenate([v for _, v in rows]) if rows else np.zeros(0, dtype=np.float32),
+            np.concatenate([c for c, _ in rows]) if rows else np.zeros(0, dtype=np.int32),
+            indptr,
+        ),
+        shape=(len(documents), n_features),
+    )
+    archive = index.tfidf
+
+    matches: List[List[Dict[str, Any]]] = []
+    scored = 0
+    block: Optional[sparse.csc_matrix] = None
+    for q, doc in enumerate(documents):
+        if q % _QUERY_BLOCK == 0 and len(index):
+            # Sparse cosines of a block of queries against the whole archive, one column per query
+            block = (archive @ query[q : q + _QUERY_BLOCK].T).tocsc()
+        pool: Set[int] = set()
+        cos: Dict[int, float] = {}
+        if block is not None:
+            lo, hi = block.indptr[q % _QUERY_BLOCK], block.indptr[q % _QUERY_BLOCK + 1]
+            docs, vals = block.indices[lo:hi], block.data[lo:hi]
+            keep = active[docs] & (vals > 0)
+            docs, vals = docs[keep], vals[keep]
+            k = min(candidates, docs.size)
+            if k > 0:
+                pool.update(docs[np.argpartition(-vals, k - 1)[:k]].tolist())
+            cos = dict(zip(docs.tolist(), vals.tolist()))
+        q_ngrams = ngram_key_set(ids_list[q], index.ngram_n, KEY_VOCAB)
+        sig = minhash_signature_from_keys(q_ngrams, perms).astype(np.uint32)
+        pool.update(x for x in index.lsh_candidates(sig, max_bucket=sim_cfg.lsh_max_bucket) if active[x])
+
+        found: List[Dict[str, Any]] = []
+        q_ids = ids_list[q].tolist()
+        q_win = winnow_fingerprints(ids_list[q], k=win_k, window=win_w) if w_win > 0 else None
+        for d in sorted(pool):
+            s_tfidf = float(np.clip(cos.get(d, 0.0), 0.0, 1.0))
+            s_ng = ngram_jaccard_keys(q_ngrams, np.asarray(index.ngram_set(d)))
+            s_lcs = token_lcs_similarity(q_ids, index.token_ids(d), sim_cfg)
+            if index.has_texts:
+                s_seq = sequence_ratio(
+                    doc.text, index.text(d), backend=sim_cfg.sequence_backend, max_chars=sim_cfg.max_sequence_chars
+                )
+            else:
+                s_seq = s_lcs  # texts not stored: token LCS stands in, as in low-memory mode
+            s_win = 0.0
+            if q_win is not None:
+                s_win = winnow_similarity(q_win, winnow_fingerprints(index.token_ids(d), k=win_k, window=win_w))
+            score = w_tfidf * s_tfidf + w_seq * s_seq + w_ng * s_ng + w_lcs * s_lcs + w_win * s_win
+            score = float(np.clip(score, 0.0, 1.0))
+            scored += 1
+            if score < threshold:
+                continue
+            entry = {
+                "a": doc.name,
+                "b": index.name(d),
+                "score": round(score, 6),
+                "tfidf": round(s_tfidf, 6),
+                "sequence": round(float(s_seq), 6),
+                "ngram": round(float(s_ng), 6),
+                "lcs": round(float(s_lcs), 6),
+            }
+            if q_win is not None:
+                entry["winnow"] = round(s_win, 6)
+            found.append(entry)
+        found.sort(key=lambda x: x["score"], reverse=True)
+        matches.append(found[:top])
+
+    return IndexQueryResult(
+        created_at_utc=now_utc(),
+        files=[d.name for d in documents],
+        matches=matches,
+        threshold=float(threshold),
+        config={
+            "index": index.describe(),
+            "similarity": asdict(sim_cfg),
+            "top": top,
+            "candidates": candidates,
+            "lsh_max_bucket": sim_cfg.lsh_max_bucket,
+            "pairs_scored": scored,
+            "sequence_from_texts": index.has_texts,
+        },
+    )
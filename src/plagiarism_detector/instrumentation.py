@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import cProfile
+import heapq
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+PAIR_METRICS = ("ngram", "lcs", "sequence")
+SLOWEST = 10  # slowest pairs / files kept
+
+
+def _cpu_seconds() -> float:
+    # User + system time of this process and of its waited-for children (process pools shut down
+    # inside the stage that used them, so their CPU time lands in that stage)
+    t = os.times()
+    return time.process_time() + t.children_user + t.children_system
+
+
+class StageTimer:
+    # Wall and CPU seconds per named stage; a stage entered several times accumulates. Cheap enough
+    # (two clock reads per entry) to stay on in production runs.
+    def __init__(self) -> None:
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._t0 = time.perf_counter()
+
+    def _add(self, name: str, wall: float, cpu: float) -> None:
+        st = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0})
+        st["wall_seconds"] += wall
+        st["cpu_seconds"] += cpu
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        wall, cpu = time.perf_counter(), _cpu_seconds()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - wall, _cpu_seconds() - cpu)
+
+    def timed(self, items: Iterable[T], name: str) -> Iterator[T]:
+        # Iterates `items`, charging the time spent producing each item (not the loop body) to `name`
+        it = iter(items)
+        while True:
+            wall, cpu = time.perf_counter(), _cpu_seconds()
+            try:
+                item = next(it)
+            except StopIteration:
+                self._add(name, time.perf_counter() - wall, _cpu_seconds() - cpu)
+                return
+            self._add(name, time.perf_counter() - wall, _cpu_seconds() - cpu)
+            yield item
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "total_seconds": round(time.perf_counter() - self._t0, 6),
+            "stages": {k: {m: round(v, 6) for m, v in st.items()} for k, st in self.stages.items()},
+        }
+
+
+class PairTimings:
+    # Per-metric call counts and cumulative seconds, plus the slowest pairs. Filled by score_rows; worker
+    # processes return theirs with every block and the parent merges them.
+    def __init__(self, keep: int = SLOWEST) -> None:
+        self.keep = keep
+        self.calls = dict.fromkeys(PAIR_METRICS, 0)
+        self.seconds = dict.fromkeys(PAIR_METRICS, 0.0)
+        self._slowest: List[Tuple[float, int, int, Tuple[float, float, float]]] = []  # min-heap
+
+    def add(self, i: int, j: int, ngram: Optional[float], lcs: Optional[float], sequence: Optional[float]) -> None:
+        # Seconds per metric for one pair; None = metric not computed (cascade, lazy sequence)
+        total = 0.0
+        for name, sec in (("ngram", ngram), ("lcs", lcs), ("sequence", sequence)):
+            if sec is not None:
+                self.calls[name] += 1
+                self.seconds[name] += sec
+                total += sec
+        self._push((total, i, j, (ngram or 0.0, lcs or 0.0, sequence or 0.0)))
+
+    def _push(self, item: Tuple[float, int, int, Tuple[float, float, float]]) -> None:
+        if len(self._slowest) < self.keep:
+            heapq.heappush(self._slowest, item)
+        elif item[0] > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def merge(self, other: "PairTimings") -> None:
+        for name in PAIR_METRICS:
+            self.calls[name] += other.calls[name]
+            self.seconds[name] += other.seconds[name]
+        for item in other._slowest:
+            self._push(item)
+
+    def to_json(self, files: Sequence[str]) -> Dict[str, Any]:
+        return {
+            "pair_metrics": {
+                name: {"calls": self.calls[name], "seconds": round(self.seconds[name], 6)} for name in PAIR_METRICS
+            },
+            "slowest_pairs": [
+                {
+                    "a": files[i],
+                    "b": files[j],
+                    "seconds": round(total, 6),
+                    **{name: round(sec, 6) for name, sec in zip(PAIR_METRICS, parts)},
+                }
+                for total, i, j, parts in sorted(self._slowest, reverse=True)
+            ],
+        }
+
+
+@contextmanager
+def profiled(path: Optional[Path]) -> Iterator[None]:
+    # Opt-in cProfile of the enclosed block, dumped to `path` (read with pstats / snakeviz); no-op for None.
+    # Only this process is profiled: pair scoring in worker processes shows up as pool waits.
+    if path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(path))
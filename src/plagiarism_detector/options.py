@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+# Choices and defaults the CLI shows. Standard library only: building the argument parser
+# (`python -m plagiarism_detector --help`) must not import NumPy, SciPy, scikit-learn or matplotlib.
+
+CANDIDATE_MODES = ("exhaustive", "lsh", "winnow")
+
+TFIDF_MODES = ("exact", "hashed")
+
+# LCS on long documents: aligned window by window ("segmented") or cut after max_lcs_tokens ("truncate")
+LCS_MODES = ("segmented", "truncate")
+DEFAULT_LCS_TOKENS = 2000
+DEFAULT_FEATURES = 2**20  # as sklearn's HashingVectorizer
+DEFAULT_TOP_K = 20
+
+# Evidence: per-pair time budget in seconds; a pair that runs out keeps the spans found so far ("truncated")
+DEFAULT_TIME_BUDGET = 2.0
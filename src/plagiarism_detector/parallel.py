@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import heapq
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Container, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .hashed_tfidf import SparseCosine, TfidfLookup
+from .instrumentation import PairTimings
+from .similarity import (
+    SimilarityConfig,
+    jaccard_row,
+    lcs_lengths,
+    ngram_jaccard_keys,
+    sequence_ratio,
+    split_weights,
+    token_lcs_similarity,
+)
+from .vocab import TokenIds
+from .winnowing import containment, containment_matrix
+
+# (i, j, sequence, ngram, lcs)
+PairScores = Tuple[int, int, float, float, float]
+
+
+@dataclass(frozen=True)
+class PairScoringState:
+    token_ids: Sequence[TokenIds]
+    ngram_sets: Sequence[np.ndarray]
+    texts: Sequence[str]
+    sim_cfg: SimilarityConfig
+    candidates: Optional[Set[Tuple[int, int]]] = None
+    skip: Optional[Container[Tuple[int, int]]] = None  # pairs whose metrics are already known
+    # Lazy sequence: with `tfidf` and `sequence_floor` set, sequence_ratio (which needs the raw texts)
+    # is only computed when the pair could still reach the floor; otherwise it is reported as NaN.
+    tfidf: Optional[TfidfLookup] = None
+    sequence_floor: Optional[float] = None
+    # Cascade (needs `tfidf`): metrics are computed cheapest first (ngram, lcs, sequence) and the rest is
+    # skipped (NaN) once the weighted score plus upper bounds of the missing terms stays below the cut:
+    # `cascade_cut`, and with `top_k` also below the k-th best exact score already seen in both rows.
+    cascade_cut: Optional[float] = None
+    top_k: Optional[int] = None
+    # Set from the top-k pre-pass (seed_pairs): every row's k-th best seeded score, the row's only top-k cut,
+    # and the seeded pairs' results with their final scores (not scored again)
+    row_floors: Optional[np.ndarray] = None
+    seeded: Optional[Dict[Tuple[int, int], Tuple[PairScores, float]]] = None
+    text_lengths: Optional[Sequence[int]] = None  # characters per text, tightens the sequence bound
+    # Batch n-gram Jaccard (similarity.ngram_jaccard_sparse); per-pair set intersection when absent
+    ngram_jaccard: Optional[sparse.csr_matrix] = None
+    ngram_sizes: Optional[np.ndarray] = None
+    # Winnowing containment (WinnowIndex.shared_counts), added like TF-IDF when the 5th weight is set
+    winnow_shared: Optional[sparse.csr_matrix] = None
+    winnow_sizes: Optional[np.ndarray] = None
+
+
+# Set in the parent before forking (inherited copy-on-write) or by the pool initializer otherwise
+_WORKER_STATE: Optional[PairScoringState] = None
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    if workers is None or workers <= 0:
+        return os.cpu_count() or 1
+    return int(workers)
+
+
+def row_blocks(n: int, n_blocks: int) -> List[Tuple[int, int]]:
+    # Split rows of the upper triangle into [start, end) ranges with roughly equal pair counts
+    total = n * (n - 1) // 2
+    if total == 0:
+        return []
+    n_blocks = max(1, min(n_blocks, n - 1))
+    target = total / n_blocks
+
+    blocks: List[Tuple[int, int]] = []
+    start = 0
+    acc = 0
+    for i in range(n - 1):
+        acc += n - 1 - i
+        if acc >= target * (len(blocks) + 1) and len(blocks) < n_blocks - 1:
+            blocks.append((start, i + 1))
+            start = i + 1
+    blocks.append((start, n - 1))
+    return blocks
+
+
+def length_bound(len_a: int, len_b: int) -> float:
+    # Upper bound of 2 * common / (len_a + len_b) for LCS- and matching-block-style ratios
+    if len_a + len_b == 0:
+        return 1.0
+    return 2.0 * min(len_a, len_b) / (len_a + len_b)
+
+
+def _bound_rows(state: PairScoringState) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    # Per row r: (columns, values) of the terms every pair gets without scoring (TF-IDF, winnowing, batch
+    # n-gram Jaccard), r itself left out; columns not listed are 0
+    n = len(state.token_ids)
+    w_tfidf, _, w_ng, _, w_win = split_weights(state.sim_cfg.weights)
+    known = sparse.csr_matrix((n, n))
+    if w_win > 0 and state.winnow_shared is not None and state.winnow_sizes is not None:
+        known = known + w_win * containment_matrix(state.winnow_shared, state.winnow_sizes)
+    if state.ngram_jaccard is not None:
+        known = known + w_ng * state.ngram_jaccard
+    tfidf = state.tfidf
+    if isinstance(tfidf, SparseCosine):
+        upper = sparse.csr_matrix((tfidf.values, (tfidf.keys // n, tfidf.keys % n)), shape=(n, n))
+        known = (known + w_tfidf * (upper + upper.T)).tocsr()
+        for r in range(n):
+            lo, hi = known.indptr[r], known.indptr[r + 1]
+            cols, vals = known.indices[lo:hi], known.data[lo:hi]
+            yield cols[cols != r], vals[cols != r]
+    else:
+        known = known.tocsr()
+        for r in range(n):
+            row = w_tfidf * np.asarray(tfidf[r], dtype=float) + known[r].toarray().ravel()
+            cols = np.flatnonzero(np.arange(n) != r)
+            yield cols, row[cols]
+
+
+def seed_pairs(state: PairScoringState) -> List[Tuple[int, int]]:
+    # Pre-pass of the cascade's top-k cut: every row's k most promising pairs by the terms known without
+    # scoring. They are scored exactly first (score_seeds) and the k-th best of them per row is the row's cut
+    # in every row block (seed_floors), so pruning does not depend on how rows are split between workers.
+    k = state.top_k
+    if not k or state.tfidf is None or state.cascade_cut is None or len(state.token_ids) < 2:
+        return []
+    pairs: Set[Tuple[int, int]] = set()
+    for r, (cols, vals) in enumerate(_bound_rows(state)):
+        best = cols[np.argpartition(-vals, k - 1)[:k]] if cols.size > k else cols
+        pairs.update((min(r, c), max(r, c)) for c in best.tolist())
+    if state.candidates is not None:
+        pairs &= state.candidates
+    if state.skip is not None:
+        pairs = {p for p in pairs if p not in state.skip}
+    return sorted(pairs)
+
+
+def score_seeds(
+    state: PairScoringState, pairs: Sequence[Tuple[int, int]], timings: Optional[PairTimings] = None
+) -> List[Tuple[PairScores, float]]:
+    # Exact metrics and final score of each seed pair (sorted by row)
+    assert state.tfidf is not None
+    exact = replace(state, sequence_floor=None)  # a seeded score must be exact
+    w_tfidf, w_seq, w_ng, w_lcs, w_win = split_weights(state.sim_cfg.weights)
+    out: List[Tuple[PairScores, float]] = []
+    row_i, ng_row, win_row = -1, None, None
+    for i, j in pairs:
+        if i != row_i:
+            row_i, ng_row, win_row = i, _ngram_row(state, i), _winnow_row(state, i)
+        scores = score_pair(exact, i, j, ng_row, win_row, timings)
+        _, _, s_seq, s_ng, s_lcs = scores
+        s_win = float(win_row[j]) if win_row is not None else 0.0
+        score = w_tfidf * float(state.tfidf[i, j]) + w_seq * s_seq + w_ng * s_ng + w_lcs * s_lcs + w_win * s_win
+        out.append((scores, float(np.clip(score, 0.0, 1.0))))
+    return out
+
+
+def seed_floors(n: int, top_k: int, seeded: Dict[Tuple[int, int], Tuple[PairScores, float]]) -> np.ndarray:
+    # Per row: k-th best seeded score, -inf for rows with fewer than k seeded pairs
+    heaps: Dict[int, List[float]] = {}
+    for (i, j), (_, score) in seeded.items():
+        _push_row(heaps, i, score, top_k)
+        _push_row(heaps, j, score, top_k)
+    floors = np.full(n, float("-inf"))
+    for row, heap in heaps.items():
+        if len(heap) >= top_k:
+            floors[row] = heap[0]
+    return floors
+
+
+def _row_cut(state: PairScoringState, row: int) -> float:
+    # Smallest score that can still enter the row's top-k. Only the pre-pass floors count: cuts tightened by
+    # the pairs a block happens to score first would make the result depend on the number of workers.
+    if not state.top_k:
+        return float("inf")
+    return state.row_floors[row] if state.row_floors is not None else float("-inf")
+
+
+def _push_row(heaps: Dict[int, List[float]], row: int, score: float, top_k: int) -> None:
+    heap = heaps.setdefault(row, [])
+    if len(heap) < top_k:
+        heapq.heappush(heap, score)
+    elif score > heap[0]:
+        heapq.heapreplace(heap, score)
+
+
+def _ngram_row(state: PairScoringState, i: int) -> Optional[np.ndarray]:
+    if state.ngram_jaccard is None or state.ngram_sizes is None:
+        return None
+    return jaccard_row(state.ngram_jaccard, state.ngram_sizes, i)
+
+
+def _ngram_score(state: PairScoringState, ng_row: Optional[np.ndarray], i: int, j: int) -> float:
+    if ng_row is not None:
+        return float(ng_row[j])
+    return ngram_jaccard_keys(state.ngram_sets[i], state.ngram_sets[j])
+
+
+def _winnow_row(state: PairScoringState, i: int) -> Optional[np.ndarray]:
+    if state.winnow_shared is None or state.winnow_sizes is None:
+        return None
+    return containment(state.winnow_shared, state.winnow_sizes, i)
+
+
+def _score_cascade(
+    state: PairScoringState,
+    i: int,
+    j: int,
+    ng_row: Optional[np.ndarray],
+    win_row: Optional[np.ndarray],
+    timings: PairTimings,
+) -> PairScores:
+    ids = state.token_ids
+    cfg = state.sim_cfg
+    assert state.tfidf is not None and state.cascade_cut is not None
+    w_tfidf, w_seq, w_ng, w_lcs, w_win = split_weights(cfg.weights)
+    nan = float("nan")
+    cut = min(state.cascade_cut, _row_cut(state, i), _row_cut(state, j))
+
+    lcs_bound = length_bound(*lcs_lengths(len(ids[i]), len(ids[j]), cfg))
+    seq_bound = 1.0
+    if state.text_lengths is not None:
+        cap = cfg.max_sequence_chars or None
+        la, lb = state.text_lengths[i], state.text_lengths[j]
+        seq_bound = length_bound(min(la, cap or la), min(lb, cap or lb))
+
+    known = w_tfidf * float(state.tfidf[i, j]) + (w_win * float(win_row[j]) if win_row is not None else 0.0)
+    if known + w_ng + w_lcs * lcs_bound + w_seq * seq_bound < cut:
+        return (i, j, nan, nan, nan)
+    t0 = time.perf_counter()
+    s_ng = _ngram_score(state, ng_row, i, j)
+    t1 = time.perf_counter()
+    known += w_ng * s_ng
+    if known + w_lcs * lcs_bound + w_seq * seq_bound < cut:
+        timings.add(i, j, t1 - t0, None, None)
+        return (i, j, nan, s_ng, nan)
+    s_lcs = token_lcs_similarity(ids[i], ids[j], cfg)
+    t2 = time.perf_counter()
+    known += w_lcs * s_lcs
+    if known + w_seq * seq_bound < cut:
+        timings.add(i, j, t1 - t0, t2 - t1, None)
+        return (i, j, nan, s_ng, s_lcs)
+
+    min_ratio = (cut - known) / w_seq if w_seq > 0 and cut > known else None
+    s_seq = sequence_ratio(
+        state.texts[i],
+        state.texts[j],
+        backend=cfg.sequence_backend,
+        max_chars=cfg.max_sequence_chars,
+        min_ratio=min_ratio,
+    )
+    timings.add(i, j, t1 - t0, t2 - t1, time.perf_counter() - t2)
+    if min_ratio is not None and s_seq < min_ratio:
+        # below the cut either way; an early-exiting backend may have returned a partial value
+        return (i, j, nan, s_ng, s_lcs)
+    return (i, j, float(s_seq), float(s_ng), float(s_lcs))
+
+
+def score_pair(
+    state: PairScoringState,
+    i: int,
+    j: int,
+    ng_row: Optional[np.ndarray] = None,
+    win_row: Optional[np.ndarray] = None,
+    timings: Optional[PairTimings] = None,
+) -> PairScores:
+    # Every metric of one pair (lazy sequence aside); ng_row / win_row are the precomputed rows of i
+    cfg = state.sim_cfg
+    ids = state.token_ids
+    w_tfidf, w_seq, w_ng, w_lcs, w_win = split_weights(cfg.weights)
+    t0 = time.perf_counter()
+    s_ng = _ngram_score(state, ng_row, i, j)
+    t1 = time.perf_counter()
+    s_lcs = token_lcs_similarity(ids[i], ids[j], cfg)
+    t2 = time.perf_counter()
+    s_win = float(win_row[j]) if win_row is not None else 0.0
+    rest = w_win * s_win + w_ng * s_ng + w_lcs * s_lcs + w_seq
+    if (
+        state.tfidf is not None
+        and state.sequence_floor is not None
+        and w_tfidf * state.tfidf[i, j] + rest < state.sequence_floor
+    ):
+        s_seq = float("nan")
+        t3 = None
+    else:
+        s_seq = sequence_ratio(state.texts[i], state.texts[j], backend=cfg.sequence_backend, max_chars=cfg.max_sequence_chars)
+        t3 = time.perf_counter() - t2
+    if timings is not None:
+        timings.add(i, j, t1 - t0, t2 - t1, t3)
+    return (i, j, float(s_seq), float(s_ng), float(s_lcs))
+
+
+def score_rows(state: PairScoringState, rows: Tuple[int, int], timings: Optional[PairTimings] = None) -> List[PairScores]:
+    # `timings` collects per-metric call counts / seconds and the slowest pairs
+    timings = PairTimings() if timings is None else timings
+    candidates = state.candidates
+    skip = state.skip
+    n = len(state.token_ids)
+    cascade = state.tfidf is not None and state.cascade_cut is not None
+    seeded = state.seeded
+
+    out: List[PairScores] = []
+    for i in range(*rows):
+        ng_row = _ngram_row(state, i)
+        win_row = _winnow_row(state, i)
+        for j in range(i + 1, n):
+            if candidates is not None and (i, j) not in candidates:
+                continue
+            if skip is not None and (i, j) in skip:
+                continue
+            if cascade and seeded is not None and (i, j) in seeded:
+                out.append(seeded[(i, j)][0])
+            elif cascade:
+                out.append(_score_cascade(state, i, j, ng_row, win_row, timings))
+            else:
+                out.append(score_pair(state, i, j, ng_row, win_row, timings))
+    return out
+
+
+def _init_worker(state: PairScoringState) -> None:
+    global _WORKER_STATE  # pylint: disable=global-statement
+    _WORKER_STATE = state
+
+
+# Row block plus the pre-pass results it needs: (rows, row_floors, seeded pairs of those rows)
+RowTask = Tuple[Tuple[int, int], Optional[np.ndarray], Optional[Dict[Tuple[int, int], Tuple[PairScores, float]]]]
+
+
+def _score_rows_in_worker(task: RowTask) -> Tuple[List[PairScores], PairTimings]:
+    assert _WORKER_STATE is not None
+    rows, floors, seeded = task
+    state = _WORKER_STATE if floors is None else replace(_WORKER_STATE, row_floors=floors, seeded=seeded)
+    timings = PairTimings()
+    return score_rows(state, rows, timings), timings
+
+
+def _score_seeds_in_worker(pairs: List[Tuple[int, int]]) -> Tuple[List[Tuple[PairScores, float]], PairTimings]:
+    assert _WORKER_STATE is not None
+    timings = PairTimings()
+    return score_seeds(_WORKER_STATE, pairs, timings), timings
+
+
+def score_all_pairs(
+    state: PairScoringState,
+    *,
+    workers: int = 1,
+    timings: Optional[PairTimings] = None,
+) -> Iterator[PairScores]:
+    # Yields pairs in (i, j) row-major order regardless of `workers`; the results do not depend on it either
+    n = len(state.token_ids)
+    workers = resolve_workers(workers)
+    timings = PairTimings() if timings is None else timings
+    seeds = seed_pairs(state) if state.row_floors is None else []
+    k = state.top_k or 0
+
+    if workers == 1 or n < 3:
+        if seeds:
+            seeded = dict(zip(seeds, score_seeds(state, seeds, timings)))
+            state = replace(state, row_floors=seed_floors(n, k, seeded), seeded=seeded)
+        for block in row_blocks(n, 1):
+            yield from score_rows(state, block, timings)
+        return
+
+    # Several blocks per worker so that uneven pairs (long documents) balance out
+    blocks = row_blocks(n, workers * 4)
+
+    global _WORKER_STATE  # pylint: disable=global-statement
+    if sys.platform.startswith("linux"):
+        _WORKER_STATE = state
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("fork"))
+    else:  # pragma: no cover - spawn platforms: state is pickled once per worker
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(state,))
+
+    try:
+        with executor:
+            tasks: List[RowTask] = [(block, None, None) for block in blocks]
+            if seeds:
+                # The pre-pass runs in the pool too; each row block then gets the floors and its seeded pairs
+                step = -(-len(seeds) // (workers * 4))
+                results: List[Tuple[PairScores, float]] = []
+                for part, part_timings in executor.map(
+                    _score_seeds_in_worker, [seeds[x : x + step] for x in range(0, len(seeds), step)]
+                ):
+                    timings.merge(part_timings)
+                    results.extend(part)
+                seeded = dict(zip(seeds, results))
+                floors = seed_floors(n, k, seeded)
+                starts = np.asarray([lo for lo, _ in blocks])
+                per_block: List[Dict[Tuple[int, int], Tuple[PairScores, float]]] = [{} for _ in blocks]
+                for pair, value in seeded.items():
+                    per_block[int(np.searchsorted(starts, pair[0], side="right")) - 1][pair] = value
+                tasks = [(block, floors, part) for block, part in zip(blocks, per_block)]
+            for scores, block_timings in executor.map(_score_rows_in_worker, tasks):
+                timings.merge(block_timings)
+                yield from scores
+    finally:
+        _WORKER_STATE = None
@@ -2,27 +2,152 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from typing import List
+from functools import lru_cache
+from itertools import chain
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .stopwords import STOP_WORDS
 
 _WORD_RE = re.compile(r"[A-Za-zА-Яа-яЁё0-9]+")
+# Runs of characters whose lowercase contains word characters: the word class plus U+0130 (İ -> i + dot)
+# and U+212A (Kelvin sign -> k). Tokenizing runs and normalizing each run on its own gives exactly the
+# tokens of lowercasing the whole text first, without copying the text.
+_RUN_RE = re.compile(r"[A-Za-zА-Яа-яЁё0-9\u0130\u212a]+")
+_CYRILLIC_RE = re.compile(r"[А-Яа-яЁё]")
+_SPACE_RE = re.compile(r"\s+")
+# Distinct runs remembered per configuration before the normalization cache starts over
+_CACHE_MAX = 1 << 20
+# Longest run iter_tokens carries across chunks; a longer one (e.g. an embedded base64 blob) is cut
+MAX_RUN_CHARS = 1 << 16
 
 
 @dataclass(frozen=True)
 class PreprocessConfig:
     lower: bool = True
     min_token_len: int = 2
+    stop_words: bool = False  # drop common English/Russian function words (stopwords.STOP_WORDS)
+    stem: bool = False  # Snowball stemming, English or Russian by the token's script (needs 'snowballstemmer')
 
 
 def normalize_text(text: str, *, lower: bool = True) -> str:
     text = text.replace("\u00a0", " ")
-    text = re.sub(r"\s+", " ", text).strip()
+    text = _SPACE_RE.sub(" ", text).strip()
     return text.lower() if lower else text
 
 
+def _stemmer(cfg: PreprocessConfig) -> Optional[Callable[[str], str]]:
+    if not cfg.stem:
+        return None
+    try:
+        import snowballstemmer
+    except Exception as e:  # pragma: no cover
+        raise RuntimeError("Stemming requires 'snowballstemmer'. Install it via requirements.txt.") from e
+
+    english = snowballstemmer.stemmer("english")
+    russian = snowballstemmer.stemmer("russian")
+
+    def stem(token: str) -> str:
+        return (russian if _CYRILLIC_RE.search(token) else english).stemWord(token)
+
+    return stem
+
+
+class _TokenCache(Dict[str, Tuple[str, ...]]):
+    # Raw run -> its output tokens, computed once per distinct run (vocabulary-sized, not text-sized)
+    def __init__(self, cfg: PreprocessConfig) -> None:
+        super().__init__()
+        self.cfg = cfg
+        self.stem = _stemmer(cfg)
+
+    def __missing__(self, run: str) -> Tuple[str, ...]:
+        cfg = self.cfg
+        words = _WORD_RE.findall(run.lower()) if cfg.lower else [run]
+        out: List[str] = []
+        for w in words:
+            if len(w) < cfg.min_token_len:
+                continue
+            if cfg.stop_words and (w if cfg.lower else w.lower()) in STOP_WORDS:
+                continue
+            out.append(self.stem(w) if self.stem is not None else w)
+        if len(self) >= _CACHE_MAX:
+            self.clear()
+        value = self[run] = tuple(out)
+        return value
+
+
+@lru_cache(maxsize=None)
+def _token_cache(cfg: PreprocessConfig) -> _TokenCache:
+    return _TokenCache(cfg)
+
+
 def tokenize(text: str, cfg: PreprocessConfig = PreprocessConfig()) -> List[str]:
-    text = normalize_text(text, lower=cfg.lower)
-    tokens = _WORD_RE.findall(text)
-    return [t for t in tokens if len(t) >= cfg.min_token_len]
+    # One regex pass over the raw text; every other step works on distinct runs through the cache
+    runs = _RUN_RE.findall(text) if cfg.lower else _WORD_RE.findall(text)
+    return list(chain.from_iterable(map(_token_cache(cfg).__getitem__, runs)))
+
+
+def _scan(text: str, cfg: PreprocessConfig, base: int, final: bool) -> Tuple[List[str], List[Tuple[int, int]], int]:
+    # Tokens of `text` with spans shifted by `base`. Unless `final`, a run touching the end of the text may
+    # continue in the next chunk: it is left out and its start returned (len(text) otherwise).
+    cache = _token_cache(cfg)
+    tokens: List[str] = []
+    spans: List[Tuple[int, int]] = []
+    add_token, add_span = tokens.append, spans.append
+    n = len(text)
+    for m in (_RUN_RE if cfg.lower else _WORD_RE).finditer(text):
+        start, end = m.span()
+        if end == n and not final:
+            return tokens, spans, start
+        for tok in cache[m.group()]:
+            add_token(tok)
+            add_span((base + start, base + end))
+    return tokens, spans, n
+
+
+def _run_tokens(run: str, cfg: PreprocessConfig, start: int) -> Iterator[Tuple[str, int, int]]:
+    end = start + len(run)
+    for tok in _token_cache(cfg)[run]:
+        yield tok, start, end
+
+
+def iter_tokens(chunks: Iterable[str], cfg: PreprocessConfig = PreprocessConfig()) -> Iterator[Tuple[str, int, int]]:
+    # Tokens of the concatenated chunks as (token, start, end) character offsets, holding one chunk at a
+    # time; a word cut by a chunk boundary is carried over. The tokens equal tokenize("".join(chunks)),
+    # except that a run longer than MAX_RUN_CHARS is cut at a chunk boundary into separate runs.
+    # A run that lowercasing splits into several tokens (U+0130) gives each of them the span of the run.
+    run_re = _RUN_RE if cfg.lower else _WORD_RE
+    base = 0  # offset of the carried run, or of the next chunk
+    carry: List[str] = []  # pieces of a run that may continue in the next chunk
+    carried = 0
+    for chunk in chunks:
+        if carry:
+            m = run_re.match(chunk)
+            head = m.end() if m else 0
+            if head == len(chunk) and carried + head < MAX_RUN_CHARS:
+                # The run goes on past this chunk too: keep the piece, nothing is rescanned
+                carry.append(chunk)
+                carried += head
+                continue
+            if carried + head >= MAX_RUN_CHARS:
+                head = 0  # too long: the carried part ends here, the rest starts a new run
+            yield from _run_tokens("".join(carry) + chunk[:head], cfg, base)
+            base += carried + head
+            chunk = chunk[head:]
+            carry, carried = [], 0
+        tokens, spans, cut = _scan(chunk, cfg, base, final=False)
+        for tok, (start, end) in zip(tokens, spans):
+            yield tok, start, end
+        if cut < len(chunk):
+            carry, carried = [chunk[cut:]], len(chunk) - cut
+        base += cut
+    if carry:
+        yield from _run_tokens("".join(carry), cfg, base)
+
+
+def tokenize_with_offsets(text: str, cfg: PreprocessConfig = PreprocessConfig()) -> Tuple[List[str], List[Tuple[int, int]]]:
+    # Same tokens as tokenize() plus their [start, end) character offsets in the original text
+    tokens, spans, _ = _scan(text, cfg, 0, final=True)
+    return tokens, spans
 
 
 def detokenize(tokens: List[str]) -> str:
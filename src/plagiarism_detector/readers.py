@@ -1,8 +1,13 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .cache import ExtractionCache, file_digest
 
 
 @dataclass(frozen=True)
@@ -12,24 +17,38 @@ class Document:
     path: Path
 
 
+def relative_name(doc: Document, root: Path) -> str:
+    try:
+        return doc.path.relative_to(root).as_posix()
+    except ValueError:
+        return doc.name
+
+
 SUPPORTED_EXTS = (".txt", ".pdf", ".docx")
+# Plain text is as cheap to read as it is to hash, so only parsed formats go through the cache
+CACHED_EXTS = (".pdf", ".docx")
+# Characters per piece when plain text is streamed (iter_text)
+TEXT_CHUNK_CHARS = 1 << 20
 
 
 def read_txt(path: Path) -> str:
     return path.read_text(encoding="utf-8", errors="ignore")
 
 
-def read_pdf(path: Path) -> str:
+def iter_pdf_pages(path: Path) -> Iterator[str]:
+    # Text of one page at a time; pypdf parses pages on access
     try:
         from pypdf import PdfReader
     except Exception as e:  # pragma: no cover
         raise RuntimeError("PDF support requires 'pypdf'. Install it via requirements.txt.") from e
 
     reader = PdfReader(str(path))
-    parts: List[str] = []
     for page in reader.pages:
-        parts.append(page.extract_text() or "")
-    return "\n".join(parts)
+        yield page.extract_text() or ""
+
+
+def read_pdf(path: Path) -> str:
+    return "\n".join(iter_pdf_pages(path))
 
 
 def read_docx(path: Path) -> str:
@@ -42,37 +61,248 @@ def read_docx(path: Path) -> str:
     return "\n".join(p.text for p in d.paragraphs)
 
 
-def read_document(path: Path) -> Document:
-    path = Path(path)
+def _extract_text(path: Path) -> str:
+    suffix = path.suffix.lower()
+    if suffix == ".txt":
+        return read_txt(path)
+    if suffix == ".pdf":
+        return read_pdf(path)
+    if suffix == ".docx":
+        return read_docx(path)
+    raise ValueError(f"Unsupported file type: {suffix} ({path.name})")
+
+
+def _iter_extract(path: Path, chunk_chars: int) -> Iterator[str]:
     suffix = path.suffix.lower()
     if suffix == ".txt":
-        text = read_txt(path)
+        with path.open(encoding="utf-8", errors="ignore") as f:
+            while True:
+                chunk = f.read(chunk_chars)
+                if not chunk:
+                    return
+                yield chunk
     elif suffix == ".pdf":
-        text = read_pdf(path)
-    elif suffix == ".docx":
-        text = read_docx(path)
+        for k, page in enumerate(iter_pdf_pages(path)):
+            yield ("\n" + page) if k else page
     else:
-        raise ValueError(f"Unsupported file type: {suffix} ({path.name})")
+        yield _extract_text(path)  # .docx: python-docx loads the whole document anyway
+
 
+def iter_text(path: Path, *, cache: Optional[ExtractionCache] = None, chunk_chars: int = TEXT_CHUNK_CHARS) -> Iterator[str]:
+    # The text of read_document(path) in pieces: .txt in chunks of `chunk_chars`, PDF page by page, so a
+    # huge file is never held whole. A cache hit is one piece; on a miss the pieces are also collected for
+    # the cache (which stores whole texts), once the file has been read to the end.
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if cache is None or suffix not in CACHED_EXTS:
+        yield from _iter_extract(path, chunk_chars)
+        return
+
+    key = f"{file_digest(path)}{suffix}"
+    text = cache.get(key)
+    if text is not None:
+        yield text
+        return
+    parts: List[str] = []
+    for part in _iter_extract(path, chunk_chars):
+        parts.append(part)
+        yield part
+    cache.put(key, "".join(parts))
+
+
+def read_document(path: Path, *, cache: Optional[ExtractionCache] = None) -> Document:
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if cache is None or suffix not in CACHED_EXTS:
+        return Document(name=path.name, text=_extract_text(path), path=path)
+
+    key = f"{file_digest(path)}{suffix}"
+    text = cache.get(key)
+    if text is None:
+        text = _extract_text(path)
+        cache.put(key, text)
     return Document(name=path.name, text=text, path=path)
 
 
-def read_folder(
+@dataclass(frozen=True)
+class ReadFailure:
+    name: str
+    path: Path
+    error: str
+
+
+@dataclass
+class FolderReadResult:
+    documents: List[Document] = field(default_factory=list)
+    failures: List[ReadFailure] = field(default_factory=list)
+    seconds: Dict[str, float] = field(default_factory=dict)  # per file path, extraction (or cache lookup) time
+
+    def slowest(self, k: int = 5) -> List[Tuple[str, float]]:
+        return sorted(self.seconds.items(), key=lambda x: x[1], reverse=True)[:k]
+
+
+def list_folder(
     folder: Path,
     *,
     exts: Optional[Iterable[str]] = None,
     recursive: bool = True,
-) -> List[Document]:
+) -> List[Path]:
     folder = Path(folder)
     if not folder.exists():
         return []
 
-    allowed = tuple(e.lower() for e in (exts if exts is not None else SUPPORTED_EXTS))
+    raw = exts if exts is not None else SUPPORTED_EXTS
+    allowed = tuple(e.lower() if e.startswith(".") else f".{e.lower()}" for e in raw)
 
     it = folder.rglob("*") if recursive else folder.glob("*")
-    paths = sorted(p for p in it if p.is_file() and p.suffix.lower() in allowed and not p.name.startswith("."))
+    return sorted(p for p in it if p.is_file() and p.suffix.lower() in allowed and not p.name.startswith("."))
+
+
+def _extract_timed(path: Path) -> Tuple[str, float]:
+    t0 = time.perf_counter()
+    text = _extract_text(path)
+    return text, time.perf_counter() - t0
+
+
+def read_folder_detailed(
+    folder: Path,
+    *,
+    exts: Optional[Iterable[str]] = None,
+    recursive: bool = True,
+    cache: Optional[ExtractionCache] = None,
+    workers: int = 1,
+    paths: Optional[Sequence[Path]] = None,
+) -> FolderReadResult:
+    # PDF/DOCX parsing is CPU-bound (process pool), .txt is I/O-bound (threads). Output keeps the
+    # sorted path order; a failing file is recorded in `failures` and does not abort the others.
+    # `paths`: read only these files (in this order) instead of listing the folder.
+    paths = list(paths) if paths is not None else list_folder(folder, exts=exts, recursive=recursive)
+    out = FolderReadResult()
+    if not paths:
+        return out
+
+    pending: Dict[int, Union[Future, Tuple[str, float]]] = {}
+    cache_keys: Dict[int, str] = {}
+    errors: Dict[int, str] = {}
+
+    procs = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    threads = ThreadPoolExecutor(max_workers=min(32, workers * 4)) if workers > 1 else None
+    try:
+        for idx, p in enumerate(paths):
+            suffix = p.suffix.lower()
+            try:
+                if cache is not None and suffix in CACHED_EXTS:
+                    t0 = time.perf_counter()
+                    key = f"{file_digest(p)}{suffix}"
+                    hit = cache.get(key)
+                    if hit is not None:
+                        pending[idx] = (hit, time.perf_counter() - t0)
+                        continue
+                    cache_keys[idx] = key
+
+                if procs is not None and threads is not None:
+                    pool = threads if suffix == ".txt" else procs
+                    pending[idx] = pool.submit(_extract_timed, p)
+                else:
+                    pending[idx] = _extract_timed(p)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                errors[idx] = f"{type(e).__name__}: {e}"
+
+        for idx, p in enumerate(paths):
+            if idx in errors:
+                out.failures.append(ReadFailure(name=p.name, path=p, error=errors[idx]))
+                continue
+            item = pending[idx]
+            try:
+                text, seconds = item.result() if isinstance(item, Future) else item
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                out.failures.append(ReadFailure(name=p.name, path=p, error=f"{type(e).__name__}: {e}"))
+                continue
+            if idx in cache_keys and cache is not None:
+                cache.put(cache_keys[idx], text)
+            out.documents.append(Document(name=p.name, text=text, path=p))
+            out.seconds[str(p)] = seconds
+    finally:
+        if procs is not None:
+            procs.shutdown()
+        if threads is not None:
+            threads.shutdown()
+    return out
+
+
+def iter_documents(
+    folder: Path,
+    *,
+    exts: Optional[Iterable[str]] = None,
+    recursive: bool = True,
+    cache: Optional[ExtractionCache] = None,
+    report: Optional[FolderReadResult] = None,
+) -> Iterator[Document]:
+    # Lazy variant of read_folder: one Document alive at a time. With `report`, failures and
+    # timings are collected there (documents are not retained); without it the first failure raises.
+    for p in list_folder(folder, exts=exts, recursive=recursive):
+        t0 = time.perf_counter()
+        try:
+            doc = read_document(p, cache=cache)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            if report is None:
+                raise
+            report.failures.append(ReadFailure(name=p.name, path=p, error=f"{type(e).__name__}: {e}"))
+            continue
+        if report is not None:
+            report.seconds[str(p)] = time.perf_counter() - t0
+        yield doc
+
+
+class LazyTexts(Sequence[str]):
+    # Read-only list of document texts reloaded from disk (or the extraction cache) on access,
+    # keeping only the `max_items` most recently used ones in memory.
+    def __init__(self, paths: Sequence[Path], *, cache: Optional[ExtractionCache] = None, max_items: int = 32) -> None:
+        self.paths = list(paths)
+        self.cache = cache
+        self.max_items = max_items
+        self.loads = 0
+        self._lru: "OrderedDict[int, str]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getitem__(self, idx: Any) -> Any:
+        if isinstance(idx, slice):
+            return [self[k] for k in range(*idx.indices(len(self)))]
+        text = self._lru.get(idx)
+        if text is not None:
+            self._lru.move_to_end(idx)
+            return text
+        text = read_document(self.paths[idx], cache=self.cache).text
+        self.loads += 1
+        self._lru[idx] = text
+        if len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+        return text
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The SQLite-backed cache cannot be pickled (spawned workers re-read files directly)
+        state = dict(self.__dict__)
+        state["cache"] = None
+        state["_lru"] = OrderedDict()
+        return state
+
+
+def read_folder(
+    folder: Path,
+    *,
+    exts: Optional[Iterable[str]] = None,
+    recursive: bool = True,
+    cache: Optional[ExtractionCache] = None,
+    workers: int = 1,
+) -> List[Document]:
+    if workers <= 1:
+        # Fail fast on the first unreadable file (historical behaviour)
+        return [read_document(p, cache=cache) for p in list_folder(folder, exts=exts, recursive=recursive)]
 
-    docs: List[Document] = []
-    for p in paths:
-        docs.append(read_document(p))
-    return docs
+    res = read_folder_detailed(folder, exts=exts, recursive=recursive, cache=cache, workers=workers)
+    if res.failures:
+        f = res.failures[0]
+        raise RuntimeError(f"Failed to read {f.path}: {f.error}")
+    return res.documents
@@ -1,30 +1,59 @@
 from __future__ import annotations
 
+import functools
 import json
 import statistics
 from pathlib import Path
-from typing import Any, Dict, List, Sequence, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-import matplotlib.pyplot as plt
+import numpy as np
 
 from .analyzer import AnalysisResult
+from .sparse import HIST_BINS, SparsePairs, condensed_index
 
-plt.switch_backend("Agg")
+# Larger sparse results are drawn as a scatter of the kept pairs instead of a dense image
+HEATMAP_DENSE_MAX = 2000
 
 
-def _off_diagonal_values(matrix: Sequence[Sequence[float]]) -> List[float]:
-    vals: List[float] = []
-    n = len(matrix)
-    for i in range(n):
-        for j in range(i + 1, n):
-            vals.append(float(matrix[i][j]))
-    return vals
+def _upper_triangle(matrix: Sequence[Sequence[float]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    mat = np.asarray(matrix, dtype=float)
+    n = mat.shape[0] if mat.ndim == 2 else 0
+    rows, cols = np.triu_indices(n, k=1)
+    return rows, cols, mat[rows, cols] if n else np.zeros(0, dtype=float)
+
+
+def _pair_arrays(result: AnalysisResult) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # (rows, cols, scores) of the available pairs, row-major: all pairs (dense) or the kept ones (sparse)
+    sp = getattr(result, "sparse_pairs", None)
+    if sp is not None:
+        return sp.rows, sp.cols, sp.scores
+    return _upper_triangle(result.similarity_matrix)
+
+
+def _bounded_mask(result: AnalysisResult, rows: np.ndarray, cols: np.ndarray) -> Optional[np.ndarray]:
+    # Which of the given pairs only carry a lower-bound score (cascade mode)
+    bounded = getattr(result, "bounded_pairs", None)
+    if bounded is None:
+        return None
+    idx = condensed_index(rows.astype(np.int64), cols.astype(np.int64), len(result.files))
+    return np.isin(idx, bounded)
 
 
 def build_summary(result: AnalysisResult) -> Dict[str, Any]:
-    vals = _off_diagonal_values(result.similarity_matrix)
+    sp = getattr(result, "sparse_pairs", None)
+    if sp is not None and sp.n_pairs:
+        # Kept pairs include every pair >= floor, so the count is exact whenever floor <= threshold
+        return {
+            "n_files": len(result.files),
+            "n_pairs": sp.n_pairs,
+            "pairs_above_threshold": int(np.count_nonzero(sp.scores >= result.threshold)),
+            "max_pair_score": float(sp.scores.max()) if sp.scores.size else None,
+            "mean_pair_score": sp.mean,
+            "median_pair_score": sp.median,
+        }
 
-    if not vals:
+    _, _, vals = _pair_arrays(result)
+    if not vals.size:
         return {
             "n_files": len(result.files),
             "n_pairs": 0,
@@ -34,61 +63,206 @@ def build_summary(result: AnalysisResult) -> Dict[str, Any]:
             "median_pair_score": None,
         }
 
-    pairs_above = sum(1 for v in vals if v >= result.threshold)
     return {
         "n_files": len(result.files),
-        "n_pairs": len(vals),
-        "pairs_above_threshold": pairs_above,
-        "max_pair_score": max(vals),
-        "mean_pair_score": statistics.mean(vals),
-        "median_pair_score": statistics.median(vals),
+        "n_pairs": int(vals.size),
+        "pairs_above_threshold": int(np.count_nonzero(vals >= result.threshold)),
+        "max_pair_score": float(vals.max()),
+        "mean_pair_score": statistics.mean(vals.tolist()),
+        "median_pair_score": statistics.median(vals.tolist()),
     }
 
 
+def _top_pairs_from_arrays(
+    files: Sequence[str],
+    rows: np.ndarray,
+    cols: np.ndarray,
+    scores: np.ndarray,
+    k: int,
+    bounded: Optional[np.ndarray] = None,
+) -> List[Dict[str, Any]]:
+    # Stable descending sort: ties keep row-major order
+    order = np.argsort(-scores, kind="stable")[:k]
+    out = [{"a": files[int(rows[x])], "b": files[int(cols[x])], "score": round(float(scores[x]), 6)} for x in order]
+    if bounded is not None:
+        for pair, x in zip(out, order):
+            if bounded[x]:
+                pair["bounded"] = True
+    return out
+
+
 def top_pairs_overall(
     files: Sequence[str],
     matrix: Sequence[Sequence[float]],
     *,
     k: int = 10,
 ) -> List[Dict[str, Any]]:
-    pairs: List[Tuple[str, str, float]] = []
-    n = len(files)
-    for i in range(n):
-        for j in range(i + 1, n):
-            pairs.append((files[i], files[j], float(matrix[i][j])))
-
-    pairs.sort(key=lambda x: x[2], reverse=True)
-    out: List[Dict[str, Any]] = []
-    for a, b, s in pairs[:k]:
-        out.append({"a": a, "b": b, "score": round(float(s), 6)})
-    return out
+    rows, cols, vals = _upper_triangle(matrix)
+    return _top_pairs_from_arrays(files, rows, cols, vals, k)
 
 
-def save_json(result: AnalysisResult, path: Path) -> None:
-    path = Path(path)
-    path.parent.mkdir(parents=True, exist_ok=True)
+def top_pairs_for_result(result: AnalysisResult, *, k: int = 10) -> List[Dict[str, Any]]:
+    rows, cols, vals = _pair_arrays(result)
+    return _top_pairs_from_arrays(result.files, rows, cols, vals, k, _bounded_mask(result, rows, cols))
+
 
+def _matrix_as_lists(matrix: Any) -> List[List[float]]:
+    # Columnar reports load the matrix as a (memory-mapped) ndarray
+    if isinstance(matrix, np.ndarray):
+        return matrix.tolist()
+    return matrix
+
+
+def result_to_json(result: AnalysisResult) -> Dict[str, Any]:
+    # The report.json payload
     payload = {
         "created_at_utc": result.created_at_utc,
         "files": result.files,
-        "similarity_matrix": result.similarity_matrix,
+        "similarity_matrix": _matrix_as_lists(result.similarity_matrix),
         "top_pairs": result.top_pairs,  # pairs >= threshold (may be empty)
-        "top_pairs_overall": top_pairs_overall(result.files, result.similarity_matrix, k=10),
+        "top_pairs_overall": top_pairs_for_result(result, k=10),
+        "threshold": result.threshold,
+        "config": getattr(result, "config", {}),
+        "summary": build_summary(result),
+    }
+    metrics = getattr(result, "metrics", None)
+    if metrics is not None:
+        payload["metrics"] = metrics
+    sp = getattr(result, "sparse_pairs", None)
+    if sp is not None:
+        payload["sparse_pairs"] = sp.to_json()
+    rows, cols, _ = _pair_arrays(result)
+    mask = _bounded_mask(result, rows, cols)
+    if mask is not None:
+        # Reported pairs (all, or the kept sparse ones) whose score is a lower bound
+        payload["bounded_pairs"] = np.stack([rows[mask], cols[mask]], axis=1).tolist()
+    return payload
+
+
+def save_json(result: AnalysisResult, path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result_to_json(result), ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+COLUMNAR_VERSION = 1
+_BREAKDOWN_COLUMNS = ("score", "tfidf", "sequence", "ngram", "lcs", "winnow")
+
+
+def save_columnar(result: AnalysisResult, out_dir: Path) -> Path:
+    # Binary report: one .npy per array (memory-mappable with np.load(mmap_mode="r")) plus a small
+    # JSON manifest with everything else. Returns the manifest path.
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    arrays: Dict[str, np.ndarray] = {}
+    sp = getattr(result, "sparse_pairs", None)
+    if sp is not None:
+        arrays.update(
+            {"pairs_rows": sp.rows, "pairs_cols": sp.cols, "pairs_scores": sp.scores, "pairs_hist": sp.hist},
+        )
+    elif len(result.similarity_matrix):
+        arrays["similarity_matrix"] = np.asarray(result.similarity_matrix, dtype=np.float64)
+    bounded = getattr(result, "bounded_pairs", None)
+    if bounded is not None:
+        arrays["bounded_pairs"] = np.asarray(bounded, dtype=np.int64)
+
+    tp = result.top_pairs
+    arrays["top_pairs_a"] = np.asarray([p["i"] for p in tp], dtype=np.int32)
+    arrays["top_pairs_b"] = np.asarray([p["j"] for p in tp], dtype=np.int32)
+    for col in _BREAKDOWN_COLUMNS:
+        arrays[f"top_pairs_{col}"] = np.asarray([float(p.get(col, np.nan)) for p in tp], dtype=np.float64)
+
+    entries: Dict[str, Any] = {}
+    for name, arr in arrays.items():
+        np.save(out_dir / f"{name}.npy", np.ascontiguousarray(arr), allow_pickle=False)
+        entries[name] = {"file": f"{name}.npy", "dtype": str(arr.dtype), "shape": list(arr.shape)}
+
+    manifest: Dict[str, Any] = {
+        "version": COLUMNAR_VERSION,
+        "created_at_utc": result.created_at_utc,
+        "files": result.files,
         "threshold": result.threshold,
         "config": getattr(result, "config", {}),
         "summary": build_summary(result),
+        "arrays": entries,
     }
-    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    if getattr(result, "metrics", None) is not None:
+        manifest["metrics"] = result.metrics
+    if any("evidence" in p for p in tp):
+        manifest["top_pairs_evidence"] = [p.get("evidence") for p in tp]
+    if sp is not None:
+        sp_meta = sp.to_json()
+        for key in ("rows", "cols", "scores", "hist"):
+            sp_meta.pop(key)
+        manifest["sparse_pairs"] = sp_meta
+
+    path = out_dir / "manifest.json"
+    path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def load_columnar(out_dir: Path, *, mmap: bool = True) -> AnalysisResult:
+    # Arrays are memory-mapped, so opening even a 10k x 10k matrix only reads the manifest
+    out_dir = Path(out_dir)
+    manifest = json.loads((out_dir / "manifest.json").read_text(encoding="utf-8"))
+    if manifest.get("version") != COLUMNAR_VERSION:
+        raise ValueError(f"Unsupported columnar report version: {manifest.get('version')!r}")
+
+    mode = "r" if mmap else None
+
+    def arr(name: str) -> np.ndarray:
+        return np.load(out_dir / manifest["arrays"][name]["file"], mmap_mode=mode, allow_pickle=False)
+
+    files = list(manifest["files"])
+    top_pairs: List[Dict[str, Any]] = []
+    # Columns added after the first format version may be missing from older reports
+    cols = {c: arr(f"top_pairs_{c}") for c in _BREAKDOWN_COLUMNS if f"top_pairs_{c}" in manifest["arrays"]}
+    for k, (a, b) in enumerate(zip(arr("top_pairs_a").tolist(), arr("top_pairs_b").tolist())):
+        pair: Dict[str, Any] = {"a": files[a], "b": files[b], "i": a, "j": b}
+        for c in cols:
+            v = float(cols[c][k])
+            if not np.isnan(v):
+                pair[c] = v
+        evidence = manifest.get("top_pairs_evidence")
+        if evidence and evidence[k] is not None:
+            pair["evidence"] = evidence[k]
+        top_pairs.append(pair)
+
+    sparse_pairs = None
+    matrix: Any = []
+    if "sparse_pairs" in manifest:
+        meta = dict(manifest["sparse_pairs"])
+        meta.update(rows=arr("pairs_rows"), cols=arr("pairs_cols"), scores=arr("pairs_scores"), hist=arr("pairs_hist"))
+        sparse_pairs = SparsePairs.from_json(meta)
+    elif "similarity_matrix" in manifest["arrays"]:
+        matrix = arr("similarity_matrix")
+
+    return AnalysisResult(
+        created_at_utc=manifest["created_at_utc"],
+        files=files,
+        similarity_matrix=matrix,
+        top_pairs=top_pairs,
+        threshold=float(manifest["threshold"]),
+        config=manifest.get("config", {}),
+        sparse_pairs=sparse_pairs,
+        bounded_pairs=arr("bounded_pairs") if "bounded_pairs" in manifest["arrays"] else None,
+        metrics=manifest.get("metrics"),
+    )
+
+
+# Pair entries kept out of the tables: structured evidence and document indices
+NON_TABLE_KEYS = ("evidence", "i", "j")
 
 
 def _pairs_table_columns(pairs: List[Dict[str, Any]]) -> List[str]:
     if not pairs:
         return ["a", "b", "score"]
 
-    preferred = ["a", "b", "score", "tfidf", "sequence", "ngram", "lcs"]
+    preferred = ["a", "b", "score", "tfidf", "sequence", "ngram", "lcs", "winnow"]
     present = set()
     for p in pairs:
-        present.update(p.keys())
+        present.update(k for k in p.keys() if k not in NON_TABLE_KEYS)
 
     cols = [c for c in preferred if c in present]
     extras = sorted([k for k in present if k not in cols])
@@ -119,13 +293,28 @@ def _render_pairs_md(pairs: List[Dict[str, Any]]) -> str:
     return "".join(lines)
 
 
+def _render_evidence_md(pairs: List[Dict[str, Any]]) -> str:
+    lines: List[str] = []
+    for p in pairs:
+        ev = p.get("evidence")
+        if not ev:
+            continue
+        note = " (time budget reached, incomplete)" if ev.get("truncated") else ""
+        lines.append(f"\n### `{_md_escape(p['a'])}` vs `{_md_escape(p['b'])}`{note}\n\n")
+        if not ev["spans"]:
+            lines.append("_No shared passages found._\n")
+        for (a0, a1, b0, b1), text in zip(ev["spans"], ev["snippets"]):
+            lines.append(f"- chars {a0}–{a1} ↔ {b0}–{b1}: “{_md_escape(text)}”\n")
+    return "".join(lines)
+
+
 def save_markdown(result: AnalysisResult, path: Path) -> None:
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
 
     summary = build_summary(result)
     cfg = getattr(result, "config", {})
-    overall = top_pairs_overall(result.files, result.similarity_matrix, k=10)
+    overall = top_pairs_for_result(result, k=10)
 
     lines: List[str] = []
     lines.append("# Plagiarism Detector Report\n\n")
@@ -150,6 +339,10 @@ def save_markdown(result: AnalysisResult, path: Path) -> None:
         lines.append("_No pairs above threshold._\n")
     else:
         lines.append(_render_pairs_md(result.top_pairs))
+        evidence = _render_evidence_md(result.top_pairs)
+        if evidence:
+            lines.append("\n## Evidence (shared passages)\n")
+            lines.append(evidence)
 
     lines.append("\n## Top pairs (overall)\n\n")
     lines.append(_render_pairs_md(overall))
@@ -165,23 +358,46 @@ def save_markdown(result: AnalysisResult, path: Path) -> None:
     path.write_text("".join(lines), encoding="utf-8")
 
 
+@functools.lru_cache(maxsize=None)
+def _pyplot() -> Any:
+    # matplotlib is imported (and switched to the headless backend) on the first plot only:
+    # the import is slow and runs with --no-plot never need it
+    import matplotlib.pyplot as plt
+
+    plt.switch_backend("Agg")
+    return plt
+
+
 def save_heatmap_png(result: AnalysisResult, path: Path, *, title: str = "Similarity heatmap") -> None:
+    plt = _pyplot()
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
 
-    mat = result.similarity_matrix
-    if not mat:
+    sp = getattr(result, "sparse_pairs", None)
+    mat: Any = result.similarity_matrix
+    if sp is not None:
+        mat = sp.to_dense() if sp.n <= HEATMAP_DENSE_MAX else None
+    elif len(mat) == 0:
         return
 
-    n = len(mat)
+    n = len(result.files)
+    if n == 0:
+        return
     fig_w = max(6.0, min(16.0, 0.65 * n + 4.0))
     fig_h = max(5.0, min(14.0, 0.65 * n + 3.0))
 
     plt.figure(figsize=(fig_w, fig_h))
-    plt.imshow(mat, vmin=0.0, vmax=1.0, cmap="viridis")
+    if mat is not None:
+        plt.imshow(mat, vmin=0.0, vmax=1.0, cmap="viridis")
+    else:
+        plt.scatter(np.concatenate([sp.cols, sp.rows]), np.concatenate([sp.rows, sp.cols]), c=np.tile(sp.scores, 2), s=1)
+        plt.clim(0.0, 1.0)
+        plt.xlim(-0.5, n - 0.5)
+        plt.ylim(n - 0.5, -0.5)
     plt.colorbar(label="Similarity")
-    plt.xticks(range(n), result.files, rotation=45, ha="right")
-    plt.yticks(range(n), result.files)
+    if n <= 100:
+        plt.xticks(range(n), result.files, rotation=45, ha="right")
+        plt.yticks(range(n), result.files)
     plt.title(title)
     plt.tight_layout()
     plt.savefig(path, dpi=160)
@@ -195,16 +411,26 @@ def save_similarity_histogram_png(
     bins: int = 20,
     title: str = "Similarity distribution (off-diagonal)",
 ) -> None:
+    plt = _pyplot()
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
 
-    vals = _off_diagonal_values(result.similarity_matrix)
+    sp = getattr(result, "sparse_pairs", None)
     plt.figure(figsize=(8, 4.5))
 
-    if not vals:
+    if sp is not None and sp.n_pairs:
+        # the histogram of all pairs was accumulated by the analyzer (fixed bins)
+        edges = np.linspace(0.0, 1.0, HIST_BINS + 1)
+        plt.stairs(sp.hist, edges, fill=True, color="#2c7fb8", edgecolor="white")
+        plt.axvline(result.threshold, color="#d95f0e", linestyle="--", linewidth=2)
+        plt.xlabel("Similarity score")
+        plt.ylabel("Count")
+        plt.title(title)
+    elif sp is not None or len(result.similarity_matrix) < 2:
         plt.text(0.5, 0.5, "Not enough data", ha="center", va="center")
         plt.axis("off")
     else:
+        vals = _pair_arrays(result)[2]
         plt.hist(vals, bins=bins, range=(0.0, 1.0), color="#2c7fb8", edgecolor="white")
         plt.axvline(result.threshold, color="#d95f0e", linestyle="--", linewidth=2)
         plt.xlabel("Similarity score")
@@ -223,10 +449,11 @@ def save_top_pairs_bar_png(
     k: int = 10,
     title: str = "Top pairs (overall)",
 ) -> None:
+    plt = _pyplot()
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
 
-    pairs = top_pairs_overall(result.files, result.similarity_matrix, k=k)
+    pairs = top_pairs_for_result(result, k=k)
 
     plt.figure(figsize=(10, 0.6 * max(1, len(pairs)) + 2.5))
 
@@ -0,0 +1,543 @@
+from __future__ import annotations
+
+import heapq
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+from scipy import sparse
+
+from .analyzer import analyze_folder
+from .cache import ExtractionCache
+from .candidates import lsh_band_keys, minhash_permutations, minhash_signature_from_keys
+from .hashed_tfidf import hashed_counts, tfidf_rows
+from .parallel import PairScoringState, length_bound, score_pair
+from .preprocess import PreprocessConfig, tokenize
+from .readers import Document, FolderReadResult, iter_documents, relative_name
+from .reporting import result_to_json
+from .similarity import KEY_VOCAB, SimilarityConfig, ngram_key_set, sequence_ratio, split_weights
+from .vocab import TokenIds, Vocabulary
+from .winnowing import Fingerprints
+from .winnowing import fingerprints as winnow_fingerprints
+from .winnowing import winnow_similarity
+
+DEFAULT_PORT = 8765
+# Fitted TF-IDF rows are reweighted once this fraction of the corpus changed since the last fit
+REFIT_FRACTION = 0.1
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class _Resident:
+    # Everything a query needs about one resident document
+    seq: int  # insertion counter: documents added after the last TF-IDF fit have seq > fit seq
+    name: str
+    text: Optional[str]
+    ids: TokenIds
+    ngrams: np.ndarray
+    cols: np.ndarray  # hashed TF-IDF features and their counts
+    counts: np.ndarray
+    bands: np.ndarray  # LSH bucket key per band
+    winnow: Optional[Fingerprints]
+    nbytes: int
+
+
+class _ReadWriteLock:
+    # Queries share the corpus; adds, removals and TF-IDF refits are exclusive
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._cond:
+            self._cond.wait_for(lambda: not self._writer)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._cond.wait_for(lambda: not self._writer and self._readers == 0)
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class WarmCorpus:
+    # Tokenized documents and their features kept in memory between requests. A query scores one new
+    # document against the resident corpus only: the `candidates` documents with the highest hashed
+    # TF-IDF cosine plus its MinHash/LSH bucket mates go through the pair metrics of analyze_folder
+    # (parallel.score_pair). TF-IDF rows are fitted with the corpus IDF at that time and refitted once
+    # REFIT_FRACTION of the corpus changed; documents added since are weighted with the current IDF.
+    # Memory is bounded by max_docs / max_bytes (approximate): the oldest documents are evicted first.
+    # The shared vocabulary only grows (tokens of evicted documents stay interned).
+    def __init__(
+        self,
+        *,
+        preprocess_cfg: PreprocessConfig = PreprocessConfig(),
+        sim_cfg: SimilarityConfig = SimilarityConfig(),
+        max_docs: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        store_texts: bool = True,
+        candidates: int = 50,
+        min_score: float = 0.0,
+        workers: int = 1,
+    ) -> None:
+        self.preprocess_cfg = preprocess_cfg
+        self.sim_cfg = sim_cfg
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.store_texts = store_texts
+        self.candidates = candidates
+        # Default cut for queries: candidates that cannot reach it skip the sequence alignment
+        self.min_score = min_score
+        self.workers = workers  # for full analyses (result())
+        self.vocab = Vocabulary()
+        self.nbytes = 0
+        self.stats: Dict[str, Any] = dict.fromkeys(("added", "replaced", "removed", "evicted", "refits", "queries"), 0)
+        self.stats["query_seconds"] = 0.0
+        self._docs: "OrderedDict[str, _Resident]" = OrderedDict()  # insertion order = eviction order
+        self._seq = 0
+        self._df = np.zeros(sim_cfg.tfidf_features, dtype=np.int64)
+        self._perms = minhash_permutations(sim_cfg.minhash_num_perm)
+        self._buckets: List[Dict[int, Set[str]]] = [{} for _ in range(sim_cfg.lsh_bands)]
+        self._fit_docs: List[_Resident] = []
+        self._fit_pos: Dict[str, int] = {}
+        self._fit_T: Optional[sparse.csr_matrix] = None  # fitted rows, transposed (features x documents)
+        self._fit_valid = np.zeros(0)  # 1.0 while the fitted document is resident (not removed or replaced)
+        self._fit_seq = 0
+        self._changes = 0  # adds and removals since the last fit
+        self._lock = _ReadWriteLock()
+        self._stats_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _features(self, name: str, text: str, ids: TokenIds, seq: int) -> _Resident:
+        cfg = self.sim_cfg
+        ngrams = ngram_key_set(ids, cfg.ngram_n, KEY_VOCAB)
+        cols, counts = hashed_counts(ids, n_features=cfg.tfidf_features, ngram_range=cfg.tfidf_ngram_range)
+        sig = minhash_signature_from_keys(ngrams, self._perms)
+        bands = lsh_band_keys(sig[None, :], bands=cfg.lsh_bands)[:, 0]
+        win = None
+        if split_weights(cfg.weights)[4] > 0:
+            win = winnow_fingerprints(ids, k=cfg.winnow_k, window=cfg.winnow_window)
+        stored = text if self.store_texts else None
+        nbytes = ids.itemsize * len(ids) + ngrams.nbytes + 2 * cols.nbytes + counts.nbytes + bands.nbytes
+        nbytes += sys.getsizeof(stored) if stored is not None else 0
+        nbytes += win.hashes.nbytes + win.positions.nbytes if win is not None else 0
+        return _Resident(seq, name, stored, ids, ngrams, cols, counts, bands, win, nbytes)
+
+    def _lookup(self, tokens: Sequence[str]) -> TokenIds:
+        # Token ids without growing the vocabulary; unknown tokens get fresh ids past its end (one per
+        # distinct token), so they never match resident tokens but keep their identity in the document
+        ids = self.vocab.lookup(tokens)
+        unknown: Dict[str, int] = {}
+        for k in (k for k, x in enumerate(ids) if x < 0):
+            ids[k] = unknown.setdefault(tokens[k], len(self.vocab) + len(unknown))
+        return ids
+
+    def _insert(self, doc: _Resident) -> None:
+        self._docs[doc.name] = doc
+        self._df[doc.cols] += 1
+        for band, key in enumerate(doc.bands.tolist()):
+            self._buckets[band].setdefault(key, set()).add(doc.name)
+        self.nbytes += doc.nbytes
+        self._changes += 1
+
+    def _drop(self, name: str) -> None:
+        doc = self._docs.pop(name)
+        pos = self._fit_pos.get(name)
+        if pos is not None and self._fit_docs[pos] is doc:
+            self._fit_valid[pos] = 0.0
+        self._df[doc.cols] -= 1
+        for band, key in enumerate(doc.bands.tolist()):
+            bucket = self._buckets[band][key]
+            bucket.discard(name)
+            if not bucket:
+                del self._buckets[band][key]
+        self.nbytes -= doc.nbytes
+        self._changes += 1
+
+    def add(self, name: str, text: str) -> Dict[str, Any]:
+        # Adds (or replaces) a document, then evicts the oldest ones while over the memory bounds
+        tokens = tokenize(text, self.preprocess_cfg)
+        with self._lock.write():
+            self._seq += 1
+            doc = self._features(name, text, self.vocab.intern(tokens), self._seq)
+            replaced = name in self._docs
+            if replaced:
+                self._drop(name)
+            self._insert(doc)
+            self.stats["replaced" if replaced else "added"] += 1
+            evicted: List[str] = []
+            while len(self._docs) > 1 and (
+                (self.max_docs is not None and len(self._docs) > self.max_docs)
+                or (self.max_bytes is not None and self.nbytes > self.max_bytes)
+            ):
+                oldest = next(iter(self._docs))
+                self._drop(oldest)
+                evicted.append(oldest)
+            self.stats["evicted"] += len(evicted)
+        return {"name": name, "tokens": len(doc.ids), "replaced": replaced, "evicted": evicted}
+
+    def add_folder(
+        self,
+        folder: Path,
+        *,
+        exts: Optional[Iterable[str]] = None,
+        recursive: bool = True,
+        cache: Optional[ExtractionCache] = None,
+    ) -> FolderReadResult:
+        # Preloads a folder (names relative to it); documents stream in one at a time
+        read = FolderReadResult()
+        root = Path(folder)
+        for doc in iter_documents(root, exts=exts, recursive=recursive, cache=cache, report=read):
+            self.add(relative_name(doc, root), doc.text)
+        return read
+
+    def remove(self, name: str) -> bool:
+        with self._lock.write():
+            if name not in self._docs:
+                return False
+            self._drop(name)
+            self.stats["removed"] += 1
+            return True
+
+    def _stale(self) -> bool:
+        return self._fit_T is None or self._changes > REFIT_FRACTION * max(len(self._fit_docs), 1)
+
+    def _refit(self) -> None:
+        docs = list(self._docs.values())
+        X = tfidf_rows([d.cols for d in docs], [d.counts for d in docs], self._df, len(docs))
+        self._fit_docs = docs
+        self._fit_pos = {d.name: k for k, d in enumerate(docs)}
+        self._fit_T = X.T.tocsr()
+        self._fit_valid = np.ones(len(docs))
+        self._fit_seq = self._seq
+        self._changes = 0
+        self.stats["refits"] += 1
+
+    def _idf(self, cols: np.ndarray) -> np.ndarray:
+        return np.log((1.0 + len(self._docs)) / (1.0 + self._df[cols])) + 1.0
+
+    def _weighted(self, doc: _Resident) -> np.ndarray:
+        vals = doc.counts * self._idf(doc.cols)
+        norm = float(np.sqrt(np.dot(vals, vals)))
+        return vals / norm if norm > 0 else vals
+
+    def _candidates(self, query: _Resident, k: int) -> Dict[str, Tuple[_Resident, float]]:
+        # The k resident documents with the highest TF-IDF cosine plus the LSH bucket mates, with cosines
+        q = self._weighted(query)
+        fitted = np.zeros(len(self._fit_docs))
+        if self._fit_T is not None and query.cols.size and fitted.size:
+            fitted = np.asarray(self._fit_T[query.cols].T @ q).ravel() * self._fit_valid
+        scored: List[Tuple[float, _Resident]] = []
+        if k > 0 and fitted.size:
+            best = np.argpartition(-fitted, min(k, fitted.size) - 1)[:k]
+            scored.extend((float(fitted[i]), self._fit_docs[i]) for i in best.tolist() if fitted[i] > 0)
+        pending: Dict[str, float] = {}
+        for doc in reversed(self._docs.values()):  # documents added since the fit are a suffix
+            if doc.seq <= self._fit_seq:
+                break
+            _, qi, di = np.intersect1d(query.cols, doc.cols, assume_unique=True, return_indices=True)
+            pending[doc.name] = float(np.dot(q[qi], self._weighted(doc)[di])) if qi.size else 0.0
+            scored.append((pending[doc.name], doc))
+        out = {doc.name: (doc, c) for c, doc in heapq.nlargest(k, scored, key=lambda x: x[0]) if c > 0}
+        for band, key in enumerate(query.bands.tolist()):
+            bucket = self._buckets[band].get(key, ())
+            if len(bucket) > self.sim_cfg.lsh_max_bucket:
+                continue  # shared boilerplate: would pull in most of the corpus
+            for name in bucket:
+                if name not in out:
+                    c = pending[name] if name in pending else float(fitted[self._fit_pos[name]])
+                    out[name] = (self._docs[name], c)
+        return out
+
+    def query(
+        self,
+        text: str,
+        *,
+        name: str = "query",
+        top: int = 5,
+        candidates: Optional[int] = None,
+        min_score: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        # Best resident matches of one document, top_pairs-style breakdown; the document is not added.
+        # Only matches with score >= min_score (default: self.min_score) are returned.
+        t0 = time.perf_counter()
+        tokens = tokenize(text, self.preprocess_cfg)
+        if self._stale():
+            with self._lock.write():
+                if self._stale():
+                    self._refit()
+        with self._lock.read():
+            query = self._features(name, text, self._lookup(tokens), 0)
+            pool = self._candidates(query, self.candidates if candidates is None else candidates)
+            pool.pop(name, None)  # a resident document of the same name is not its own match
+            docs = [pool[n] for n in sorted(pool)]
+            cut = self.min_score if min_score is None else min_score
+            matches, sequence_calls = self._score(query, text, docs, max(top, 1), cut)
+            n_docs = len(self._docs)
+        matches.sort(key=lambda x: x["score"], reverse=True)
+        seconds = time.perf_counter() - t0
+        with self._stats_lock:
+            self.stats["queries"] += 1
+            self.stats["query_seconds"] += seconds
+        return {
+            "name": name,
+            "matches": matches[:top],
+            "pairs_scored": len(docs),
+            "sequence_computed": sequence_calls,
+            "documents": n_docs,
+            "seconds": round(seconds, 6),
+        }
+
+    def _score(
+        self, query: _Resident, text: str, pool: List[Tuple[_Resident, float]], top: int, min_score: float
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        # Row 0 of a small PairScoringState (query + candidates) through the analyze_folder pair metrics.
+        # n-gram and LCS are computed for every candidate; sequence_ratio (the slow one) only for pairs whose
+        # upper bound can still enter the top `top`, best bound first, so the returned matches are exact.
+        # Returns the matches and the number of sequence_ratio calls.
+        cfg = self.sim_cfg
+        w_tfidf, w_seq, w_ng, w_lcs, w_win = split_weights(cfg.weights)
+        docs = [d for d, _ in pool]
+        n = len(docs) + 1
+        tfidf = np.zeros((n, n))
+        tfidf[0, 1:] = np.clip([c for _, c in pool], 0.0, 1.0)
+        win_row = np.zeros(n)
+        if query.winnow is not None:
+            win_row[1:] = [winnow_similarity(query.winnow, d.winnow) for d in docs]  # type: ignore[arg-type]
+        texts = [text] + [d.text or "" for d in docs]
+        state = PairScoringState(
+            token_ids=[query.ids] + [d.ids for d in docs],
+            ngram_sets=[query.ngrams] + [d.ngrams for d in docs],
+            texts=texts,
+            sim_cfg=cfg,
+            tfidf=tfidf,
+            sequence_floor=float("inf"),  # sequence below, in bound order
+        )
+        cap = cfg.max_sequence_chars or None
+        bounded: List[Tuple[float, float, int, float, float]] = []  # (bound, known, j, ngram, lcs)
+        for j in range(1, n):
+            _, _, _, s_ng, s_lcs = score_pair(state, 0, j, win_row=win_row)
+            known = w_tfidf * tfidf[0, j] + w_ng * s_ng + w_lcs * s_lcs + w_win * win_row[j]
+            if self.store_texts:
+                la, lb = len(texts[0]), len(texts[j])
+                bound = known + w_seq * length_bound(min(la, cap or la), min(lb, cap or lb))
+            else:
+                known += w_seq * s_lcs  # texts not stored: token LCS stands in, as in low-memory mode
+                bound = known
+            bounded.append((bound, known, j, s_ng, s_lcs))
+
+        best: List[float] = []  # min-heap of the top scores so far
+        out: List[Dict[str, Any]] = []
+        calls = 0
+        for bound, known, j, s_ng, s_lcs in sorted(bounded, reverse=True):
+            cut = max(min_score, best[0] if len(best) >= top else float("-inf"))
+            if bound < cut:
+                break  # sorted: no remaining pair can enter the top
+            s_seq = s_lcs
+            if self.store_texts:
+                min_ratio = (cut - known) / w_seq if w_seq > 0 and cut > known else None
+                calls += 1
+                s_seq = sequence_ratio(
+                    text, texts[j], backend=cfg.sequence_backend, max_chars=cfg.max_sequence_chars, min_ratio=min_ratio
+                )
+                if min_ratio is not None and s_seq < min_ratio:
+                    continue  # an early-exiting backend may have returned a partial value
+                known += w_seq * s_seq
+            score = float(np.clip(known, 0.0, 1.0))
+            if score < cut:
+                continue
+            if len(best) < top:
+                heapq.heappush(best, score)
+            else:
+                heapq.heapreplace(best, score)
+            entry = {
+                "a": query.name,
+                "b": docs[j - 1].name,
+                "score": round(score, 6),
+                "tfidf": round(float(tfidf[0, j]), 6),
+                "sequence": round(float(s_seq), 6),
+                "ngram": round(float(s_ng), 6),
+                "lcs": round(float(s_lcs), 6),
+            }
+            if query.winnow is not None:
+                entry["winnow"] = round(float(win_row[j]), 6)
+            out.append(entry)
+        return out, calls
+
+    def result(self, *, threshold: float = 0.75, **kwargs: Any) -> Dict[str, Any]:
+        # Full analyze_folder run over the resident documents (report.json payload); needs stored texts
+        if not self.store_texts:
+            raise ValueError("texts are not stored (started with store_texts=False)")
+        with self._lock.read():
+            docs = [Document(d.name, d.text or "", Path(d.name)) for d in self._docs.values()]
+        result = analyze_folder(
+            Path("."),
+            threshold=threshold,
+            preprocess_cfg=self.preprocess_cfg,
+            sim_cfg=self.sim_cfg,
+            workers=self.workers,
+            documents=docs,
+            **kwargs,
+        )
+        return result_to_json(result)
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock.read():
+            queries = self.stats["queries"]
+            return {
+                "documents": len(self._docs),
+                "bytes": int(self.nbytes),
+                "vocabulary": len(self.vocab),
+                "max_docs": self.max_docs,
+                "max_bytes": self.max_bytes,
+                "store_texts": self.store_texts,
+                "candidates": self.candidates,
+                "min_score": self.min_score,
+                "fitted_documents": len(self._fit_docs),
+                "changes_since_fit": self._changes,
+                **{k: v for k, v in self.stats.items() if k != "query_seconds"},
+                "mean_query_seconds": round(self.stats["query_seconds"] / queries, 6) if queries else None,
+                "similarity": asdict(self.sim_cfg),
+            }
+
+
+class _ClientError(Exception):
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "AnalysisServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status: HTTPStatus, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > self.server.max_request_bytes:
+            self.close_connection = True  # the unread body is not drained
+            raise _ClientError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"request body over {self.server.max_request_bytes} bytes")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            raise _ClientError(HTTPStatus.BAD_REQUEST, f"invalid JSON: {e}") from e
+        if not isinstance(body, dict):
+            raise _ClientError(HTTPStatus.BAD_REQUEST, "expected a JSON object")
+        return body
+
+    def _handle(self, method: str) -> None:
+        if not self.server.slots.acquire(blocking=False):
+            self.close_connection = True
+            self._send(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "too many concurrent requests"})
+            return
+        try:
+            status, payload = self._route(method)
+        except _ClientError as e:
+            status, payload = e.status, {"error": str(e)}
+        except (KeyError, TypeError, ValueError) as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.server.slots.release()
+        self._send(status, payload)
+
+    def _route(self, method: str) -> Tuple[HTTPStatus, Dict[str, Any]]:
+        corpus = self.server.corpus
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if method == "GET" and url.path == "/health":
+            return HTTPStatus.OK, {"status": "ok", "documents": len(corpus)}
+        if method == "GET" and url.path == "/stats":
+            return HTTPStatus.OK, corpus.describe()
+        if method == "GET" and url.path == "/result":
+            threshold = float(params.get("threshold", 0.75))
+            evidence = float(params.get("evidence_seconds", 0.0))
+            return HTTPStatus.OK, corpus.result(threshold=threshold, evidence_seconds=evidence)
+        if method == "POST" and url.path == "/documents":
+            body = self._body()
+            docs = body["documents"] if "documents" in body else [body]
+            return HTTPStatus.OK, {"added": [corpus.add(str(d["name"]), str(d["text"])) for d in docs]}
+        if method == "DELETE" and url.path.startswith("/documents/"):
+            name = unquote(url.path[len("/documents/") :])
+            if not corpus.remove(name):
+                raise _ClientError(HTTPStatus.NOT_FOUND, f"unknown document: {name}")
+            return HTTPStatus.OK, {"removed": name}
+        if method == "POST" and url.path == "/query":
+            body = self._body()
+            name = str(body.get("name", "query"))
+            out = corpus.query(
+                str(body["text"]),
+                name=name,
+                top=int(body.get("top", 5)),
+                candidates=int(body["candidates"]) if "candidates" in body else None,
+                min_score=float(body["min_score"]) if "min_score" in body else None,
+            )
+            if body.get("add"):
+                out["added"] = corpus.add(name, str(body["text"]))
+            return HTTPStatus.OK, out
+        raise _ClientError(HTTPStatus.NOT_FOUND, f"no route: {method} {url.path}")
+
+    def do_GET(self) -> None:  # noqa: N802 (http.server naming)
+        self._handle("GET")
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._handle("POST")
+
+    def do_DELETE(self) -> None:  # noqa: N802
+        self._handle("DELETE")
+
+
+class AnalysisServer(ThreadingHTTPServer):
+    # One thread per connection; at most `max_concurrent` requests are processed at once, the rest get 503
+    daemon_threads = True
+
+    def __init__(
+        self,
+        corpus: WarmCorpus,
+        address: Tuple[str, int] = ("127.0.0.1", DEFAULT_PORT),
+        *,
+        max_concurrent: int = 8,
+        max_request_bytes: int = MAX_REQUEST_BYTES,
+        quiet: bool = False,
+    ) -> None:
+        super().__init__(address, _Handler)
+        self.corpus = corpus
+        self.slots = threading.BoundedSemaphore(max(1, max_concurrent))
+        self.max_request_bytes = max_request_bytes
+        self.quiet = quiet
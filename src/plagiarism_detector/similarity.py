@@ -2,23 +2,72 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from difflib import SequenceMatcher
-from typing import List, Sequence, Tuple
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy import sparse
+
+from .charsim import SEQUENCE_BACKENDS, blocks_ratio
+from .options import DEFAULT_FEATURES, DEFAULT_LCS_TOKENS, DEFAULT_TOP_K, LCS_MODES
+
+_EMPTY_KEYS = np.zeros(0, dtype=np.uint64)
+_ROLLING_MULT = np.uint64(0x9E3779B97F4A7C15)
+# Keys that must not depend on a vocabulary size which grows on every update (reference index, winnowing):
+# 2**32 keeps unigrams and bigrams exactly packed and switches to the rolling hash from trigrams on
+KEY_VOCAB = 2**32
+_ORDER_SALT = 0x9E3779B97F4A7C15
 
 
 @dataclass(frozen=True)
 class SimilarityConfig:
     ngram_n: int = 3
     tfidf_ngram_range: Tuple[int, int] = (1, 2)
-    max_lcs_tokens: int = 2000
-    weights: Tuple[float, float, float, float] = (0.45, 0.20, 0.20, 0.15)
-    # (tfidf, sequence, ngram_jaccard, lcs)
+    max_lcs_tokens: int = DEFAULT_LCS_TOKENS  # LCS window ("segmented") or cut-off ("truncate") in tokens
+    weights: Tuple[float, ...] = (0.45, 0.20, 0.20, 0.15)
+    # (tfidf, sequence, ngram_jaccard, lcs[, winnow]); the winnowing term is off unless a 5th weight is given
+    lcs_backend: str = "bitparallel"  # "bitparallel" | "dp" (reference)
+    lcs_mode: str = "truncate"  # "truncate": first max_lcs_tokens tokens | "segmented": windows chained over whole texts
+    candidate_mode: str = "exhaustive"  # "exhaustive" | "lsh"
+    minhash_num_perm: int = 128
+    lsh_bands: int = 32
+    lsh_max_bucket: int = 200  # archive/server queries: bands whose bucket holds more documents are skipped
+    candidate_tfidf_floor: Optional[float] = None  # None = derived from threshold and weights
+    sequence_backend: str = "difflib"  # "difflib" (reference) | "blocks" (k-gram matching blocks, ~linear)
+    max_sequence_chars: Optional[int] = None  # cap on characters per text for the sequence metric
+    cascade: bool = False  # skip metrics once upper bounds show a pair cannot reach the threshold / top-k
+    winnow_k: int = 5  # tokens per winnowing k-gram
+    winnow_window: int = 4  # k-grams per winnowing window: shared runs of k + window - 1 tokens are always found
+    # "exact": dense n x n cosine over the full n-gram vocabulary; "hashed": streaming hashed features and
+    # a sparse cosine holding only each document's top-k neighbours and pairs above the TF-IDF floor
+    tfidf_mode: str = "exact"
+    tfidf_features: int = DEFAULT_FEATURES
+    tfidf_top_k: int = DEFAULT_TOP_K
+
 
+def split_weights(weights: Sequence[float]) -> Tuple[float, float, float, float, float]:
+    # (tfidf, sequence, ngram, lcs, winnow) with winnow = 0.0 for the classic 4-weight tuple
+    if len(weights) not in (4, 5):
+        raise ValueError(f"weights must have 4 or 5 entries, got {len(weights)}")
+    w = [float(x) for x in weights] + [0.0] * (5 - len(weights))
+    return w[0], w[1], w[2], w[3], w[4]
 
-def sequence_ratio(a: str, b: str) -> float:
-    return float(SequenceMatcher(None, a, b).ratio())
+
+def sequence_ratio(
+    a: str,
+    b: str,
+    *,
+    backend: str = "difflib",
+    max_chars: Optional[int] = None,
+    min_ratio: Optional[float] = None,
+) -> float:
+    if max_chars is not None and max_chars > 0:
+        a = a[:max_chars]
+        b = b[:max_chars]
+    if backend == "difflib":
+        return float(SequenceMatcher(None, a, b).ratio())
+    if backend == "blocks":
+        return blocks_ratio(a, b, min_ratio=min_ratio)
+    raise ValueError(f"Unknown sequence backend: {backend!r} (expected one of {SEQUENCE_BACKENDS})")
 
 
 def word_ngrams(tokens: Sequence[str], n: int) -> List[Tuple[str, ...]]:
@@ -39,10 +88,117 @@ def ngram_jaccard(tokens_a: Sequence[str], tokens_b: Sequence[str], n: int = 3)
     return float(len(A & B) / len(A | B))
 
 
+def ngram_keys(ids: Sequence[int], n: int, vocab_size: int) -> np.ndarray:
+    # One uint64 key per word n-gram of a token-id sequence. Exact (collision-free) packing
+    # while vocab_size**n fits in 64 bits, a rolling multiplicative hash otherwise.
+    if n <= 0:
+        raise ValueError("n must be > 0")
+    arr = np.asarray(ids, dtype=np.int64).astype(np.uint64)
+    if arr.size < n:
+        return _EMPTY_KEYS
+    m = arr.size - n + 1
+    exact = max(vocab_size, 1) ** n <= 2**64
+    mult = np.uint64(max(vocab_size, 1)) if exact else _ROLLING_MULT
+
+    keys = arr[:m].copy()
+    for k in range(1, n):
+        keys = keys * mult + arr[k : k + m]
+    return keys
+
+
+def ngram_key_set(ids: Sequence[int], n: int, vocab_size: int) -> np.ndarray:
+    return np.unique(ngram_keys(ids, n, vocab_size))
+
+
+def mix64(keys: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer: spreads structured keys (packed token ids) over all 64 bits
+    z = keys.astype(np.uint64, copy=True)
+    z ^= z >> np.uint64(30)
+    z *= np.uint64(0xBF58476D1CE4E5B9)
+    z ^= z >> np.uint64(27)
+    z *= np.uint64(0x94D049BB133111EB)
+    z ^= z >> np.uint64(31)
+    return z
+
+
+def feature_counts(ids: np.ndarray, ngram_range: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    # TF-IDF features of one document as (sorted unique keys, counts); n-gram orders are salted apart
+    lo, hi = ngram_range
+    parts = [ngram_keys(ids, k, KEY_VOCAB) ^ np.uint64((k * _ORDER_SALT) % 2**64) for k in range(lo, hi + 1)]
+    keys = np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint64)
+    uniq, counts = np.unique(keys, return_counts=True)
+    return uniq, counts
+
+
+def ngram_jaccard_keys(keys_a: np.ndarray, keys_b: np.ndarray) -> float:
+    # Same semantics as ngram_jaccard, on sorted unique keys from ngram_key_set
+    if keys_a.size == 0 and keys_b.size == 0:
+        return 1.0
+    if keys_a.size == 0 or keys_b.size == 0:
+        return 0.0
+    inter = np.intersect1d(keys_a, keys_b, assume_unique=True).size
+    return float(inter / (keys_a.size + keys_b.size - inter))
+
+
+def ngram_incidence_matrix(key_sets: Sequence[np.ndarray]) -> sparse.csr_matrix:
+    # Binary document x n-gram matrix from sorted unique keys (ngram_key_set): every set is hashed once
+    n = len(key_sets)
+    sizes = np.asarray([k.size for k in key_sets], dtype=np.int64)
+    if n == 0 or not sizes.sum():
+        return sparse.csr_matrix((n, 0), dtype=np.int32)
+    uniq, cols = np.unique(np.concatenate(key_sets), return_inverse=True)
+    rows = np.repeat(np.arange(n), sizes)
+    data = np.ones(cols.size, dtype=np.int32)
+    return sparse.csr_matrix((data, (rows, cols.ravel())), shape=(n, uniq.size))
+
+
+_PAIR_CHUNK = 4096
+
+
+def ngram_jaccard_sparse(
+    key_sets: Sequence[np.ndarray], pairs: Optional[Iterable[Tuple[int, int]]] = None
+) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    # Jaccard of all document pairs from one sparse product: |A & B| = X @ X.T, |A | B| from the set
+    # sizes. Only pairs sharing an n-gram are stored; see jaccard_row for the full row. With `pairs`
+    # (candidate mode) only those pairs are intersected, row by row, so the cost follows the candidates.
+    X = ngram_incidence_matrix(key_sets)
+    sizes = np.asarray(X.sum(axis=1)).ravel().astype(np.int64)
+    if pairs is None:
+        inter = (X @ X.T).tocoo()
+        rows, cols, shared = inter.row, inter.col, inter.data
+    else:
+        idx = np.asarray(sorted(pairs), dtype=np.int64).reshape(-1, 2)
+        counts = [
+            np.asarray(X[idx[s : s + _PAIR_CHUNK, 0]].multiply(X[idx[s : s + _PAIR_CHUNK, 1]]).sum(axis=1)).ravel()
+            for s in range(0, len(idx), _PAIR_CHUNK)
+        ]
+        found = np.concatenate(counts) if counts else np.zeros(0, dtype=np.int64)
+        keep = found > 0
+        # Both triangles, like the full product
+        rows = np.concatenate([idx[keep, 0], idx[keep, 1]])
+        cols = np.concatenate([idx[keep, 1], idx[keep, 0]])
+        shared = np.concatenate([found[keep], found[keep]])
+    union = sizes[rows] + sizes[cols] - shared
+    jac = sparse.csr_matrix((shared / union, (rows, cols)), shape=(len(key_sets), len(key_sets)))
+    return jac, sizes
+
+
+def jaccard_row(jac: sparse.csr_matrix, sizes: np.ndarray, i: int) -> np.ndarray:
+    # Dense row i of the Jaccard matrix, with ngram_jaccard's conventions for empty sets
+    if sizes[i] == 0:
+        return (sizes == 0).astype(float)
+    row = np.zeros(jac.shape[1], dtype=float)
+    lo, hi = jac.indptr[i], jac.indptr[i + 1]
+    row[jac.indices[lo:hi]] = jac.data[lo:hi]
+    return row
+
+
 def cosine_tfidf_matrix(texts: List[str], ngram_range: Tuple[int, int] = (1, 2)) -> np.ndarray:
     if not texts:
         return np.zeros((0, 0), dtype=float)
 
+    from sklearn.feature_extraction.text import TfidfVectorizer  # slow import, only this text-based path needs it
+
     vec = TfidfVectorizer(ngram_range=ngram_range, min_df=1)
     try:
         X = vec.fit_transform(texts)
@@ -59,8 +215,71 @@ def cosine_tfidf_matrix(texts: List[str], ngram_range: Tuple[int, int] = (1, 2))
     return sim
 
 
-def lcs_length(a: Sequence[str], b: Sequence[str]) -> int:
-    # O(min(n,m)) memory DP
+def tfidf_counts_from_ids(
+    docs: Sequence[Sequence[int]],
+    vocab_size: int,
+    ngram_range: Tuple[int, int] = (1, 2),
+) -> sparse.csr_matrix:
+    # Document x n-gram count matrix built from token ids (no re-tokenization of joined text)
+    lo, hi = ngram_range
+    rows: List[np.ndarray] = []
+    cols: List[np.ndarray] = []
+    n_cols = 0
+    for k in range(lo, hi + 1):
+        per_doc = [ngram_keys(ids, k, vocab_size) for ids in docs]
+        all_keys = np.concatenate(per_doc) if per_doc else _EMPTY_KEYS
+        if all_keys.size == 0:
+            continue
+        uniq, inverse = np.unique(all_keys, return_inverse=True)
+        rows.append(np.repeat(np.arange(len(docs)), [x.size for x in per_doc]))
+        cols.append(inverse.ravel() + n_cols)
+        n_cols += uniq.size
+
+    if not rows:
+        return sparse.csr_matrix((len(docs), 0), dtype=float)
+    r = np.concatenate(rows)
+    c = np.concatenate(cols)
+    counts = sparse.coo_matrix((np.ones(r.size, dtype=float), (r, c)), shape=(len(docs), n_cols))
+    return counts.tocsr()
+
+
+def tfidf_weight(counts: sparse.csr_matrix) -> sparse.csr_matrix:
+    # TfidfTransformer() defaults (raw tf, smooth idf, l2-normalised rows) without importing scikit-learn
+    n = counts.shape[0]
+    df = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+    X = sparse.csr_matrix(counts.multiply(idf))
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    return sparse.csr_matrix(sparse.diags(np.where(norms > 0, 1.0 / np.maximum(norms, 1e-30), 0.0)) @ X)
+
+
+def cosine_tfidf_matrix_from_ids(
+    docs: Sequence[Sequence[int]],
+    vocab_size: int,
+    ngram_range: Tuple[int, int] = (1, 2),
+) -> np.ndarray:
+    n = len(docs)
+    if n == 0:
+        return np.zeros((0, 0), dtype=float)
+
+    counts = tfidf_counts_from_ids(docs, vocab_size, ngram_range)
+    if counts.shape[1] == 0:
+        sim = np.zeros((n, n), dtype=float)
+        np.fill_diagonal(sim, 1.0)
+        return sim
+
+    X = tfidf_weight(counts)
+    sim = (X @ X.T).toarray()
+    sim = np.clip(sim, 0.0, 1.0)
+    np.fill_diagonal(sim, 1.0)
+    return sim
+
+
+LCS_BACKENDS = ("bitparallel", "dp")
+
+
+def lcs_length_dp(a: Sequence[Hashable], b: Sequence[Hashable]) -> int:
+    # Reference implementation: O(min(n,m)) memory DP
     if len(a) < len(b):
         a, b = b, a
     prev = [0] * (len(b) + 1)
@@ -76,12 +295,191 @@ def lcs_length(a: Sequence[str], b: Sequence[str]) -> int:
     return prev[-1]
 
 
-def lcs_similarity(tokens_a: Sequence[str], tokens_b: Sequence[str], *, max_tokens: int = 2000) -> float:
-    a = list(tokens_a[:max_tokens])
-    b = list(tokens_b[:max_tokens])
+def lcs_length_bitparallel(a: Sequence[Hashable], b: Sequence[Hashable]) -> int:
+    # Allison-Dix / Hyyrö bit-vector LCS over Python big ints: O(n * m / wordsize).
+    # Bits index the longer sequence, the Python-level loop runs over the shorter one.
+    if len(a) > len(b):
+        a, b = b, a
+    m = len(b)
+    if not a or m == 0:
+        return 0
+
+    # Map tokens to integer ids once, then one match bitmask per id
+    ids: Dict[Hashable, int] = {}
+    masks: List[int] = []
+    for k, tok in enumerate(b):
+        idx = ids.get(tok)
+        if idx is None:
+            idx = ids[tok] = len(masks)
+            masks.append(0)
+        masks[idx] |= 1 << k
+
+    full = (1 << m) - 1
+    v = full
+    for tok in a:
+        idx = ids.get(tok)
+        if idx is None:
+            continue
+        u = v & masks[idx]
+        v = ((v + u) | (v - u)) & full
+    return m - v.bit_count()
+
+
+def lcs_length(a: Sequence[Hashable], b: Sequence[Hashable], *, backend: str = "bitparallel") -> int:
+    if backend == "bitparallel":
+        return lcs_length_bitparallel(a, b)
+    if backend == "dp":
+        return lcs_length_dp(a, b)
+    raise ValueError(f"Unknown LCS backend: {backend!r} (expected one of {LCS_BACKENDS})")
+
+
+def _as_list(tokens: Sequence[Hashable]) -> List[Hashable]:
+    return tokens.tolist() if isinstance(tokens, np.ndarray) else list(tokens)
+
+
+def lcs_similarity(
+    tokens_a: Sequence[Hashable],
+    tokens_b: Sequence[Hashable],
+    *,
+    max_tokens: int = 2000,
+    backend: str = "bitparallel",
+) -> float:
+    # Memory-mapped id arrays (corpus store) go through tolist(): plain ints hash and compare faster
+    a = _as_list(tokens_a[:max_tokens])
+    b = _as_list(tokens_b[:max_tokens])
     if not a and not b:
         return 1.0
     if not a or not b:
         return 0.0
-    lcs_len = lcs_length(a, b)
+    lcs_len = lcs_length(a, b, backend=backend)
     return float(2.0 * lcs_len / (len(a) + len(b)))
+
+
+def _lcs_end(a: Sequence[Hashable], b: Sequence[Hashable], backend: str) -> Tuple[int, int]:
+    # (LCS of a and b, shortest prefix b[:end] that still holds the whole LCS)
+    if not a or not b:
+        return 0, 0
+    if backend == "dp":
+        prev = [0] * (len(b) + 1)
+        for ai in a:
+            cur = [0]
+            for j, bj in enumerate(b):
+                cur.append(prev[j] + 1 if ai == bj else max(prev[j + 1], cur[-1]))
+            prev = cur
+        return prev[-1], prev.index(prev[-1])
+    if backend != "bitparallel":
+        raise ValueError(f"Unknown LCS backend: {backend!r} (expected one of {LCS_BACKENDS})")
+    ids: Dict[Hashable, int] = {}
+    masks: List[int] = []
+    for k, tok in enumerate(b):
+        idx = ids.get(tok)
+        if idx is None:
+            idx = ids[tok] = len(masks)
+            masks.append(0)
+        masks[idx] |= 1 << k
+    full = (1 << len(b)) - 1
+    v = full
+    for tok in a:
+        idx = ids.get(tok)
+        if idx is not None:
+            u = v & masks[idx]
+            v = ((v + u) | (v - u)) & full
+    # Zero bits of v below k count LCS(a, b[:k]): the highest zero bit ends the shortest prefix
+    zeros = ~v & full
+    return zeros.bit_count(), zeros.bit_length()
+
+
+def _region_candidates(a: np.ndarray, b: np.ndarray, window: int) -> List[List[int]]:
+    # Per window of `a`: start offsets in `b` of a few two-window regions worth aligning it with, on a
+    # half-window grid: the two sharing the most distinct tokens with it, and the one on the diagonal
+    half = max(1, window // 2)
+    n_a = (a.size + window - 1) // window
+    n_b = (b.size + half - 1) // half
+    vocab = int(max(a.max(), b.max())) + 1
+
+    def blocks(ids: np.ndarray, size: int, n: int) -> sparse.csr_matrix:
+        m = sparse.csr_matrix((np.ones(ids.size, dtype=np.float32), (np.arange(ids.size) // size, ids)), shape=(n, vocab))
+        m.data[:] = 1.0  # distinct tokens: duplicates were summed
+        return m
+
+    shared = (blocks(a, window, n_a) @ blocks(b, half, n_b).T).toarray()
+    # A region starting at half-block g spans blocks g .. g + 3
+    csum = np.concatenate([np.zeros((n_a, 1)), np.cumsum(shared, axis=1)], axis=1)
+    region = csum[:, np.minimum(np.arange(n_b) + 4, n_b)] - csum[:, :n_b]
+    out: List[List[int]] = []
+    for w in range(n_a):
+        best = np.argsort(-region[w], kind="stable")[:2].tolist()
+        diagonal = min(n_b - 1, int(round(w * window * b.size / max(a.size, 1) / half)))
+        out.append(sorted({g * half for g in best + [diagonal]}))
+    return out
+
+
+def _chained_lcs(a: np.ndarray, b: np.ndarray, window: int, backend: str) -> int:
+    # Lower bound of LCS(a, b): each window of `a` is aligned with candidate regions of `b`, and the best
+    # monotone chain is kept (windows in order, each window's matches after the previous window's). The
+    # chained matches form one common subsequence, so the sum never exceeds the true LCS.
+    a_list, b_list = a.tolist(), b.tolist()
+    wins: List[int] = []
+    firsts: List[int] = []
+    ends: List[int] = []
+    gains: List[int] = []
+    for w, cands in enumerate(_region_candidates(a, b, window)):
+        part = a_list[w * window : (w + 1) * window]
+        for start in cands:
+            length, end = _lcs_end(part, b_list[start : start + 2 * window], backend)
+            if length:
+                # The matches also fit in b[first:end] for the latest such first: chain on that span
+                span = b_list[start : start + end]
+                first = start + end - _lcs_end(part[::-1], span[::-1], backend)[1]
+                wins.append(w)
+                firsts.append(first)
+                ends.append(start + end)
+                gains.append(length)
+    if not gains:
+        return 0
+    w_arr, end_arr = np.asarray(wins), np.asarray(ends)
+    best = np.zeros(len(gains), dtype=np.int64)
+    for p in range(len(gains)):  # candidates are ordered by window
+        prev = (w_arr[:p] < wins[p]) & (end_arr[:p] <= firsts[p])
+        best[p] = gains[p] + (int(best[:p][prev].max()) if prev.any() else 0)
+    return int(best.max())
+
+
+def segmented_lcs_similarity(
+    tokens_a: Sequence[Hashable],
+    tokens_b: Sequence[Hashable],
+    *,
+    window: int = DEFAULT_LCS_TOKENS,
+    backend: str = "bitparallel",
+) -> float:
+    # LCS similarity of long documents without truncation: 2 * L / (n + m), where L is the longer of the two
+    # window chains (_chained_lcs, each direction), a lower bound of the LCS. Cost grows linearly with length;
+    # a passage moved to another place counts only where it keeps the order. Equals lcs_similarity() when
+    # both documents fit in one window.
+    if len(tokens_a) <= window and len(tokens_b) <= window:
+        return lcs_similarity(tokens_a, tokens_b, max_tokens=window, backend=backend)
+    if not len(tokens_a) or not len(tokens_b):
+        return 0.0
+    codes: Dict[Hashable, int] = {}
+    a, b = (
+        np.fromiter((codes.setdefault(t, len(codes)) for t in _as_list(x)), dtype=np.int64, count=len(x))
+        for x in (tokens_a, tokens_b)
+    )
+    matched = max(_chained_lcs(a, b, window, backend), _chained_lcs(b, a, window, backend))
+    return float(2.0 * matched / (a.size + b.size))
+
+
+def token_lcs_similarity(tokens_a: Sequence[Hashable], tokens_b: Sequence[Hashable], cfg: SimilarityConfig) -> float:
+    # The LCS metric as configured: the first max_lcs_tokens tokens only (default) or segmented
+    if cfg.lcs_mode == "segmented":
+        return segmented_lcs_similarity(tokens_a, tokens_b, window=cfg.max_lcs_tokens, backend=cfg.lcs_backend)
+    if cfg.lcs_mode == "truncate":
+        return lcs_similarity(tokens_a, tokens_b, max_tokens=cfg.max_lcs_tokens, backend=cfg.lcs_backend)
+    raise ValueError(f"Unknown lcs_mode: {cfg.lcs_mode!r} (expected one of {LCS_MODES})")
+
+
+def lcs_lengths(len_a: int, len_b: int, cfg: SimilarityConfig) -> Tuple[int, int]:
+    # Token counts the LCS metric looks at (for its length bound)
+    if cfg.lcs_mode == "truncate":
+        return min(len_a, cfg.max_lcs_tokens), min(len_b, cfg.max_lcs_tokens)
+    return len_a, len_b
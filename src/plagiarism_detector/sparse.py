@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+HIST_BINS = 20
+
+
+@dataclass(frozen=True)
+class SparsePairs:
+    # Sparse similarity result: COO arrays (i < j) holding the top-k neighbours of every document
+    # plus every pair scoring >= floor. Aggregates over *all* pairs are kept separately, since the
+    # dropped pairs are needed for mean/median/histogram.
+    n: int
+    rows: np.ndarray  # int32
+    cols: np.ndarray  # int32
+    scores: np.ndarray  # float64, rounded to 6 digits like the dense matrix
+    top_k: int
+    floor: float
+    n_pairs: int
+    mean: Optional[float]
+    median: Optional[float]
+    hist: np.ndarray  # counts over HIST_BINS equal bins of [0, 1]
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "format": "coo",
+            "n": self.n,
+            "top_k": self.top_k,
+            "floor": self.floor,
+            "n_pairs": self.n_pairs,
+            "mean": self.mean,
+            "median": self.median,
+            "hist": self.hist.tolist(),
+            "rows": self.rows.tolist(),
+            "cols": self.cols.tolist(),
+            "scores": self.scores.tolist(),
+        }
+
+    @classmethod
+    def from_json(cls, payload: Dict[str, Any]) -> "SparsePairs":
+        return cls(
+            n=int(payload["n"]),
+            rows=np.asarray(payload["rows"], dtype=np.int32),
+            cols=np.asarray(payload["cols"], dtype=np.int32),
+            scores=np.asarray(payload["scores"], dtype=np.float64),
+            top_k=int(payload["top_k"]),
+            floor=float(payload["floor"]),
+            n_pairs=int(payload["n_pairs"]),
+            mean=payload.get("mean"),
+            median=payload.get("median"),
+            hist=np.asarray(payload.get("hist", [0] * HIST_BINS), dtype=np.int64),
+        )
+
+    def to_dense(self) -> np.ndarray:
+        mat = np.zeros((self.n, self.n), dtype=float)
+        mat[self.rows, self.cols] = self.scores
+        mat[self.cols, self.rows] = self.scores
+        np.fill_diagonal(mat, 1.0)
+        return mat
+
+
+def condensed_size(n: int) -> int:
+    return n * (n - 1) // 2
+
+
+def condensed_index(i: int, j: int, n: int) -> int:
+    # Position of pair (i, j), i < j, in the row-major upper triangle
+    return i * n - i * (i + 1) // 2 + (j - i - 1)
+
+
+def _row_starts(n: int) -> np.ndarray:
+    i = np.arange(n, dtype=np.int64)
+    return i * n - i * (i + 1) // 2
+
+
+def condensed_to_pairs(idx: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    starts = _row_starts(n)
+    rows = np.searchsorted(starts, idx, side="right") - 1
+    cols = idx - starts[rows] + rows + 1
+    return rows, cols
+
+
+# Scores are kept rounded to 6 digits (like the dense matrix), so their distribution fits one count per value
+_SCALE = 10**6
+
+
+class SparseAccumulator:
+    # Sparse result built while pairs are scored: the top_k best neighbours of every document (an n x top_k
+    # table), pairs >= floor, and counts of every rounded score for the aggregates. Memory stays O(n * top_k)
+    # plus the kept pairs, not one slot per pair. Pairs never added count as score 0.
+    def __init__(self, n: int, *, top_k: int, floor: float) -> None:
+        self.n = n
+        self.top_k = int(top_k)
+        self.floor = float(floor)
+        width = max(self.top_k, 0)
+        self._best = np.full((n, width), -1, dtype=np.int64)  # rounded scores (-1: empty slot)
+        self._partner = np.full((n, width), -1, dtype=np.int64)
+        self._worst = np.full(n, -1 if width else _SCALE + 1, dtype=np.int64)  # lowest kept score per document
+        self._kept_keys: List[np.ndarray] = []
+        self._kept_scores: List[np.ndarray] = []
+        self._kept_pair_keys: List[int] = []
+        self._kept_pair_scores: List[int] = []
+        self._counts = np.zeros(_SCALE + 1, dtype=np.int64)
+        self._added = 0
+
+    def add(self, i: int, j: int, score: float) -> None:
+        # One pair (i < j): scalar path of add_row() for the scoring loop
+        value = round(min(max(score, 0.0), 1.0) * _SCALE)
+        self._added += 1
+        self._counts[value] += 1
+        if value / _SCALE >= self.floor:
+            self._kept_pair_keys.append(condensed_index(i, j, self.n))
+            self._kept_pair_scores.append(value)
+        if self.top_k > 0:
+            for doc, partner in ((j, i), (i, j)):
+                if value > self._worst[doc]:
+                    best = self._best[doc]
+                    slot = int(np.argmin(best))
+                    best[slot] = value
+                    self._partner[doc, slot] = partner
+                    self._worst[doc] = best.min()
+
+    def add_row(self, i: int, cols: np.ndarray, scores: np.ndarray) -> None:
+        # Pairs (i, j) for all j in cols, every j > i and each pair added once
+        cols = np.asarray(cols, dtype=np.int64)
+        values = np.rint(np.clip(scores, 0.0, 1.0) * _SCALE).astype(np.int64)
+        self._added += values.size
+        uniq, counts = np.unique(values, return_counts=True)
+        self._counts[uniq] += counts
+        keep = values / _SCALE >= self.floor
+        if keep.any():
+            self._kept_keys.append(condensed_index(i, i + 1, self.n) + cols[keep] - (i + 1))
+            self._kept_scores.append(values[keep])
+        if self.top_k <= 0:
+            return
+        # Column side: each j takes the pair if it beats j's lowest kept score (earlier pairs win ties)
+        better = values > self._worst[cols]
+        if better.any():
+            js, vs = cols[better], values[better]
+            slot = np.argmin(self._best[js], axis=1)
+            self._best[js, slot] = vs
+            self._partner[js, slot] = i
+            self._worst[js] = self._best[js].min(axis=1)
+        # Row side: merge the row's best pairs into i's table
+        if values.size > self.top_k:
+            top = np.argpartition(-values, self.top_k - 1)[: self.top_k]
+            cols, values = cols[top], values[top]
+        merged_v = np.concatenate([self._best[i], values])
+        merged_p = np.concatenate([self._partner[i], cols])
+        order = np.argsort(-merged_v, kind="stable")[: self.top_k]
+        self._best[i], self._partner[i] = merged_v[order], merged_p[order]
+        self._worst[i] = self._best[i].min()
+
+    def result(self) -> SparsePairs:
+        n_pairs = condensed_size(self.n)
+        self._counts[0] += n_pairs - self._added
+        keys = self._kept_keys + [np.asarray(self._kept_pair_keys, dtype=np.int64)]
+        values = self._kept_scores + [np.asarray(self._kept_pair_scores, dtype=np.int64)]
+        filled = self._partner >= 0
+        if filled.any():
+            docs = np.broadcast_to(np.arange(self.n, dtype=np.int64)[:, None], self._partner.shape)[filled]
+            partners = self._partner[filled]
+            lo, hi = np.minimum(docs, partners), np.maximum(docs, partners)
+            keys.append(_row_starts(self.n)[lo] + hi - lo - 1)
+            values.append(self._best[filled])
+        sel, first = np.unique(np.concatenate(keys), return_index=True)
+        all_values = np.concatenate(values)
+        rows, cols = condensed_to_pairs(sel, self.n)
+
+        grid = np.arange(_SCALE + 1) / _SCALE
+        if n_pairs:
+            mean: Optional[float] = float((self._counts * np.arange(_SCALE + 1)).sum() / _SCALE / n_pairs)
+            cum = np.cumsum(self._counts)
+            lo_v, hi_v = np.searchsorted(cum, [(n_pairs - 1) // 2 + 1, n_pairs // 2 + 1])
+            median: Optional[float] = float((grid[lo_v] + grid[hi_v]) / 2)
+        else:
+            mean = median = None
+        hist, _ = np.histogram(grid, bins=HIST_BINS, range=(0.0, 1.0), weights=self._counts)
+
+        return SparsePairs(
+            n=self.n,
+            rows=rows.astype(np.int32),
+            cols=cols.astype(np.int32),
+            scores=all_values[first] / _SCALE,
+            top_k=self.top_k,
+            floor=self.floor,
+            n_pairs=n_pairs,
+            mean=mean,
+            median=median,
+            hist=hist.astype(np.int64),
+        )
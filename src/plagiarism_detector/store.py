@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cache import ExtractionCache
+from .preprocess import PreprocessConfig, tokenize
+from .readers import FolderReadResult, list_folder, read_folder_detailed
+from .vocab import Vocabulary
+
+try:  # POSIX: one writer at a time per store directory
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: no cross-process lock
+    fcntl = None  # type: ignore[assignment]
+
+STORE_VERSION = 1
+
+# Files read and tokenized per step while syncing a store (bounds the texts held in memory)
+_SYNC_CHUNK = 256
+
+
+def now_utc() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def atomic_write(path: Path, write: Any) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        with tmp.open("wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def save_npy(path: Path, arr: np.ndarray) -> None:
+    atomic_write(path, lambda f: np.save(f, np.ascontiguousarray(arr), allow_pickle=False))
+
+
+# A directory of append-only raw arrays (<name>.bin, read through np.memmap) with per-document extents in
+# <name>_offsets.npy, small per-document .npy tables and a manifest.json that is replaced last on every
+# commit. Readers never see uncommitted bytes: appends go past the committed extents, the .npy files are
+# replaced atomically and an open reader keeps the mapping it has. Shared by the reference index and the
+# corpus store; subclasses list their arrays in BINS (name -> dtype).
+class ArrayStore:
+    BINS: Dict[str, Any] = {}
+
+    def __init__(self, directory: Path, manifest: Dict[str, Any]) -> None:
+        self.directory = Path(directory)
+        self.manifest = manifest
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return int(self.manifest["n_docs"])
+
+    def _bin(self, name: str) -> np.ndarray:
+        if name not in self._arrays:
+            path = self.directory / f"{name}.bin"
+            dtype = np.dtype(self.BINS[name])
+            if not path.exists() or path.stat().st_size == 0:
+                self._arrays[name] = np.zeros(0, dtype=dtype)
+            else:
+                self._arrays[name] = np.memmap(path, dtype=dtype, mode="r")
+        return self._arrays[name]
+
+    def _npy(self, name: str) -> np.ndarray:
+        if name not in self._arrays:
+            self._arrays[name] = np.load(self.directory / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+        return self._arrays[name]
+
+    def _slice(self, name: str, i: int) -> np.ndarray:
+        offsets = self._npy(f"{name}_offsets")
+        return self._bin(name)[int(offsets[i]) : int(offsets[i + 1])]
+
+
+class ArrayWriter:
+    # Appends to the raw arrays of an ArrayStore directory; OFFSETS names the ragged ones
+    BINS: Dict[str, Any] = {}
+    OFFSETS: Tuple[str, ...] = ()
+
+    def __init__(self, directory: Path, manifest: Dict[str, Any]) -> None:
+        self.directory = Path(directory)
+        self.manifest = manifest
+        self.offsets: Dict[str, List[int]] = {}
+        for name in self.OFFSETS:
+            path = self.directory / f"{name}_offsets.npy"
+            self.offsets[name] = np.load(path).tolist() if path.exists() else [0]
+        self.files: Dict[str, Any] = {}
+
+    def _truncate(self, ends: Dict[str, int]) -> None:
+        # Drop items past the committed extents (an interrupted earlier run) before appending
+        for name, count in ends.items():
+            with (self.directory / f"{name}.bin").open("ab") as f:
+                f.truncate(count * np.dtype(self.BINS[name]).itemsize)
+
+    def _append(self, name: str, arr: np.ndarray) -> None:
+        f = self.files.get(name)
+        if f is None:
+            f = self.files[name] = (self.directory / f"{name}.bin").open("ab")
+        f.write(np.ascontiguousarray(arr, dtype=self.BINS[name]).tobytes())
+
+    def _extend(self, name: str, arr: np.ndarray) -> None:
+        # Appends one document's extent of a ragged array
+        self._append(name, arr)
+        self.offsets[name].append(self.offsets[name][-1] + arr.size)
+
+    def _close(self) -> None:
+        for f in self.files.values():
+            f.close()
+        self.files.clear()
+
+    def _commit(self, **updates: Any) -> Dict[str, Any]:
+        # Offsets, then the manifest (readers open the manifest first, so it goes last)
+        self._close()
+        for name in self.OFFSETS:
+            save_npy(self.directory / f"{name}_offsets.npy", np.asarray(self.offsets[name], dtype=np.int64))
+        self.manifest.update(updated_at_utc=now_utc(), **updates)
+        text = json.dumps(self.manifest, ensure_ascii=False, indent=2).encode("utf-8")
+        atomic_write(self.directory / "manifest.json", lambda f: f.write(text))
+        return self.manifest
+
+
+_CORPUS_BINS = {
+    "vocab": np.uint8,  # UTF-8 token strings, in id order
+    "tokens": np.int32,
+    "texts": np.uint8,  # UTF-8
+    "names": np.uint8,  # UTF-8, path relative to the synced folder
+    "fingerprints": np.uint8,  # raw SHA-256 of the text, 32 bytes per document
+}
+_CORPUS_OFFSETS = ("vocab", "tokens", "texts", "names")
+# files.npy columns per document: size and mtime (ns) of the source file, characters of the text
+_FILE_COLUMNS = 3
+
+
+# Persistent tokenized corpus: token ids of every document in one contiguous int32 array, its texts,
+# names, fingerprints and the vocabulary. Arrays are memory-mapped, so any number of processes share one
+# copy through the page cache, and token_ids(i) is a zero-copy view. Documents are appended; a changed or
+# removed file only deactivates its old record (delete the directory to reclaim that space).
+class CorpusStore(ArrayStore):
+    BINS = _CORPUS_BINS
+
+    @classmethod
+    def open(cls, directory: Path) -> "CorpusStore":
+        directory = Path(directory)
+        manifest = json.loads((directory / "manifest.json").read_text(encoding="utf-8"))
+        if manifest.get("version") != STORE_VERSION or manifest.get("kind") != "corpus":
+            raise ValueError(f"Not a corpus store (version {manifest.get('version')!r}): {directory}")
+        return cls(directory, manifest)
+
+    @property
+    def preprocess_cfg(self) -> PreprocessConfig:
+        return PreprocessConfig(**self.manifest["preprocess"])
+
+    @property
+    def vocab_size(self) -> int:
+        return int(self.manifest["n_vocab"])
+
+    @property
+    def active(self) -> np.ndarray:
+        return self._npy("active")
+
+    def name(self, i: int) -> str:
+        return bytes(self._slice("names", i)).decode("utf-8")
+
+    def text(self, i: int) -> str:
+        return bytes(self._slice("texts", i)).decode("utf-8", errors="surrogatepass")
+
+    def token_ids(self, i: int) -> np.ndarray:
+        return self._slice("tokens", i)
+
+    def fingerprint(self, i: int) -> str:
+        return bytes(self._bin("fingerprints")[32 * i : 32 * (i + 1)]).hex()
+
+    def chars(self, i: int) -> int:
+        return int(self._npy("files")[i, 2])
+
+    def file_stat(self, i: int) -> Tuple[int, int]:
+        size, mtime_ns, _ = self._npy("files")[i].tolist()
+        return int(size), int(mtime_ns)
+
+    def tokens(self) -> List[str]:
+        # The vocabulary in id order (decoded on demand: only writers need it)
+        data = bytes(self._bin("vocab"))
+        offsets = self._npy("vocab_offsets").tolist()
+        return [data[a:b].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+
+    def describe(self) -> Dict[str, Any]:
+        n_active = int(np.count_nonzero(self.active)) if len(self) else 0
+        return {
+            "dir": str(self.directory),
+            "n_docs": len(self),
+            "n_active": n_active,
+            "n_tokens": int(self._npy("tokens_offsets")[-1]) if len(self) else 0,
+            "n_vocab": self.vocab_size,
+        }
+
+
+class StoreTexts(Sequence[str]):
+    # Texts of selected store rows, decoded from the memory map on access (nothing held per document)
+    def __init__(self, store: CorpusStore, rows: Sequence[int]) -> None:
+        self.store = store
+        self.rows = list(rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, idx: Any) -> Any:
+        if isinstance(idx, slice):
+            return [self.store.text(r) for r in self.rows[idx]]
+        return self.store.text(self.rows[idx])
+
+
+class _CorpusWriter(ArrayWriter):
+    BINS = _CORPUS_BINS
+    OFFSETS = _CORPUS_OFFSETS
+
+    def __init__(self, directory: Path, manifest: Dict[str, Any], tokens: List[str]) -> None:
+        super().__init__(directory, manifest)
+        n = len(self.offsets["names"]) - 1
+        self.active: List[bool] = np.load(self.directory / "active.npy").tolist() if n else []
+        self.file_rows: List[List[int]] = np.load(self.directory / "files.npy").tolist() if n else []
+        self.vocab = Vocabulary()
+        self.vocab.intern(tokens)
+        self.n_vocab = len(tokens)
+        self._truncate(
+            {
+                "vocab": self.offsets["vocab"][-1],
+                "tokens": self.offsets["tokens"][-1],
+                "texts": self.offsets["texts"][-1],
+                "names": self.offsets["names"][-1],
+                "fingerprints": 32 * n,
+            }
+        )
+
+    def add(self, name: str, text: str, size: int, mtime_ns: int) -> int:
+        ids = np.frombuffer(self.vocab.intern(tokenize(text, PreprocessConfig(**self.manifest["preprocess"]))), dtype=np.int32)
+        for tok in self.vocab.decode(range(self.n_vocab, len(self.vocab))):
+            self._extend("vocab", np.frombuffer(tok.encode("utf-8"), dtype=np.uint8))
+        self.n_vocab = len(self.vocab)
+        raw = text.encode("utf-8", errors="surrogatepass")
+        self._extend("tokens", ids)
+        self._extend("texts", np.frombuffer(raw, dtype=np.uint8))
+        self._extend("names", np.frombuffer(name.encode("utf-8"), dtype=np.uint8))
+        self._append("fingerprints", np.frombuffer(hashlib.sha256(raw).digest(), dtype=np.uint8))
+        self.active.append(True)
+        self.file_rows.append([size, mtime_ns, len(text)])
+        return len(self.active) - 1
+
+    def finish(self) -> Dict[str, Any]:
+        self._close()
+        save_npy(self.directory / "active.npy", np.asarray(self.active, dtype=bool))
+        files = np.asarray(self.file_rows, dtype=np.int64).reshape(-1, _FILE_COLUMNS)
+        save_npy(self.directory / "files.npy", files)
+        return self._commit(n_docs=len(self.active), n_vocab=self.n_vocab)
+
+
+@contextmanager
+def _locked(directory: Path) -> Iterator[None]:
+    directory.mkdir(parents=True, exist_ok=True)
+    with (directory / "lock").open("w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def sync_corpus_store(
+    store_dir: Path,
+    folder: Path,
+    *,
+    preprocess_cfg: PreprocessConfig = PreprocessConfig(),
+    exts: Optional[Iterable[str]] = None,
+    recursive: bool = True,
+    cache: Optional[ExtractionCache] = None,
+    workers: int = 1,
+) -> Tuple[CorpusStore, List[int], FolderReadResult, Dict[str, int]]:
+    # Brings the store in line with `folder`: files with an unchanged size and mtime are reused without
+    # reading or tokenizing them, new and changed ones are read (in chunks) and appended, records of
+    # changed and removed files are deactivated. Returns the reopened store, the store row of every
+    # readable file in folder order, the read result of the files that had to be read, and counts.
+    store_dir = Path(store_dir)
+    folder = Path(folder)
+    with _locked(store_dir):
+        manifest_path = store_dir / "manifest.json"
+        if manifest_path.exists():
+            store: Optional[CorpusStore] = CorpusStore.open(store_dir)
+            assert store is not None
+            if store.preprocess_cfg != preprocess_cfg:
+                raise ValueError(f"Corpus store {store_dir} was built with other preprocessing settings")
+            manifest = dict(store.manifest)
+        else:
+            store = None
+            manifest = {
+                "version": STORE_VERSION,
+                "kind": "corpus",
+                "created_at_utc": now_utc(),
+                "preprocess": asdict(preprocess_cfg),
+                "n_docs": 0,
+                "n_vocab": 0,
+            }
+
+        current: Dict[str, int] = {}
+        if store is not None and len(store):
+            for i in np.flatnonzero(store.active).tolist():
+                current[store.name(i)] = i
+
+        paths = list_folder(folder, exts=exts, recursive=recursive)
+        rows: Dict[str, int] = {}
+        stale: List[Path] = []
+        for p in paths:
+            name = p.relative_to(folder).as_posix()
+            st = p.stat()
+            old = current.get(name)
+            if old is not None and store is not None and store.file_stat(old) == (st.st_size, st.st_mtime_ns):
+                rows[name] = old
+            else:
+                stale.append(p)
+
+        read = FolderReadResult()
+        counts = {"reused": len(rows), "added": 0, "replaced": 0, "removed": 0}
+        seen = {p.relative_to(folder).as_posix() for p in paths}
+        removed = [i for name, i in current.items() if name not in seen]
+        if stale or removed or store is None:
+            writer = _CorpusWriter(store_dir, manifest, store.tokens() if store is not None and len(store) else [])
+            for i in removed:
+                writer.active[i] = False
+            counts["removed"] = len(removed)
+            for start in range(0, len(stale), _SYNC_CHUNK):
+                chunk = read_folder_detailed(folder, cache=cache, workers=workers, paths=stale[start : start + _SYNC_CHUNK])
+                read.failures.extend(chunk.failures)
+                read.seconds.update(chunk.seconds)
+                for doc in chunk.documents:
+                    name = doc.path.relative_to(folder).as_posix()
+                    old = current.get(name)
+                    if old is not None:
+                        writer.active[old] = False
+                        counts["replaced"] += 1
+                    else:
+                        counts["added"] += 1
+                    st = doc.path.stat()
+                    rows[name] = writer.add(name, doc.text, st.st_size, st.st_mtime_ns)
+            writer.finish()
+            store = CorpusStore.open(store_dir)
+
+    order = [rows[n] for n in (p.relative_to(folder).as_posix() for p in paths) if n in rows]
+    return store, order, read, counts
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, List, Sequence
+
+# Compact per-document token storage: int32 ids, 4 bytes per token
+TokenIds = array
+
+
+class Vocabulary:
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._tokens: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def __contains__(self, token: object) -> bool:
+        return token in self._ids
+
+    def intern(self, tokens: Iterable[str]) -> TokenIds:
+        ids = self._ids
+        out = array("i")
+        for tok in tokens:
+            idx = ids.get(tok)
+            if idx is None:
+                idx = ids[tok] = len(self._tokens)
+                self._tokens.append(tok)
+            out.append(idx)
+        return out
+
+    def lookup(self, tokens: Iterable[str], *, unknown: int = -1) -> TokenIds:
+        # Like intern(), but does not grow the vocabulary
+        ids = self._ids
+        return array("i", (ids.get(tok, unknown) for tok in tokens))
+
+    def token(self, idx: int) -> str:
+        return self._tokens[idx]
+
+    def decode(self, ids: Sequence[int]) -> List[str]:
+        return [self._tokens[i] for i in ids]
+
+    @property
+    def tokens(self) -> List[str]:
+        return list(self._tokens)
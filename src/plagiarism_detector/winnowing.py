@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .similarity import KEY_VOCAB, mix64, ngram_keys
+
+# MOSS-style winnowing (Schleimer, Wilkerson, Aiken 2003) over token ids: hash every k-gram of tokens,
+# keep the minimum hash of each window of `window` consecutive k-grams. Any shared run of at least
+# k + window - 1 tokens is guaranteed to produce a shared fingerprint.
+DEFAULT_K = 5
+DEFAULT_WINDOW = 4
+
+# Positions in b matched per fingerprint of a: keeps repetitive texts (same sentence 1000 times) linear
+MAX_POSTINGS = 4
+
+
+@dataclass(frozen=True)
+class Fingerprints:
+    hashes: np.ndarray  # uint64, in position order
+    positions: np.ndarray  # int32 token index of the k-gram start
+    n_tokens: int
+
+
+@dataclass(frozen=True)
+class Passage:
+    # Shared passage in token positions, [start, end) in each document
+    a_start: int
+    a_end: int
+    b_start: int
+    b_end: int
+
+    @property
+    def length(self) -> int:
+        return min(self.a_end - self.a_start, self.b_end - self.b_start)
+
+
+def kgram_hashes(ids: Sequence[int], k: int) -> np.ndarray:
+    return mix64(ngram_keys(ids, k, KEY_VOCAB))
+
+
+def winnow(hashes: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    # (positions, hashes) of the selected k-grams; ties go to the rightmost minimum ("robust winnowing")
+    if window <= 0:
+        raise ValueError("window must be > 0")
+    if hashes.size == 0:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.uint64)
+    if hashes.size <= window:
+        pos = np.asarray([hashes.size - 1 - int(np.argmin(hashes[::-1]))], dtype=np.int64)
+    else:
+        windows = np.lib.stride_tricks.sliding_window_view(hashes, window)
+        rightmost = window - 1 - np.argmin(windows[:, ::-1], axis=1)
+        pos = np.unique(np.arange(windows.shape[0]) + rightmost)
+    return pos.astype(np.int32), hashes[pos]
+
+
+def fingerprints(ids: Sequence[int], *, k: int = DEFAULT_K, window: int = DEFAULT_WINDOW) -> Fingerprints:
+    positions, hashes = winnow(kgram_hashes(ids, k), window)
+    return Fingerprints(hashes=hashes, positions=positions, n_tokens=len(ids))
+
+
+class WinnowIndex:
+    # Inverted index fingerprint -> (document, position) over a corpus, sorted by hash
+    def __init__(self, docs: Sequence[Fingerprints], *, k: int = DEFAULT_K, window: int = DEFAULT_WINDOW) -> None:
+        self.docs = list(docs)
+        self.k = k
+        self.window = window
+        sizes = [d.hashes.size for d in self.docs]
+        hashes = np.concatenate([d.hashes for d in self.docs]) if self.docs else np.zeros(0, dtype=np.uint64)
+        order = np.argsort(hashes, kind="stable")
+        self.hashes = hashes[order]
+        self.doc_ids = np.repeat(np.arange(len(self.docs), dtype=np.int32), sizes)[order]
+        self.positions = (np.concatenate([d.positions for d in self.docs]) if self.docs else np.zeros(0, dtype=np.int32))[
+            order
+        ]
+
+    def postings(self, h: int) -> Tuple[np.ndarray, np.ndarray]:
+        lo = np.searchsorted(self.hashes, np.uint64(h), side="left")
+        hi = np.searchsorted(self.hashes, np.uint64(h), side="right")
+        return self.doc_ids[lo:hi], self.positions[lo:hi]
+
+    def shared_counts(self, *, max_df: Optional[int] = None) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        # Distinct shared fingerprints for all pairs from one sparse product (the diagonal holds each
+        # document's own count). Fingerprints present in more than `max_df` documents (templates,
+        # task statements) can be ignored; this also keeps the product sparse.
+        n = len(self.docs)
+        if not self.hashes.size:
+            return sparse.csr_matrix((n, n), dtype=np.int64), np.zeros(n, dtype=np.int64)
+        pairs = np.unique(np.stack([self.hashes, self.doc_ids.astype(np.uint64)], axis=1), axis=0)
+        uniq, cols = np.unique(pairs[:, 0], return_inverse=True)
+        rows = pairs[:, 1].astype(np.int64)
+        X = sparse.csr_matrix((np.ones(rows.size, dtype=np.int64), (rows, cols.ravel())), shape=(n, uniq.size))
+        if max_df is not None:
+            df = np.asarray(X.sum(axis=0)).ravel()
+            X = X[:, np.flatnonzero(df <= max_df)]
+        sizes = np.asarray(X.sum(axis=1)).ravel().astype(np.int64)
+        return (X @ X.T).tocsr(), sizes
+
+    def passages(self, i: int, j: int, *, min_tokens: Optional[int] = None) -> List[Passage]:
+        # Shared fingerprints of documents i and j chained into passages: a match continues the current
+        # passage when it follows within one window in `a` and stays near the same diagonal in `b`
+        return shared_passages(self.docs[i], self.docs[j], k=self.k, window=self.window, min_tokens=min_tokens)
+
+
+def _matches(a: Fingerprints, b: Fingerprints) -> Tuple[np.ndarray, np.ndarray]:
+    # (pos_a, pos_b) with equal hashes, ordered by pos_a. A hash repeated in b contributes at most
+    # MAX_POSTINGS positions, those nearest to where pos_a falls proportionally in b.
+    order = np.argsort(b.hashes, kind="stable")  # stable: positions stay ascending within a hash
+    hb = b.hashes[order]
+    pb_sorted = b.positions[order].astype(np.int64)
+    lo = np.searchsorted(hb, a.hashes, side="left")
+    hi = np.searchsorted(hb, a.hashes, side="right")
+    counts = np.minimum(hi - lo, MAX_POSTINGS)
+    if not counts.sum():
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    first = lo
+    many = np.flatnonzero(hi - lo > MAX_POSTINGS)
+    if many.size:
+        # composite (hash group, position) keys are sorted, so the diagonal guess is one searchsorted away
+        span = np.int64(max(a.n_tokens, b.n_tokens) + 1)
+        group = np.searchsorted(hb, hb, side="left").astype(np.int64)
+        comp = group * span + pb_sorted
+        guess = a.positions[many].astype(np.int64) * max(b.n_tokens, 1) // max(a.n_tokens, 1)
+        mid = np.searchsorted(comp, lo[many].astype(np.int64) * span + guess)
+        first = lo.copy()
+        first[many] = np.clip(mid - MAX_POSTINGS // 2, lo[many], hi[many] - MAX_POSTINGS)
+
+    pos_a = np.repeat(a.positions.astype(np.int64), counts)
+    starts = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+    return pos_a, pb_sorted[starts]
+
+
+def shared_passages(
+    a: Fingerprints,
+    b: Fingerprints,
+    *,
+    k: int = DEFAULT_K,
+    window: int = DEFAULT_WINDOW,
+    min_tokens: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> List[Passage]:
+    # With `deadline` (time.perf_counter() value), chaining stops there and returns the passages found so far
+    pos_a, pos_b = _matches(a, b)
+    gap = k + window
+    min_len = k + window - 1 if min_tokens is None else min_tokens
+    spans: List[List[int]] = []  # [a_start, a_last, b_start, b_last]
+    for step, (pa, pb) in enumerate(zip(pos_a.tolist(), pos_b.tolist())):
+        if deadline is not None and step % 4096 == 0 and time.perf_counter() > deadline:
+            break
+        if spans:
+            cur = spans[-1]
+            if pa == cur[1] and cur[3] < pb <= cur[3] + gap:
+                continue  # repeated hash at the same position; keep the first alignment
+            if 0 <= pa - cur[1] <= gap and 0 < pb - cur[3] <= gap:
+                cur[1], cur[3] = pa, pb
+                continue
+        spans.append([pa, pa, pb, pb])
+
+    out: List[Passage] = []
+    for a0, a1, b0, b1 in spans:
+        p = Passage(a_start=a0, a_end=min(a1 + k, a.n_tokens), b_start=b0, b_end=min(b1 + k, b.n_tokens))
+        if p.length >= min_len:
+            out.append(p)
+    return out
+
+
+def containment_matrix(shared: sparse.csr_matrix, sizes: np.ndarray) -> sparse.csr_matrix:
+    # Every row of containment() at once, same sparsity as `shared`
+    coo = shared.tocoo()
+    denom = np.minimum(sizes[coo.row], sizes[coo.col])
+    data = np.clip(np.where(denom > 0, coo.data / np.maximum(denom, 1), 0.0), 0.0, 1.0)
+    return sparse.csr_matrix((data, (coo.row, coo.col)), shape=shared.shape)
+
+
+def containment(shared: sparse.csr_matrix, sizes: np.ndarray, i: int) -> np.ndarray:
+    # Row i of |F_a & F_b| / min(|F_a|, |F_b|): a copied page scores high even inside a long thesis
+    row = np.zeros(shared.shape[1], dtype=float)
+    lo, hi = shared.indptr[i], shared.indptr[i + 1]
+    cols = shared.indices[lo:hi]
+    denom = np.minimum(sizes[i], sizes[cols])
+    row[cols] = np.where(denom > 0, shared.data[lo:hi] / np.maximum(denom, 1), 0.0)
+    return np.clip(row, 0.0, 1.0)
+
+
+def winnow_similarity(a: Fingerprints, b: Fingerprints) -> float:
+    ha = np.unique(a.hashes)
+    hb = np.unique(b.hashes)
+    if not ha.size or not hb.size:
+        return 0.0
+    return float(np.intersect1d(ha, hb, assume_unique=True).size / min(ha.size, hb.size))
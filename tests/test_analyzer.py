@@ -12,3 +12,19 @@ def test_analyze_folder_tmp(tmp_path: Path):
     assert len(result.similarity_matrix) == 2
     assert result.similarity_matrix[0][0] == 1.0
     assert result.similarity_matrix[1][1] == 1.0
+
+
+def test_analyze_folder_low_memory(tmp_path: Path):
+    (tmp_path / "a.txt").write_text("alpha beta gamma delta epsilon zeta eta", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("alpha beta gamma delta epsilon theta iota", encoding="utf-8")
+    (tmp_path / "c.txt").write_text("completely unrelated words written here", encoding="utf-8")
+
+    full = analyze_folder(tmp_path, threshold=0.5)
+    lean = analyze_folder(tmp_path, threshold=0.5, low_memory=True)
+
+    # pairs that can reach the threshold are scored exactly; the rest use an estimated sequence term
+    assert lean.top_pairs == full.top_pairs
+    assert lean.config["lazy_text"]["pairs_sequence_estimated"] == 2
+
+    exact = analyze_folder(tmp_path, threshold=0.0, low_memory=True)
+    assert exact.similarity_matrix == analyze_folder(tmp_path, threshold=0.0).similarity_matrix
@@ -0,0 +1,49 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from plagiarism_detector.batch import BatchSettings, load_manifest, run_batch
+
+
+def _course(folder: Path, k: int) -> None:
+    folder.mkdir(parents=True)
+    for i in range(3):
+        (folder / f"s{i}.txt").write_text(f"course {k} essay {i} about rivers lakes and the water cycle", encoding="utf-8")
+
+
+def test_manifest_formats(tmp_path: Path):
+    (tmp_path / "jobs.txt").write_text("# nightly\ncourse_a\n\ncourses/course_b\n", encoding="utf-8")
+    jobs = load_manifest(tmp_path / "jobs.txt", tmp_path / "out")
+    assert [(j.input, j.out) for j in jobs] == [
+        (tmp_path / "course_a", tmp_path / "out" / "course_a"),
+        (tmp_path / "courses" / "course_b", tmp_path / "out" / "course_b"),
+    ]
+    (tmp_path / "jobs.json").write_text(json.dumps(["a", {"input": "b", "threshold": 0.5}]), encoding="utf-8")
+    assert [j.threshold for j in load_manifest(tmp_path / "jobs.json", tmp_path / "out")] == [None, 0.5]
+    (tmp_path / "clash.txt").write_text("x/course\ny/course\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_manifest(tmp_path / "clash.txt", tmp_path / "out")
+
+
+def test_run_resume_and_failures(tmp_path: Path):
+    for k in range(2):
+        _course(tmp_path / f"course{k}", k)
+    (tmp_path / "jobs.txt").write_text("course0\ncourse1\nmissing\n", encoding="utf-8")
+    jobs = load_manifest(tmp_path / "jobs.txt", tmp_path / "out")
+    settings = BatchSettings(threshold=0.5, plots=False, evidence_seconds=0)
+    state = tmp_path / "out" / "state.json"
+
+    def run():
+        return asyncio.run(run_batch(jobs, settings, cpu_budget=2, state_path=state))
+
+    first = run()
+    assert [r.status for r in first] == ["done", "done", "failed"]
+    assert first[0].files == 3 and {"read", "wait", "analyze", "write", "total"} <= set(first[0].seconds)
+    report = json.loads((tmp_path / "out" / "course0" / "report.json").read_text(encoding="utf-8"))
+    assert len(report["files"]) == 3
+
+    (tmp_path / "course1" / "s3.txt").write_text("a new submission", encoding="utf-8")
+    assert [r.status for r in run()] == ["skipped", "done", "failed"]
+    assert [r.status for r in run()] == ["skipped", "skipped", "failed"]
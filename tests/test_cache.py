@@ -0,0 +1,102 @@
+import multiprocessing
+from pathlib import Path
+from typing import Optional, Tuple
+
+from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.cache import ExtractionCache
+from plagiarism_detector.readers import read_document, read_folder
+
+
+def _make_docx(path: Path, text: str) -> None:
+    import docx  # type: ignore
+
+    d = docx.Document()
+    d.add_paragraph(text)
+    d.save(path)
+
+
+def test_cache_hits_on_unchanged_file(tmp_path: Path):
+    src = tmp_path / "in"
+    src.mkdir()
+    _make_docx(src / "a.docx", "Hello cached world")
+    (src / "b.txt").write_text("plain text is not cached", encoding="utf-8")
+
+    cache = ExtractionCache(tmp_path / "cache")
+    first = read_folder(src, cache=cache)
+    second = read_folder(src, cache=cache)
+
+    assert [d.text for d in first] == [d.text for d in second]
+    assert cache.stats.misses == 1
+    assert cache.stats.hits == 1
+    cache.close()
+
+
+def test_cache_lru_eviction(tmp_path: Path):
+    cache = ExtractionCache(tmp_path / "cache", max_bytes=10)
+    cache.put("k1", "12345")
+    cache.put("k2", "67890")
+    cache.put("k3", "abcde")
+    assert cache.get("k1") is None
+    assert cache.get("k3") == "abcde"
+    assert cache.stats.evictions == 1
+    cache.close()
+
+
+def test_read_document_without_cache(tmp_path: Path):
+    _make_docx(tmp_path / "c.docx", "no cache")
+    assert "no cache" in read_document(tmp_path / "c.docx").text
+
+
+def test_cache_total_survives_replace_and_reopen(tmp_path: Path):
+    cache = ExtractionCache(tmp_path / "cache", max_bytes=10)
+    cache.put("k1", "12345")
+    cache.put("k1", "123")  # replacing an entry counts its new size only
+    cache.put("k2", "67890")
+    assert cache.stats.evictions == 0
+    cache.close()
+
+    reopened = ExtractionCache(tmp_path / "cache", max_bytes=10)
+    reopened.put("k3", "ab")  # 3 + 5 + 2 from the table on connect
+    assert reopened.stats.evictions == 0
+    reopened.put("k4", "c")
+    assert reopened.stats.evictions == 1 and reopened.get("k1") is None and reopened.get("k2") == "67890"
+    reopened.close()
+
+
+_INHERITED: Optional[ExtractionCache] = None
+
+
+def _read_inherited(key: str) -> Tuple[Optional[str], int]:
+    assert _INHERITED is not None
+    return _INHERITED.get(key), id(_INHERITED._connect())  # pylint: disable=protected-access
+
+
+def test_forked_workers_open_their_own_connection(tmp_path: Path):
+    global _INHERITED  # pylint: disable=global-statement
+    cache = _INHERITED = ExtractionCache(tmp_path / "cache")
+    cache.put("k1", "parent")
+    conn = cache._connect()  # pylint: disable=protected-access
+    with multiprocessing.get_context("fork").Pool(2) as pool:
+        results = pool.map(_read_inherited, ["k1"] * 8)
+    assert [text for text, _ in results] == ["parent"] * 8
+    assert id(conn) not in {conn_id for _, conn_id in results}
+    assert cache._connect() is conn  # pylint: disable=protected-access
+    assert cache.get("k1") == "parent" and cache.stats.hits == 1
+    cache.close()
+    _INHERITED = None
+
+
+def test_low_memory_workers_with_cache(tmp_path: Path):
+    src = tmp_path / "in"
+    src.mkdir()
+    words = "alpha beta gamma delta epsilon zeta eta theta iota kappa".split()
+    for k in range(6):
+        _make_docx(src / f"doc_{k}.docx", " ".join(words[k:] + words[:k]) + " common tail words here")
+    cache = ExtractionCache(tmp_path / "cache")
+    serial = analyze_folder(src, threshold=0.1, cache=cache)
+    parallel = analyze_folder(src, threshold=0.1, cache=cache, low_memory=True, workers=2)
+
+    pairs = [(p["a"], p["b"]) for p in serial.top_pairs]
+    assert pairs and [(p["a"], p["b"]) for p in parallel.top_pairs] == pairs
+    assert cache.stats.misses == 6 and cache.stats.hits >= 6  # the parent's connection still works
+    cache.close()
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import numpy as np
+
+from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.candidates import (
+    candidate_recall,
+    lsh_candidate_pairs,
+    minhash_permutations,
+    minhash_signature_from_keys,
+)
+from plagiarism_detector.similarity import SimilarityConfig, ngram_key_set
+from plagiarism_detector.vocab import Vocabulary
+
+
+def test_minhash_identical_and_disjoint():
+    perms = minhash_permutations(64)
+    vocab = Vocabulary()
+    docs = ["alpha beta gamma delta epsilon", "alpha beta gamma delta epsilon", "one two three four five"]
+    ids = [vocab.intern(d.split()) for d in docs]
+    a, b, c = (minhash_signature_from_keys(ngram_key_set(x, 2, len(vocab)), perms) for x in ids)
+    # MinHash Jaccard estimate as the analyzer computes it for unscored pairs
+    estimates = np.count_nonzero(np.vstack([b, c]) == a, axis=1) / a.size
+    assert estimates[0] == 1.0
+    assert estimates[1] < 0.2
+    assert (0, 1) in lsh_candidate_pairs([a, b, c], bands=16)
+
+
+def test_lsh_mode_recall_on_sample_dataset():
+    sample_dir = Path(__file__).resolve().parents[1] / "data" / "sample"
+
+    exhaustive = analyze_folder(sample_dir, threshold=0.3)
+    lsh = analyze_folder(sample_dir, threshold=0.3, sim_cfg=SimilarityConfig(candidate_mode="lsh"))
+
+    truth = {(p["a"], p["b"]) for p in exhaustive.top_pairs}
+    found = {(p["a"], p["b"]) for p in lsh.top_pairs}
+    assert truth == {("essay_01.txt", "essay_02_similar.txt")}
+    assert candidate_recall(truth, found) == 1.0
+    assert lsh.config["candidates"]["pairs_scored"] <= lsh.config["candidates"]["pairs_total"]
@@ -0,0 +1,71 @@
+import random
+from pathlib import Path
+
+import numpy as np
+
+from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.parallel import length_bound, row_blocks
+from plagiarism_detector.similarity import SimilarityConfig
+
+
+def _write_corpus(folder: Path) -> None:
+    base = "the student wrote an essay about rivers lakes and the water cycle in northern regions".split()
+    for k in range(4):
+        words = base[: len(base) - k] + [f"edit{k}"]
+        (folder / f"copy_{k}.txt").write_text(" ".join(words), encoding="utf-8")
+    for k in range(4):
+        words = [f"word{k}_{x}" for x in range(12 + k)]
+        (folder / f"other_{k}.txt").write_text(" ".join(words), encoding="utf-8")
+
+
+def test_length_bound():
+    assert length_bound(0, 0) == 1.0
+    assert length_bound(10, 10) == 1.0
+    assert length_bound(10, 30) == 0.5
+
+
+def test_cascade_keeps_top_pairs_and_bounds_the_rest(tmp_path: Path):
+    _write_corpus(tmp_path)
+    full = analyze_folder(tmp_path, threshold=0.6)
+    fast = analyze_folder(tmp_path, threshold=0.6, sim_cfg=SimilarityConfig(cascade=True))
+
+    assert fast.top_pairs == full.top_pairs
+    stats = fast.config["cascade"]
+    assert stats["pairs_bounded"] == len(fast.bounded_pairs) > 0
+    assert 0 < stats["evaluations_saved"] <= stats["evaluations_total"]
+
+    exact = np.asarray(full.similarity_matrix)
+    bounded = np.asarray(fast.similarity_matrix)
+    rows, cols = np.triu_indices(len(full.files), k=1)
+    # bounded scores are lower bounds of pairs below the threshold; the rest is exact
+    assert np.all(bounded[rows, cols] <= exact[rows, cols] + 1e-9)
+    assert np.all(bounded[rows, cols][exact[rows, cols] >= 0.6] == exact[rows, cols][exact[rows, cols] >= 0.6])
+
+
+def test_cascade_with_top_k_keeps_the_same_pairs(tmp_path: Path):
+    _write_corpus(tmp_path)
+    full = analyze_folder(tmp_path, threshold=0.6, top_k=2)
+    fast = analyze_folder(tmp_path, threshold=0.6, top_k=2, sim_cfg=SimilarityConfig(cascade=True))
+
+    kept = set(zip(full.sparse_pairs.rows.tolist(), full.sparse_pairs.cols.tolist()))
+    assert set(zip(fast.sparse_pairs.rows.tolist(), fast.sparse_pairs.cols.tolist())) == kept
+
+
+def test_cascade_top_k_cut_does_not_depend_on_workers(tmp_path: Path):
+    # 24 files over 2 workers make 8 row blocks: every block prunes with the same pre-pass floors
+    rng = random.Random(4)
+    words = [f"w{x}" for x in range(60)]
+    base = [rng.choice(words) for _ in range(80)]
+    for k in range(24):
+        text = [w if rng.random() < k / 50 else rng.choice(words) for w in base]
+        (tmp_path / f"doc_{k:02d}.txt").write_text(" ".join(text), encoding="utf-8")
+    assert len(row_blocks(24, 2 * 4)) == 8
+
+    cfg = SimilarityConfig(cascade=True)
+    serial = analyze_folder(tmp_path, threshold=0.6, top_k=3, sim_cfg=cfg, evidence_seconds=0)
+    forked = analyze_folder(tmp_path, threshold=0.6, top_k=3, workers=2, sim_cfg=cfg, evidence_seconds=0)
+
+    assert serial.config["cascade"] == forked.config["cascade"] and serial.config["cascade"]["pairs_bounded"] > 0
+    assert serial.bounded_pairs.tolist() == forked.bounded_pairs.tolist()
+    for name in ("rows", "cols", "scores"):
+        assert getattr(serial.sparse_pairs, name).tolist() == getattr(forked.sparse_pairs, name).tolist()
@@ -0,0 +1,44 @@
+import random
+from difflib import SequenceMatcher
+
+import pytest
+
+from plagiarism_detector.charsim import blocks_ratio, matching_blocks
+from plagiarism_detector.similarity import sequence_ratio
+
+
+def _words(rng, n):
+    return [
+        rng.choice(["alpha", "beta", "gamma", "delta", "omega", "sigma", "kappa", "theta"]) + str(rng.randrange(50))
+        for _ in range(n)
+    ]
+
+
+def test_blocks_ratio_close_to_exact_ratio_on_edited_copy():
+    rng = random.Random(3)
+    a = _words(rng, 300)
+    b = [w if rng.random() > 0.1 else "changed" for w in a]
+    ta, tb = " ".join(a), " ".join(b)
+    exact = SequenceMatcher(None, ta, tb, autojunk=False).ratio()
+    assert abs(blocks_ratio(ta, tb) - exact) <= 0.02
+
+
+def test_matching_blocks_are_ordered_and_exact():
+    a = "the quick brown fox jumps over the lazy dog " * 3
+    b = "a quick brown fox leaps over the lazy dog " * 3
+    prev_a = prev_b = 0
+    for i, j, size in matching_blocks(a, b):
+        assert i >= prev_a and j >= prev_b and size > 0
+        assert a[i : i + size] == b[j : j + size]
+        prev_a, prev_b = i + size, j + size
+
+
+def test_sequence_ratio_backends_and_options():
+    assert sequence_ratio("same text here", "same text here", backend="blocks") == 1.0
+    assert sequence_ratio("", "", backend="blocks") == 1.0
+    # length cap: only the identical prefixes are compared
+    assert sequence_ratio("abcdef" * 10 + "x" * 100, "abcdef" * 10 + "y" * 100, backend="blocks", max_chars=60) == 1.0
+    # early exit: a 10-char text can never reach 0.9 against a 100-char one
+    assert blocks_ratio("a" * 10, "a" * 100, min_ratio=0.9) == 0.0
+    with pytest.raises(ValueError):
+        sequence_ratio("a", "b", backend="nope")
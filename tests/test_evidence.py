@@ -0,0 +1,70 @@
+from pathlib import Path
+
+from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.evidence import pair_evidence
+from plagiarism_detector.reporting import load_columnar, save_columnar, save_markdown
+
+PASSAGE = (
+    "The water cycle describes how water evaporates from the surface of the ocean, "
+    "rises into the atmosphere, cools and condenses into clouds, and falls again as precipitation."
+)
+
+
+def _texts():
+    a = "My introduction about something else entirely.\n\nIn short,  " + PASSAGE + " Then my own conclusion follows here."
+    b = "Totally different opening words by another author. " + PASSAGE.replace("  ", " ") + "\nThe end of it all."
+    return a, b
+
+
+def test_pair_evidence_maps_spans_to_original_characters():
+    a, b = _texts()
+    ev = pair_evidence(a, b)
+    assert not ev["truncated"]
+    assert len(ev["spans"]) == 1
+    a0, a1, b0, b1 = ev["spans"][0]
+    # token-level alignment, mapped back: "In short" / "Then" are not shared
+    assert a[a0:a1] == PASSAGE[:-1]
+    assert b[b0:b1] == PASSAGE[:-1]
+    assert ev["snippets"][0].startswith("The water cycle")
+
+
+def test_pair_evidence_time_budget():
+    a, b = _texts()
+    ev = pair_evidence(a * 50, b * 50, time_budget=0.0)
+    assert ev["truncated"]
+
+
+def test_evidence_in_reports(tmp_path: Path):
+    a, b = _texts()
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.txt").write_text(a, encoding="utf-8")
+    (docs / "b.txt").write_text(b, encoding="utf-8")
+
+    result = analyze_folder(docs, threshold=0.1)
+    assert result.top_pairs and result.top_pairs[0]["evidence"]["spans"]
+    assert result.config["evidence"]["pairs"] == 1
+
+    save_markdown(result, tmp_path / "report.md")
+    md = (tmp_path / "report.md").read_text(encoding="utf-8")
+    assert "## Evidence" in md and "The water cycle" in md
+    assert "| evidence" not in md
+
+    save_columnar(result, tmp_path / "columnar")
+    assert load_columnar(tmp_path / "columnar").top_pairs[0]["evidence"] == result.top_pairs[0]["evidence"]
+
+    assert "evidence" not in analyze_folder(docs, threshold=0.1, evidence_seconds=0).top_pairs[0]
+
+
+def test_evidence_resolves_documents_by_index(tmp_path: Path):
+    # Same basename in two subfolders: evidence must come from each pair's own texts
+    a, b = _texts()
+    for sub, text in (("x", a), ("y", b), ("z", "Unrelated words about castles, walls and towers.")):
+        (tmp_path / "docs" / sub).mkdir(parents=True)
+        (tmp_path / "docs" / sub / "essay.txt").write_text(text, encoding="utf-8")
+
+    result = analyze_folder(tmp_path / "docs", threshold=0.1)
+    pair = result.top_pairs[0]
+    assert result.files == ["essay.txt"] * 3 and (pair["i"], pair["j"]) == (0, 1)
+    a0, a1, b0, b1 = pair["evidence"]["spans"][0]
+    assert a[a0:a1] == b[b0:b1] == PASSAGE[:-1]
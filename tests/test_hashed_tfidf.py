@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import numpy as np
+
+from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.hashed_tfidf import HashedTfidf, cosine_topk
+from plagiarism_detector.similarity import SimilarityConfig, cosine_tfidf_matrix_from_ids
+
+
+def _docs(n: int = 40):
+    rng = np.random.default_rng(1)
+    base = rng.integers(0, 300, size=80)
+    docs = []
+    for i in range(n):
+        ids = base.copy() if i % 4 == 0 else rng.integers(0, 300, size=60 + i)
+        if i % 4 == 0:
+            ids[rng.integers(0, ids.size, size=i % 7)] = 299  # near-duplicates of one base text
+        docs.append(ids.astype(np.int32))
+    return docs
+
+
+def test_hashed_cosine_matches_exact_and_keeps_top_k():
+    docs = _docs()
+    exact = cosine_tfidf_matrix_from_ids(docs, 300, ngram_range=(1, 2))
+    model = HashedTfidf(n_features=2**24)
+    for ids in docs:
+        model.add(ids)
+    cos = cosine_topk(model.matrix(), top_k=3, floor=0.5, block_rows=7)
+
+    n = len(docs)
+    rows, cols = np.triu_indices(n, k=1)
+    above = {(i, j) for i, j in zip(rows.tolist(), cols.tolist()) if exact[i, j] >= 0.5}
+    assert above and above <= cos.pairs()
+    for key, v in zip(cos.keys.tolist(), cos.values.tolist()):
+        assert abs(v - exact[key // n, key % n]) < 1e-6
+    for i in range(n):
+        best = np.argsort(-np.where(np.arange(n) == i, -1.0, exact[i]))[:3]
+        assert all(cos[i, j] > 0 for j in best if exact[i, j] > 0)
+    assert cos[0, 0] == 1.0
+    for i in range(n - 1):
+        assert cos.upper_row(i).tolist() == [cos[i, j] for j in range(i + 1, n)]
+
+
+def test_analyze_folder_hashed_tfidf(tmp_path: Path):
+    words = [f"w{k}" for k in range(200)]
+    rng = np.random.default_rng(2)
+    base = rng.choice(words, size=120)
+    for i in range(6):
+        text = base.copy() if i < 2 else rng.choice(words, size=120)
+        (tmp_path / f"d{i}.txt").write_text(" ".join(text), encoding="utf-8")
+
+    exact = analyze_folder(tmp_path, threshold=0.7)
+    cfg = SimilarityConfig(tfidf_mode="hashed", candidate_mode="lsh")
+    hashed = analyze_folder(tmp_path, threshold=0.7, sim_cfg=cfg)
+    assert [(p["a"], p["b"], p["score"]) for p in hashed.top_pairs] == [(p["a"], p["b"], p["score"]) for p in exact.top_pairs]
+    assert hashed.config["tfidf"]["mode"] == "hashed"
+    assert hashed.config["candidates"]["pairs_tfidf_floor"] >= 1
@@ -0,0 +1,47 @@
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HEAVY = ("numpy", "scipy", "sklearn", "matplotlib")
+# Seconds `--help` may take on top of a bare interpreter start (heavy imports alone cost 1-3 s)
+HELP_BUDGET = 0.5
+
+
+def _run(code: str) -> str:
+    return subprocess.check_output([sys.executable, "-c", code], text=True)
+
+
+def test_cli_parser_does_not_import_heavy_dependencies():
+    out = _run(
+        "import json, sys\n"
+        "from plagiarism_detector.__main__ import build_batch_parser, build_index_parser, build_parser, build_serve_parser\n"
+        "build_parser(); build_index_parser(); build_serve_parser(); build_batch_parser()\n"
+        f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    )
+    assert json.loads(out) == []
+
+
+def test_help_within_budget():
+    def wall(args):
+        best = float("inf")
+        for _ in range(3):
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, *args], check=True, stdout=subprocess.DEVNULL)
+            best = min(best, time.perf_counter() - t0)
+        return best
+
+    assert wall(["-m", "plagiarism_detector", "--help"]) - wall(["-c", "pass"]) < HELP_BUDGET
+
+
+def test_no_plot_never_imports_matplotlib(tmp_path: Path):
+    (tmp_path / "a.txt").write_text("alpha beta gamma delta", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("alpha beta gamma epsilon", encoding="utf-8")
+    out = _run(
+        "import json, sys\n"
+        "from plagiarism_detector.__main__ import main\n"
+        f"main(['--input', {str(tmp_path)!r}, '--out', {str(tmp_path / 'out')!r}, '--no-plot', '--no-cache'])\n"
+        "print(json.dumps([m for m in ('matplotlib', 'sklearn') if m in sys.modules]))"
+    )
+    assert json.loads(out.strip().splitlines()[-1]) == []
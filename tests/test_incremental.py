@@ -0,0 +1,35 @@
+from pathlib import Path
+
+from plagiarism_detector.analyzer import analyze_folder
+
+
+def test_incremental_matches_full_run(tmp_path: Path):
+    src = tmp_path / "in"
+    src.mkdir()
+    texts = [
+        "alpha beta gamma delta epsilon zeta",
+        "alpha beta gamma delta theta iota",
+        "kappa lambda mu nu xi omicron",
+        "alpha beta kappa lambda mu pi",
+    ]
+    for k, t in enumerate(texts):
+        (src / f"doc_{k}.txt").write_text(t, encoding="utf-8")
+    state = tmp_path / "state.npz"
+
+    first = analyze_folder(src, threshold=0.1, state_path=state)
+    assert first.config["incremental"]["pairs_reused"] == 0
+    assert state.exists()
+
+    (src / "doc_3.txt").write_text("alpha beta gamma delta epsilon rho", encoding="utf-8")
+    (src / "doc_4.txt").write_text("sigma tau upsilon phi chi psi", encoding="utf-8")
+
+    inc = analyze_folder(src, threshold=0.1, state_path=state)
+    full = analyze_folder(src, threshold=0.1)
+
+    assert inc.similarity_matrix == full.similarity_matrix
+    assert inc.top_pairs == full.top_pairs
+    # 3 unchanged documents -> 3 reused pairs, the other 7 of 10 are rescored
+    assert inc.config["incremental"]["pairs_reused"] == 3
+    assert inc.config["incremental"]["pairs_scored"] == 7
+    assert inc.config["incremental"]["documents_new"] == 1
+    assert inc.config["incremental"]["documents_changed"] == 1
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+from plagiarism_detector import index as index_module
+from plagiarism_detector.index import ReferenceIndex, build_index, query_index, update_index
+from plagiarism_detector.readers import Document, read_folder
+from plagiarism_detector.similarity import SimilarityConfig
+
+
+def _archive(folder: Path) -> None:
+    folder.mkdir()
+    (folder / "2023").mkdir()
+    (folder / "2023" / "essay.txt").write_text(
+        "rivers and lakes form the water cycle of northern regions every year", encoding="utf-8"
+    )
+    (folder / "2023" / "other.txt").write_text("a short note on medieval castles and their stone walls", encoding="utf-8")
+    (folder / "2022_report.txt").write_text("quantum computers use qubits instead of classical bits", encoding="utf-8")
+
+
+def test_build_and_query(tmp_path: Path):
+    _archive(tmp_path / "archive")
+    stats = build_index(tmp_path / "archive", tmp_path / "index")
+    assert stats["documents_added"] == 3
+
+    index = ReferenceIndex.open(tmp_path / "index")
+    assert len(index) == 3
+    assert sorted(index.name(i) for i in range(3)) == ["2022_report.txt", "2023/essay.txt", "2023/other.txt"]
+
+    (tmp_path / "new").mkdir()
+    (tmp_path / "new" / "copy.txt").write_text("rivers and lakes form the water cycle of northern regions", encoding="utf-8")
+    result = query_index(index, read_folder(tmp_path / "new"), top=2)
+    best = result.matches[0][0]
+    assert best["a"] == "copy.txt" and best["b"] == "2023/essay.txt"
+    assert set(best) == {"a", "b", "score", "tfidf", "sequence", "ngram", "lcs"}
+    assert best["score"] > 0.8
+
+
+def test_update_adds_and_replaces(tmp_path: Path):
+    _archive(tmp_path / "archive")
+    build_index(tmp_path / "archive", tmp_path / "index")
+
+    (tmp_path / "archive" / "2023" / "other.txt").write_text("castles were rebuilt in brick", encoding="utf-8")
+    (tmp_path / "archive" / "2024.txt").write_text("a new essay about volcanoes", encoding="utf-8")
+    stats = update_index(tmp_path / "archive", tmp_path / "index")
+    assert (stats["documents_added"], stats["documents_replaced"], stats["documents_unchanged"]) == (1, 1, 2)
+
+    index = ReferenceIndex.open(tmp_path / "index")
+    active = [index.name(i) for i in range(len(index)) if index.active[i]]
+    assert sorted(active) == ["2022_report.txt", "2023/essay.txt", "2023/other.txt", "2024.txt"]
+    assert index.text(len(index) - 1) == "a new essay about volcanoes"
+
+
+def test_query_blocks_match_single_queries(tmp_path: Path, monkeypatch):
+    _archive(tmp_path / "archive")
+    build_index(tmp_path / "archive", tmp_path / "index")
+    index = ReferenceIndex.open(tmp_path / "index")
+    texts = ["rivers and lakes of the north", "castles and stone walls", "qubits and classical bits", "unrelated words"]
+    docs = [Document(f"q{k}.txt", t, Path(f"q{k}.txt")) for k, t in enumerate(texts)]
+
+    batched = query_index(index, docs, top=3)
+    monkeypatch.setattr(index_module, "_QUERY_BLOCK", 3)  # the last query falls into a second block
+    assert query_index(index, docs, top=3).matches == batched.matches
+    assert [m[0]["b"] for m in batched.matches[:3]] == ["2023/essay.txt", "2023/other.txt", "2022_report.txt"]
+
+
+def test_query_skips_oversized_lsh_buckets(tmp_path: Path):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    boilerplate = "this thesis is submitted in partial fulfilment of the requirements for the degree"
+    for k in range(12):
+        (archive / f"t{k}.txt").write_text(boilerplate, encoding="utf-8")
+    build_index(archive, tmp_path / "index")
+    index = ReferenceIndex.open(tmp_path / "index")
+    docs = [Document("q.txt", boilerplate, Path("q.txt"))]
+
+    uncapped = query_index(index, docs, candidates=1)
+    capped = query_index(index, docs, candidates=1, sim_cfg=SimilarityConfig(lsh_max_bucket=5))
+    assert uncapped.config["pairs_scored"] == 12
+    assert capped.config["pairs_scored"] == 1
@@ -0,0 +1,48 @@
+import json
+import pstats
+from pathlib import Path
+
+from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.instrumentation import profiled
+from plagiarism_detector.reporting import load_columnar, save_columnar, save_json
+from plagiarism_detector.similarity import SimilarityConfig
+
+
+def _folder(tmp_path: Path) -> Path:
+    words = "alpha beta gamma delta epsilon zeta eta theta iota kappa".split()
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for k in range(5):
+        text = " ".join(words[k:] + words[:k]) + " common tail words here"
+        (docs / f"doc_{k}.txt").write_text(text, encoding="utf-8")
+    return docs
+
+
+def test_metrics_section(tmp_path: Path):
+    docs = _folder(tmp_path)
+    result = analyze_folder(docs, threshold=0.1, workers=2)
+    m = result.metrics
+    assert m is not None
+    assert {"read", "tokenize", "tfidf", "score_pairs"} <= set(m["stages"])
+    assert all(st["wall_seconds"] >= 0 and st["cpu_seconds"] >= 0 for st in m["stages"].values())
+    # worker timings are merged into the parent: every pair ran every metric once
+    assert {name: st["calls"] for name, st in m["pair_metrics"].items()} == {"ngram": 10, "lcs": 10, "sequence": 10}
+    assert len(m["slowest_pairs"]) == 10 and m["slowest_pairs"][0]["seconds"] >= m["slowest_pairs"][-1]["seconds"]
+    assert m["counters"]["files"] == 5 and m["counters"]["pairs_scored"] == 10
+    assert m["read_by_type"][".txt"]["files"] == 5
+
+    save_json(result, tmp_path / "report.json")
+    assert json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))["metrics"] == m
+    save_columnar(result, tmp_path / "columnar")
+    assert load_columnar(tmp_path / "columnar").metrics == m
+
+    cascade = analyze_folder(docs, threshold=0.99, sim_cfg=SimilarityConfig(cascade=True))
+    assert cascade.metrics["pair_metrics"]["sequence"]["calls"] < 10
+
+
+def test_profiled_dumps_stats(tmp_path: Path):
+    docs = _folder(tmp_path)
+    with profiled(tmp_path / "run.prof"):
+        analyze_folder(docs, threshold=0.1)
+    stats = pstats.Stats(str(tmp_path / "run.prof"))
+    assert any(func[2] == "analyze_folder" for func in stats.stats)  # type: ignore[attr-defined]
@@ -0,0 +1,24 @@
+from pathlib import Path
+
+from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.parallel import row_blocks
+
+
+def test_row_blocks_cover_upper_triangle():
+    blocks = row_blocks(10, 4)
+    assert blocks[0][0] == 0
+    assert blocks[-1][1] == 9
+    assert all(a[1] == b[0] for a, b in zip(blocks, blocks[1:]))
+
+
+def test_workers_match_serial(tmp_path: Path):
+    words = "alpha beta gamma delta epsilon zeta eta theta iota kappa".split()
+    for k in range(6):
+        text = " ".join(words[k:] + words[:k]) + " common tail words here"
+        (tmp_path / f"doc_{k}.txt").write_text(text, encoding="utf-8")
+
+    serial = analyze_folder(tmp_path, threshold=0.1)
+    parallel = analyze_folder(tmp_path, threshold=0.1, workers=2)
+
+    assert parallel.similarity_matrix == serial.similarity_matrix
+    assert parallel.top_pairs == serial.top_pairs
@@ -1,7 +1,55 @@
-from plagiarism_detector.preprocess import tokenize
+import random
+import re
+
+import pytest
+
+from plagiarism_detector import preprocess
+from plagiarism_detector.preprocess import PreprocessConfig, iter_tokens, normalize_text, tokenize, tokenize_with_offsets
+
+_WORD_RE = re.compile(r"[A-Za-zА-Яа-яЁё0-9]+")
 
 
 def test_tokenize_basic():
     tokens = tokenize("Hello, world! Hello!!!")
     assert tokens.count("hello") == 2
     assert "world" in tokens
+
+
+@pytest.mark.parametrize("cfg", [PreprocessConfig(), PreprocessConfig(lower=False, min_token_len=1)])
+def test_single_pass_matches_normalize_then_findall(cfg):
+    text = "Ёжик в  ТУМАНЕ,\tİstanbul 2024 Kelvin a-b x"
+    expected = [t for t in _WORD_RE.findall(normalize_text(text, lower=cfg.lower)) if len(t) >= cfg.min_token_len]
+    assert tokenize(text, cfg) == expected
+
+
+def test_chunked_tokens_and_offsets():
+    text = "The quick brown fox, быстрая лиса; jumps over 12 lazy dogs."
+    tokens, spans = tokenize_with_offsets(text)
+    assert tokens == tokenize(text) and [text[a:b].lower() for a, b in spans] == tokens
+    chunks = [text[k : k + 7] for k in range(0, len(text), 7)]
+    assert list(iter_tokens(chunks)) == [(t, a, b) for t, (a, b) in zip(tokens, spans)]
+
+
+def test_chunked_tokens_with_long_runs(monkeypatch):
+    rng = random.Random(7)
+    text = "start " + "x" * 30000 + " mid İstanbul " + "Ab" * 5000 + " end"
+    tokens, spans = tokenize_with_offsets(text)
+    for _ in range(5):
+        cuts = sorted(rng.sample(range(1, len(text)), 300))
+        chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert list(iter_tokens(chunks)) == [(t, a, b) for t, (a, b) in zip(tokens, spans)]
+
+    # Runs over MAX_RUN_CHARS are cut at chunk boundaries into bounded, contiguous pieces
+    monkeypatch.setattr(preprocess, "MAX_RUN_CHARS", 1000)
+    chunks = [text[k : k + 100] for k in range(0, len(text), 100)]
+    pieces = [(t, a, b) for t, a, b in iter_tokens(chunks) if set(t) == {"x"}]
+    assert len(pieces) > 1 and all(b - a <= 1100 for _, a, b in pieces)
+    assert "".join(t for t, _, _ in pieces) == "x" * 30000
+    assert all(p[2] == q[1] for p, q in zip(pieces, pieces[1:]))
+
+
+def test_stop_words_and_stemming():
+    text = "The rivers and the lakes, реки и озёра"
+    assert tokenize(text, PreprocessConfig(stop_words=True)) == ["rivers", "lakes", "реки", "озёра"]
+    pytest.importorskip("snowballstemmer")
+    assert tokenize(text, PreprocessConfig(stop_words=True, stem=True)) == ["river", "lake", "рек", "озер"]
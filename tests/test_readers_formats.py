@@ -1,6 +1,6 @@
 from pathlib import Path
 
-from plagiarism_detector.readers import read_document, read_folder
+from plagiarism_detector.readers import iter_text, read_document, read_folder, read_folder_detailed
 
 
 def test_read_docx(tmp_path: Path):
@@ -41,3 +41,35 @@ def test_read_folder_mixed(tmp_path: Path):
     names = sorted(x.name for x in docs)
     assert "a.txt" in names
     assert "b.docx" in names
+
+
+def test_read_folder_parallel_collects_failures(tmp_path: Path):
+    for k in range(4):
+        (tmp_path / f"t{k}.txt").write_text(f"text number {k}", encoding="utf-8")
+    (tmp_path / "broken.docx").write_bytes(b"not a zip archive")
+
+    serial = read_folder_detailed(tmp_path)
+    parallel = read_folder_detailed(tmp_path, workers=2)
+
+    assert [d.name for d in parallel.documents] == [d.name for d in serial.documents]
+    assert [d.text for d in parallel.documents] == [d.text for d in serial.documents]
+    assert [f.name for f in parallel.failures] == ["broken.docx"]
+    assert len(parallel.seconds) == 4
+    assert read_folder(tmp_path, exts=["txt"]) == read_folder(tmp_path, exts=[".txt"])
+
+
+def test_iter_text_pieces_join_to_read_document(tmp_path: Path):
+    p = tmp_path / "long.txt"
+    p.write_bytes(("line one\r\nстрока два\r\n" * 40).encode("utf-8"))
+    for size in (1, 7, 64):
+        assert "".join(iter_text(p, chunk_chars=size)) == read_document(p).text
+
+    from pypdf import PdfWriter  # type: ignore
+
+    w = PdfWriter()
+    for _ in range(3):
+        w.add_blank_page(width=72, height=72)
+    with (tmp_path / "pages.pdf").open("wb") as f:
+        w.write(f)
+    assert len(list(iter_text(tmp_path / "pages.pdf"))) == 3
+    assert "".join(iter_text(tmp_path / "pages.pdf")) == read_document(tmp_path / "pages.pdf").text
@@ -5,11 +5,13 @@ from pathlib import Path
 
 from plagiarism_detector.analyzer import analyze_folder
 from plagiarism_detector.reporting import (
+    build_summary,
     save_heatmap_png,
     save_json,
     save_markdown,
     save_similarity_histogram_png,
     save_top_pairs_bar_png,
+    top_pairs_for_result,
 )
 
 
@@ -54,3 +56,40 @@ def test_reporting_creates_files(tmp_path: Path):
     assert "## Top suspicious pairs" in md_text
     assert "## Top pairs (overall)" in md_text
     assert "## Config" in md_text
+
+
+def test_reporting_sparse_mode(tmp_path: Path):
+    texts = [
+        "alpha beta gamma alpha beta",
+        "alpha beta delta alpha beta",
+        "completely different topic words here",
+        "another unrelated text about rivers",
+        "alpha beta gamma delta rivers",
+    ]
+    for k, t in enumerate(texts):
+        (tmp_path / f"d{k}.txt").write_text(t, encoding="utf-8")
+
+    dense = analyze_folder(tmp_path, threshold=0.5)
+    sparse = analyze_folder(tmp_path, threshold=0.5, top_k=1)
+
+    assert sparse.similarity_matrix == []
+    assert sparse.sparse_pairs is not None
+    assert sparse.sparse_pairs.rows.size < 10
+
+    s_dense = build_summary(dense)
+    s_sparse = build_summary(sparse)
+    assert s_sparse["n_pairs"] == s_dense["n_pairs"] == 10
+    assert s_sparse["pairs_above_threshold"] == s_dense["pairs_above_threshold"]
+    assert s_sparse["max_pair_score"] == s_dense["max_pair_score"]
+    assert abs(s_sparse["mean_pair_score"] - s_dense["mean_pair_score"]) < 1e-9
+    assert top_pairs_for_result(sparse, k=1) == top_pairs_for_result(dense, k=1)
+
+    out = tmp_path / "out"
+    save_json(sparse, out / "report.json")
+    save_markdown(sparse, out / "report.md")
+    save_heatmap_png(sparse, out / "heatmap.png")
+    save_similarity_histogram_png(sparse, out / "similarity_hist.png")
+    save_top_pairs_bar_png(sparse, out / "top_pairs.png")
+    payload = json.loads((out / "report.json").read_text(encoding="utf-8"))
+    assert payload["sparse_pairs"]["format"] == "coo"
+    assert (out / "heatmap.png").exists()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.reporting import build_summary, load_columnar, save_columnar, top_pairs_for_result
+
+
+def _make_folder(tmp_path: Path) -> Path:
+    src = tmp_path / "in"
+    src.mkdir()
+    (src / "a.txt").write_text("alpha beta gamma alpha beta", encoding="utf-8")
+    (src / "b.txt").write_text("alpha beta delta alpha beta", encoding="utf-8")
+    (src / "c.txt").write_text("completely different topic words here", encoding="utf-8")
+    return src
+
+
+def test_columnar_roundtrip_dense(tmp_path: Path):
+    result = analyze_folder(_make_folder(tmp_path), threshold=0.3)
+    save_columnar(result, tmp_path / "col")
+
+    loaded = load_columnar(tmp_path / "col")
+    assert isinstance(loaded.similarity_matrix, np.memmap)
+    assert np.asarray(loaded.similarity_matrix).tolist() == result.similarity_matrix
+    assert loaded.top_pairs == result.top_pairs
+    assert build_summary(loaded) == build_summary(result)
+
+
+def test_columnar_roundtrip_sparse(tmp_path: Path):
+    result = analyze_folder(_make_folder(tmp_path), threshold=0.3, top_k=1)
+    save_columnar(result, tmp_path / "col")
+
+    loaded = load_columnar(tmp_path / "col")
+    assert loaded.sparse_pairs is not None
+    assert loaded.similarity_matrix == []
+    assert top_pairs_for_result(loaded) == top_pairs_for_result(result)
+
+
+def test_columnar_keeps_pairs_with_repeated_names(tmp_path: Path):
+    for sub, text in (("x", "alpha beta gamma alpha beta"), ("y", "alpha beta delta alpha beta"), ("z", "other words")):
+        (tmp_path / "in" / sub).mkdir(parents=True)
+        (tmp_path / "in" / sub / "a.txt").write_text(text, encoding="utf-8")
+    result = analyze_folder(tmp_path / "in", threshold=0.3)
+    save_columnar(result, tmp_path / "col")
+
+    loaded = load_columnar(tmp_path / "col")
+    assert loaded.top_pairs == result.top_pairs
+    assert [(p["i"], p["j"]) for p in loaded.top_pairs] == [(0, 1)]
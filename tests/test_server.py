@@ -0,0 +1,100 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.readers import Document
+from plagiarism_detector.server import AnalysisServer, WarmCorpus
+from plagiarism_detector.similarity import SimilarityConfig
+
+DOCS = {
+    "rivers.txt": "rivers and lakes form the water cycle of northern regions every single year",
+    "castles.txt": "a short note on medieval castles and their thick stone walls and towers",
+    "qubits.txt": "quantum computers use qubits instead of classical bits to store information",
+}
+COPY = "rivers and lakes form the water cycle of the northern regions every year"
+
+
+def _corpus(**kwargs) -> WarmCorpus:
+    corpus = WarmCorpus(**kwargs)
+    for name, text in DOCS.items():
+        corpus.add(name, text)
+    return corpus
+
+
+def test_query_uses_analyzer_metrics():
+    corpus = _corpus()
+    out = corpus.query(COPY, name="copy.txt", top=2)
+    best = out["matches"][0]
+    assert best["b"] == "rivers.txt" and out["documents"] == 3
+    assert set(best) == {"a", "b", "score", "tfidf", "sequence", "ngram", "lcs"}
+
+    docs = [Document(n, t, Path(n)) for n, t in {**DOCS, "copy.txt": COPY}.items()]
+    result = analyze_folder(Path("."), threshold=0.0, documents=docs, evidence_seconds=0)
+    pair = next(p for p in result.top_pairs if {p["a"], p["b"]} == {"copy.txt", "rivers.txt"})
+    for metric in ("sequence", "ngram", "lcs"):
+        assert best[metric] == pytest.approx(pair[metric], abs=1e-6)
+
+
+def test_query_skips_oversized_lsh_buckets():
+    boilerplate = "this thesis is submitted in partial fulfilment of the requirements for the degree"
+    for limit, scored in ((None, 12), (5, 1)):
+        cfg = SimilarityConfig() if limit is None else SimilarityConfig(lsh_max_bucket=limit)
+        corpus = WarmCorpus(sim_cfg=cfg, min_score=0.0)
+        for k in range(12):
+            corpus.add(f"t{k}.txt", boilerplate)
+        assert corpus.query(boilerplate, candidates=1, top=20)["pairs_scored"] == scored
+
+
+def test_replace_remove_and_evict():
+    corpus = _corpus(max_docs=3)
+    assert corpus.add("rivers.txt", DOCS["castles.txt"])["replaced"]
+    assert all(m["score"] < 0.5 for m in corpus.query(COPY)["matches"])  # the rivers text is gone
+    assert corpus.add("new.txt", COPY)["evicted"] == ["castles.txt"]  # oldest first
+    assert len(corpus) == 3
+    assert corpus.remove("new.txt") and not corpus.remove("new.txt")
+    assert "new.txt" not in [m["b"] for m in corpus.query(COPY)["matches"]]
+    stats = corpus.describe()
+    assert stats["documents"] == 2 and stats["evicted"] == 1 and stats["removed"] == 1
+
+
+def test_http_api():
+    corpus = WarmCorpus()
+    server = AnalysisServer(corpus, ("127.0.0.1", 0), quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def call(method, path, body=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(base + path, data=data, method=method)
+        with urllib.request.urlopen(req) as resp:
+            return json.loads(resp.read())
+
+    try:
+        added = call("POST", "/documents", {"documents": [{"name": n, "text": t} for n, t in DOCS.items()]})
+        assert [a["name"] for a in added["added"]] == list(DOCS)
+        out = call("POST", "/query", {"name": "copy.txt", "text": COPY, "add": True})
+        assert out["matches"][0]["b"] == "rivers.txt" and out["added"]["name"] == "copy.txt"
+        assert call("GET", "/health") == {"status": "ok", "documents": 4}
+
+        report = call("GET", "/result?threshold=0.5")
+        assert sorted(report["files"]) == sorted([*DOCS, "copy.txt"])
+        assert {report["top_pairs"][0]["a"], report["top_pairs"][0]["b"]} == {"copy.txt", "rivers.txt"}
+
+        assert call("DELETE", "/documents/copy.txt") == {"removed": "copy.txt"}
+        for method, path, body, status in (
+            ("DELETE", "/documents/copy.txt", None, 404),
+            ("POST", "/query", {"name": "no text"}, 400),
+            ("GET", "/nowhere", None, 404),
+        ):
+            with pytest.raises(urllib.error.HTTPError) as err:
+                call(method, path, body)
+            assert err.value.code == status
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -1,6 +1,44 @@
-from plagiarism_detector.similarity import ngram_jaccard
+from plagiarism_detector.similarity import jaccard_row, ngram_jaccard, ngram_jaccard_keys, ngram_jaccard_sparse, ngram_key_set
+from plagiarism_detector.vocab import Vocabulary
 
 
 def test_ngram_jaccard_identity():
     t = "a b c d e".split()
     assert ngram_jaccard(t, t, n=3) == 1.0
+
+
+def test_ngram_jaccard_keys_matches_tuples():
+    a = "a b c d e f a b c".split()
+    b = "x b c d e y a b".split()
+    vocab = Vocabulary()
+    ia, ib = vocab.intern(a), vocab.intern(b)
+    for n in (1, 2, 3):
+        ka, kb = ngram_key_set(ia, n, len(vocab)), ngram_key_set(ib, n, len(vocab))
+        assert ngram_jaccard_keys(ka, kb) == ngram_jaccard(a, b, n=n)
+
+
+def test_ngram_jaccard_rows_match_pairwise():
+    docs = ["a b c d e f", "b c d e f g", "x y", "", "a b c x y z", ""]
+    vocab = Vocabulary()
+    sets = [ngram_key_set(vocab.intern(d.split()), 2, len(vocab)) for d in docs]
+    jac, sizes = ngram_jaccard_sparse(sets)
+    for i in range(len(docs)):
+        row = jaccard_row(jac, sizes, i)
+        for j in range(len(docs)):
+            if i != j:
+                assert row[j] == ngram_jaccard_keys(sets[i], sets[j])
+
+
+def test_ngram_jaccard_for_candidate_pairs_only():
+    docs = ["a b c d e f", "b c d e f g", "x y", "", "a b c x y z", "c d e f g h"]
+    vocab = Vocabulary()
+    sets = [ngram_key_set(vocab.intern(d.split()), 2, len(vocab)) for d in docs]
+    full, sizes = ngram_jaccard_sparse(sets)
+    pairs = {(0, 1), (1, 4), (2, 3), (0, 5)}
+    jac, _ = ngram_jaccard_sparse(sets, pairs=pairs)
+
+    assert jac.nnz <= 2 * len(pairs)
+    for i, j in pairs:
+        assert jaccard_row(jac, sizes, i)[j] == jaccard_row(full, sizes, i)[j]
+        assert jaccard_row(jac, sizes, j)[i] == jaccard_row(full, sizes, j)[i]
+    assert jaccard_row(jac, sizes, 1)[5] == 0.0 < jaccard_row(full, sizes, 1)[5]
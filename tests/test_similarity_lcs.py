@@ -1,4 +1,16 @@
-from plagiarism_detector.similarity import lcs_similarity
+import random
+
+from plagiarism_detector.options import DEFAULT_LCS_TOKENS
+from plagiarism_detector.parallel import length_bound
+from plagiarism_detector.similarity import (
+    SimilarityConfig,
+    lcs_length,
+    lcs_length_dp,
+    lcs_lengths,
+    lcs_similarity,
+    segmented_lcs_similarity,
+    token_lcs_similarity,
+)
 
 
 def test_lcs_similarity_identity():
@@ -10,3 +22,54 @@ def test_lcs_similarity_disjoint():
     a = "alpha beta".split()
     b = "gamma delta".split()
     assert lcs_similarity(a, b, max_tokens=100) == 0.0
+
+
+def test_lcs_backends_agree():
+    rng = random.Random(7)
+    vocab = ["a", "b", "c", "d", "e"]
+    for _ in range(200):
+        a = [rng.choice(vocab) for _ in range(rng.randint(0, 90))]
+        b = [rng.choice(vocab) for _ in range(rng.randint(0, 90))]
+        assert lcs_length(a, b, backend="bitparallel") == lcs_length(a, b, backend="dp")
+        assert lcs_similarity(a, b, max_tokens=70, backend="bitparallel") == lcs_similarity(a, b, max_tokens=70, backend="dp")
+
+
+def test_segmented_lcs_covers_whole_documents():
+    rng = random.Random(3)
+    fresh = [rng.randrange(1000) for _ in range(3000)]
+    source = [rng.randrange(1000) for _ in range(3000)]
+    copy = fresh + source[1500:]  # the copied passage starts past the first window
+
+    assert segmented_lcs_similarity(source[:150], copy[:120], window=200) == lcs_similarity(source[:150], copy[:120])
+    truncated = token_lcs_similarity(source, copy, SimilarityConfig(lcs_mode="truncate", max_lcs_tokens=500))
+    segmented = token_lcs_similarity(source, copy, SimilarityConfig(lcs_mode="segmented", max_lcs_tokens=500))
+    assert truncated < 0.1 and segmented > 0.3
+    assert segmented_lcs_similarity(source * 4, source, window=500) <= length_bound(4 * len(source), len(source)) + 1e-12
+
+
+def test_segmented_lcs_never_exceeds_the_true_lcs():
+    rng = random.Random(11)
+    for _ in range(150):
+        vocab = rng.randrange(2, 8)
+        a = [rng.randrange(vocab) for _ in range(rng.randrange(1, 120))]
+        b = [rng.randrange(vocab) for _ in range(rng.randrange(1, 120))]
+        window = rng.randrange(3, 30)
+        exact = 2.0 * lcs_length_dp(a, b) / (len(a) + len(b))
+        segmented = segmented_lcs_similarity(a, b, window=window)
+        assert segmented <= exact + 1e-12
+        assert segmented == segmented_lcs_similarity(a, b, window=window, backend="dp")
+
+
+def test_truncate_mode_compares_the_first_tokens_only():
+    # lcs_mode="truncate" (the default) keeps the scores of reports made before segmented LCS
+    rng = random.Random(5)
+    a = [rng.randrange(40) for _ in range(DEFAULT_LCS_TOKENS + 600)]
+    b = [rng.randrange(40) for _ in range(DEFAULT_LCS_TOKENS + 100)]
+    cfg = SimilarityConfig(lcs_mode="truncate")
+    head = lcs_similarity(a[:DEFAULT_LCS_TOKENS], b[:DEFAULT_LCS_TOKENS])
+
+    assert token_lcs_similarity(a, b, cfg) == head
+    assert token_lcs_similarity(a[:DEFAULT_LCS_TOKENS] + [-1] * 600, b, cfg) == head  # the tail is ignored
+    assert token_lcs_similarity(a, b, SimilarityConfig()) == head
+    assert token_lcs_similarity(a, b, SimilarityConfig(lcs_mode="segmented")) != head
+    assert lcs_lengths(len(a), len(b), cfg) == (DEFAULT_LCS_TOKENS, DEFAULT_LCS_TOKENS)
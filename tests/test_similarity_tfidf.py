@@ -1,6 +1,8 @@
 import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfTransformer
 
-from plagiarism_detector.similarity import cosine_tfidf_matrix
+from plagiarism_detector.similarity import cosine_tfidf_matrix, tfidf_weight
 
 
 def test_tfidf_matrix_shape_and_diag():
@@ -13,3 +15,11 @@ def test_tfidf_matrix_shape_and_diag():
     assert m.shape == (3, 3)
     assert np.allclose(np.diag(m), 1.0)
     assert m[0, 1] > m[0, 2]
+
+
+def test_tfidf_weight_matches_sklearn():
+    dense = np.random.default_rng(0).integers(0, 4, size=(7, 30)) * (np.random.default_rng(1).random((7, 30)) < 0.3)
+    dense[3] = 0  # empty document
+    counts = sparse.csr_matrix(dense.astype(float))
+    expected = TfidfTransformer().fit_transform(counts).toarray()
+    assert np.allclose(tfidf_weight(counts).toarray(), expected)
@@ -27,6 +27,7 @@ def test_generate_site_script(tmp_path: Path):
             str(site),
             "--threshold",
             "0.1",
+            "--no-cache",
         ]
     )
 
@@ -35,3 +36,4 @@ def test_generate_site_script(tmp_path: Path):
     assert "<title>Plagiarism Detector Report</title>" in html
     assert "report.json" in html
     assert "report.md" in html
+    assert "<h2>Evidence</h2>" in html
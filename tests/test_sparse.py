@@ -0,0 +1,40 @@
+import numpy as np
+
+from plagiarism_detector.sparse import SparseAccumulator
+
+
+def test_accumulator_matches_dense_reference():
+    rng = np.random.default_rng(0)
+    n, top_k, floor = 30, 3, 0.9
+    dense = np.round(rng.random((n, n)), 6)
+    dense = np.triu(dense, 1) + np.triu(dense, 1).T
+    acc = SparseAccumulator(n, top_k=top_k, floor=floor)
+    for i in range(n - 1):
+        if i % 2:
+            acc.add_row(i, np.arange(i + 1, n), dense[i, i + 1 :])
+        else:
+            for j in range(i + 1, n):
+                acc.add(i, j, float(dense[i, j]))
+    result = acc.result()
+
+    upper = dense[np.triu_indices(n, 1)]
+    assert result.n_pairs == upper.size and result.median == float(np.median(upper))
+    assert abs(result.mean - upper.mean()) < 1e-12
+    assert (result.hist == np.histogram(upper, bins=20, range=(0.0, 1.0))[0]).all()
+    kept = result.to_dense()
+    np.fill_diagonal(kept, 0.0)
+    for i in range(n):
+        row = np.delete(dense[i], i)
+        expected = set(np.flatnonzero(row >= floor)) | set(np.argsort(-row)[:top_k])
+        assert set(np.flatnonzero(np.delete(kept[i], i))) >= expected
+        assert np.allclose(np.delete(kept[i], i)[sorted(expected)], row[sorted(expected)])
+
+
+def test_accumulator_counts_missing_pairs_as_zero():
+    acc = SparseAccumulator(4, top_k=1, floor=0.5)
+    acc.add(0, 1, 0.8)
+    acc.add_row(2, np.asarray([3]), np.asarray([0.2]))
+    result = acc.result()
+
+    assert result.n_pairs == 6 and result.hist[0] == 4 and result.median == 0.0
+    assert list(zip(result.rows.tolist(), result.cols.tolist())) == [(0, 1), (2, 3)]
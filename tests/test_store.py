@@ -0,0 +1,60 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.preprocess import PreprocessConfig, tokenize
+from plagiarism_detector.store import CorpusStore, sync_corpus_store
+
+DOCS = {
+    "a.txt": "rivers and lakes form the water cycle of northern regions every single year",
+    "b.txt": "rivers and lakes form the water cycle of the northern regions every year",
+    "sub/c.txt": "a short note on medieval castles and their thick stone walls and towers",
+}
+
+
+def _folder(root: Path) -> Path:
+    for name, text in DOCS.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(text, encoding="utf-8")
+    return root
+
+
+def test_sync_reuses_replaces_and_removes(tmp_path: Path):
+    folder = _folder(tmp_path / "docs")
+    store, rows, read, counts = sync_corpus_store(tmp_path / "store", folder)
+    assert counts == {"reused": 0, "added": 3, "replaced": 0, "removed": 0} and len(read.seconds) == 3
+    vocab = store.tokens()
+    for r, (name, text) in zip(rows, sorted(DOCS.items())):
+        assert store.name(r) == name and store.text(r) == text
+        ids = store.token_ids(r)
+        assert isinstance(ids, np.memmap) and [vocab[i] for i in ids] == tokenize(text, PreprocessConfig())
+
+    (folder / "a.txt").write_text("a completely different essay", encoding="utf-8")
+    os.utime(folder / "a.txt", ns=(1, 1))
+    (folder / "sub" / "c.txt").unlink()
+    store, rows, read, counts = sync_corpus_store(tmp_path / "store", folder)
+    assert counts == {"reused": 1, "added": 0, "replaced": 1, "removed": 1} and len(read.seconds) == 1
+    assert [store.name(r) for r in rows] == ["a.txt", "b.txt"] and store.text(rows[0]) == "a completely different essay"
+    assert store.describe()["n_docs"] == 4 and store.describe()["n_active"] == 2
+
+    reopened = CorpusStore.open(tmp_path / "store")
+    assert reopened.active.tolist() == [False, True, False, True]
+    with pytest.raises(ValueError):
+        sync_corpus_store(tmp_path / "store", folder, preprocess_cfg=PreprocessConfig(lower=False))
+
+
+@pytest.mark.parametrize("low_memory", [False, True])
+def test_analysis_from_store_matches_folder_read(tmp_path: Path, low_memory: bool):
+    folder = _folder(tmp_path / "docs")
+    expected = analyze_folder(folder, threshold=0.5, evidence_seconds=0, low_memory=low_memory)
+    for _ in range(2):  # build, then reuse
+        result = analyze_folder(
+            folder, threshold=0.5, evidence_seconds=0, low_memory=low_memory, corpus_store=tmp_path / "store"
+        )
+        assert result.files == expected.files
+        assert np.allclose(result.similarity_matrix, expected.similarity_matrix)
+        assert result.top_pairs == expected.top_pairs
+    assert result.config["corpus_store"]["reused"] == 3
@@ -0,0 +1,23 @@
+from plagiarism_detector.similarity import cosine_tfidf_matrix, cosine_tfidf_matrix_from_ids
+from plagiarism_detector.vocab import Vocabulary
+
+
+def test_vocabulary_interns_tokens():
+    vocab = Vocabulary()
+    a = vocab.intern("alpha beta alpha".split())
+    b = vocab.intern("beta gamma".split())
+    assert list(a) == [0, 1, 0]
+    assert list(b) == [1, 2]
+    assert a.itemsize == 4
+    assert vocab.decode(b) == ["beta", "gamma"]
+    assert list(vocab.lookup(["gamma", "delta"])) == [2, -1]
+    assert len(vocab) == 3
+
+
+def test_tfidf_from_ids_matches_text_tfidf():
+    texts = ["alpha beta gamma alpha", "alpha beta delta", "epsilon zeta"]
+    vocab = Vocabulary()
+    ids = [vocab.intern(t.split()) for t in texts]
+    expected = cosine_tfidf_matrix(texts)
+    got = cosine_tfidf_matrix_from_ids(ids, len(vocab))
+    assert abs(expected - got).max() < 1e-12
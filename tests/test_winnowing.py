@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import numpy as np
+
+from plagiarism_detector.analyzer import analyze_folder
+from plagiarism_detector.similarity import SimilarityConfig
+from plagiarism_detector.winnowing import WinnowIndex, containment, fingerprints, winnow, winnow_similarity
+
+
+def _words(prefix: str, n: int) -> list:
+    return [f"{prefix}{x}" for x in range(n)]
+
+
+def test_winnow_guarantees_a_fingerprint_per_window():
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 2**63, size=200, dtype=np.uint64)
+    positions, selected = winnow(hashes, 4)
+    assert np.all(np.diff(positions) > 0)
+    assert np.array_equal(selected, hashes[positions])
+    for start in range(len(hashes) - 3):
+        assert np.any((positions >= start) & (positions < start + 4))
+
+
+def test_shared_passage_is_located_inside_long_documents():
+    vocab = {w: i for i, w in enumerate(_words("a", 400) + _words("b", 400) + _words("p", 30))}
+    passage = _words("p", 30)
+    doc_a = [vocab[w] for w in _words("a", 100) + passage + _words("a", 400)[100:]]
+    doc_b = [vocab[w] for w in _words("b", 250) + passage + _words("b", 400)[250:]]
+    doc_c = [vocab[w] for w in _words("b", 400)[::-1]]
+
+    index = WinnowIndex([fingerprints(ids) for ids in (doc_a, doc_b, doc_c)])
+    shared, sizes = index.shared_counts()
+    assert shared[0, 1] > 0 and shared[0, 2] == 0
+    row = containment(shared, sizes, 0)
+    assert row[2] == 0.0 and 0.0 < row[1] <= 1.0
+    assert np.isclose(row[1], winnow_similarity(index.docs[0], index.docs[1]))
+
+    spans = index.passages(0, 1)
+    assert len(spans) == 1
+    p = spans[0]
+    assert 100 <= p.a_start and p.a_end <= 130
+    assert 250 <= p.b_start and p.b_end <= 280
+    assert p.a_start - 100 == p.b_start - 250
+    assert p.length >= 30 - 2 * 3  # window - 1 tokens may be missed at each end
+
+
+def test_winnow_weight_and_candidate_mode(tmp_path: Path):
+    body = " ".join(_words("essay", 300))
+    copied = " ".join(_words("copied", 40))
+    (tmp_path / "a.txt").write_text(body + " " + copied, encoding="utf-8")
+    (tmp_path / "b.txt").write_text(copied + " " + " ".join(_words("other", 5)), encoding="utf-8")
+    (tmp_path / "c.txt").write_text(" ".join(_words("third", 300)), encoding="utf-8")
+
+    cfg = SimilarityConfig(weights=(0.3, 0.1, 0.1, 0.1, 0.4))
+    res = analyze_folder(tmp_path, threshold=0.3, sim_cfg=cfg)
+    assert [(p["a"], p["b"]) for p in res.top_pairs] == [("a.txt", "b.txt")]
+    # the copied page dominates the short document: containment is high while Jaccard stays diluted
+    assert res.top_pairs[0]["winnow"] > 0.8 > res.top_pairs[0]["ngram"]
+
+    fast = analyze_folder(tmp_path, threshold=0.3, sim_cfg=SimilarityConfig(weights=cfg.weights, candidate_mode="winnow"))
+    assert fast.config["candidates"]["pairs_winnow"] == 1
+    assert fast.top_pairs == res.top_pairs